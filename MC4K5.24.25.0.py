@@ -1,11 +1,30 @@
 from ursina import *
-from ursina.prefabs.first_person_controller import FirstPersonController
-import random
-import math
 import time
+import os
+import atexit
+from block_atlas import BlockAtlas
+from body_renderer import BodyRenderer
+from chunk_jobs import ChunkJobQueue
+from frame_profiler import FrameProfiler
+from chunk_streaming import ChunkStreamer
+from input_recorder import InputRecording
+from profiler_overlay import ProfilerOverlay
+from region_file import WorldStorage
+from voxel_player import VoxelFirstPersonController
+from chunk_culling import ChunkCuller
+from translucent_mesh import TranslucentMesh, TranslucentSorter
+from chunk_mesher import make_palette, make_translucent_table
+from terrain import new_world_seed
+from voxel_world import SCRIPT_RULES, BlockEditor, VoxelWorld
+
+# Chunk generation and meshing workers, forked before the window and its GL
+# context exist
+jobs = ChunkJobQueue()
+atexit.register(jobs.shutdown)
 
 # Initialize Ursina app
 app = Ursina()
+profiler = FrameProfiler()  # Named per-frame timers: F3 shows them, F4 dumps a trace
 
 # Game states
 STATE_MENU = 0
@@ -33,187 +52,144 @@ WOOD = 7
 
 # Chunk settings
 CHUNK_SIZE = 16
-chunks = {}
-
-# Item class for dropped items
-class Item(Entity):
-    def __init__(self, position):
-        super().__init__(
-            model='cube',
-            scale=0.5,
-            color=color.yellow,
-            position=position
-        )
-        self.fall_speed = 0
-        self.grounded = False
-    
-    def update(self):
-        chunk_x = math.floor(self.x / CHUNK_SIZE)
-        chunk_z = math.floor(self.z / CHUNK_SIZE)
-        local_x = (math.floor(self.x) % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-        local_z = (math.floor(self.z) % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-        terrain_height = get_terrain_height(chunk_x, chunk_z, local_x, local_z)
-        if self.y <= terrain_height + 1:
-            self.y = terrain_height + 1
-            self.grounded = True
-            self.fall_speed = 0
-        else:
-            self.fall_speed -= 0.1
-            self.y += self.fall_speed * time.dt * 10
-
-# Chunk class for voxel data and mesh
+GREEDY_MESHING = True  # Merge coplanar faces of the same block into larger quads
+UPLOAD_BUDGET = 0.004  # Seconds per frame spent applying finished chunk jobs
+VIEW_RADIUS = 4  # Chunks loaded around the player
+UNLOAD_RADIUS = 6  # Chunks further away than this are unloaded
+LOD_DISTANCES = (2, 3)  # Chunks further away than these (in chunks) merge 2x2x2, then 4x4x4 blocks
+RENDER_DISTANCE = VIEW_RADIUS * CHUNK_SIZE  # Chunks further than this from the camera are not drawn
+AUTOSAVE_INTERVAL = 30  # Seconds between saves of edited chunks
+chunks = {}  # Chunk entities by chunk key; the voxels live in world below
+streamer = ChunkStreamer(VIEW_RADIUS, UNLOAD_RADIUS)
+culler = ChunkCuller(RENDER_DISTANCE)
+translucent_sorter = TranslucentSorter()  # Water and glass drawn back to front after opaque blocks
+
+# Saved world, one directory per game script
+SCRIPT_NAME = os.path.splitext(os.path.basename(__file__))[0]
+storage = WorldStorage(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saves', SCRIPT_NAME))
+autosave_timer = 0
+
+# World seed for terrain generation, kept with the saved world
+WORLD_SEED = storage.metadata.setdefault('seed', new_world_seed())
+storage.save_metadata()
+
+# Function to get block color
+def get_block_color(block):
+    if block == DIRT:
+        return color.brown
+    elif block == WATER:
+        return color.blue
+    elif block == GLASS:
+        return color.clear
+    elif block == BEDROCK:
+        return color.gray
+    elif block == STONE:
+        return color.dark_gray
+    elif block == GRASS:
+        return color.green
+    elif block == WOOD:
+        return color.orange
+    else:
+        return color.white
+
+# Mesh lookup tables
+BLOCK_PALETTE = make_palette(get_block_color)
+TRANSLUCENT_BLOCKS = make_translucent_table({WATER, GLASS})
+
+# Chunk texture: an atlas tile per block face type, so every chunk is drawn
+# with the one texture
+block_atlas = BlockAtlas({
+    DIRT: ('noise', color.brown),
+    WATER: ('noise', color.blue),
+    GLASS: ('glass', color.white),
+    BEDROCK: ('noise', color.gray),
+    STONE: ('noise', color.dark_gray),
+    GRASS: {'top': ('noise', color.green), 'side': ('grass_side', color.brown, color.green), 'bottom': ('noise', color.brown)},
+    WOOD: ('planks', color.orange),
+})
+
+# Chunk entity: draws the meshes of the chunk's voxels in world
 class Chunk(Entity):
     def __init__(self, chunk_x, chunk_z):
-        super().__init__()
+        super().__init__(texture=block_atlas.texture, shader=block_atlas.shader)
+        self.translucent = TranslucentMesh(self, texture=block_atlas.texture, shader=block_atlas.shader)
         self.chunk_x = chunk_x
         self.chunk_z = chunk_z
-        self.voxels = [[[AIR for _ in range(CHUNK_SIZE)] for _ in range(CHUNK_SIZE)] for _ in range(CHUNK_SIZE)]
-        self.model = None
-        self.collider = None
-        self.generate_voxels()
-        self.rebuild_mesh()
     
-    def generate_voxels(self):
-        for x in range(CHUNK_SIZE):
-            for z in range(CHUNK_SIZE):
-                height = random.randint(5, 10)
-                for y in range(CHUNK_SIZE):
-                    if y == 0:
-                        self.voxels[x][y][z] = BEDROCK
-                    elif y < height - 3:
-                        self.voxels[x][y][z] = STONE
-                    elif y < height:
-                        self.voxels[x][y][z] = DIRT
-                    elif y == height:
-                        if random.random() < 0.2:
-                            self.voxels[x][y][z] = WATER
-                        else:
-                            self.voxels[x][y][z] = GRASS
-                    else:
-                        self.voxels[x][y][z] = AIR
-    
-    def rebuild_mesh(self):
-        vertices = []
-        triangles = []
-        colors = []
-        vertex_count = 0
-        
-        for x in range(CHUNK_SIZE):
-            for y in range(CHUNK_SIZE):
-                for z in range(CHUNK_SIZE):
-                    block = self.voxels[x][y][z]
-                    if block == AIR:
-                        continue
-                    neighbors = [
-                        (x+1, y, z), (x-1, y, z),
-                        (x, y+1, z), (x, y-1, z),
-                        (x, y, z+1), (x, y, z-1)
-                    ]
-                    for i, (nx, ny, nz) in enumerate(neighbors):
-                        if not (0 <= nx < CHUNK_SIZE and 0 <= ny < CHUNK_SIZE and 0 <= nz < CHUNK_SIZE):
-                            neighbor_block = get_block(nx + self.chunk_x * CHUNK_SIZE, ny, nz + self.chunk_z * CHUNK_SIZE)
-                        else:
-                            neighbor_block = self.voxels[nx][ny][nz]
-                        if neighbor_block == AIR or (block == WATER and neighbor_block != WATER) or (block == GLASS and neighbor_block != GLASS):
-                            face_vertices = [
-                                Vec3(x, y, z+1), Vec3(x+1, y, z+1), Vec3(x+1, y+1, z+1), Vec3(x, y+1, z+1),
-                                Vec3(x+1, y, z), Vec3(x, y, z), Vec3(x, y+1, z), Vec3(x+1, y+1, z),
-                                Vec3(x+1, y, z+1), Vec3(x+1, y, z), Vec3(x+1, y+1, z), Vec3(x+1, y+1, z+1),
-                                Vec3(x, y, z), Vec3(x, y, z+1), Vec3(x, y+1, z+1), Vec3(x, y+1, z),
-                                Vec3(x, y+1, z), Vec3(x+1, y+1, z), Vec3(x+1, y+1, z+1), Vec3(x, y+1, z+1),
-                                Vec3(x, y, z), Vec3(x+1, y, z), Vec3(x+1, y, z+1), Vec3(x, y, z+1)
-                            ]
-                            fv = face_vertices[i*4:i*4+4]
-                            face_color = (
-                                color.brown if block == DIRT else
-                                color.blue if block == WATER else
-                                color.clear if block == GLASS else
-                                color.gray if block == BEDROCK else
-                                color.dark_gray if block == STONE else
-                                color.green if block == GRASS else
-                                color.orange if block == WOOD else
-                                color.white
-                            )
-                            for vi in fv:
-                                vertices.append(vi + Vec3(self.chunk_x * CHUNK_SIZE, 0, self.chunk_z * CHUNK_SIZE))
-                                colors.append(face_color)
-                            triangles.append([vertex_count, vertex_count+1, vertex_count+2])
-                            triangles.append([vertex_count+2, vertex_count+3, vertex_count])
-                            vertex_count += 4
-        
-        self.model = Mesh(vertices=vertices, triangles=triangles, colors=colors, mode='triangle')
-        self.collider = 'mesh'
-        self.position = (self.chunk_x * CHUNK_SIZE, 0, self.chunk_z * CHUNK_SIZE)
-
-# Helper functions
-def get_terrain_height(chunk_x, chunk_z, local_x, local_z):
-    chunk = chunks.get((chunk_x, chunk_z))
-    if not chunk:
-        return 0
-    for y in range(CHUNK_SIZE-1, -1, -1):
-        if chunk.voxels[local_x][y][local_z] != AIR:
-            return y
-    return 0
-
-def get_block(x, y, z):
-    chunk_x = math.floor(x / CHUNK_SIZE)
-    chunk_z = math.floor(z / CHUNK_SIZE)
-    local_x = (x % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-    local_y = y
-    local_z = (z % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-    chunk = chunks.get((chunk_x, chunk_z))
-    if not chunk or local_y < 0 or local_y >= CHUNK_SIZE:
-        return AIR
-    return chunk.voxels[local_x][local_y][local_z]
-
-def set_block(x, y, z, block_type):
-    chunk_x = math.floor(x / CHUNK_SIZE)
-    chunk_z = math.floor(z / CHUNK_SIZE)
-    local_x = (x % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-    local_y = y
-    local_z = (z % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-    if local_y < 0 or local_y >= CHUNK_SIZE:
-        return
-    chunk = chunks.get((chunk_x, chunk_z))
+    def apply_mesh(self, opaque, translucent):
+        vertices, triangles, uvs = opaque
+        self.model = Mesh(vertices=vertices.ravel(), triangles=triangles, uvs=uvs.ravel(), mode='triangle')
+        self.translucent.apply_buffers(*translucent)
+
+# A chunk's entity is made when its first mesh arrives
+@profiler.timed('mesh_upload')
+def on_chunk_meshed(chunk_key, buffers):
+    chunk = chunks.get(chunk_key)
     if not chunk:
-        chunk = Chunk(chunk_x, chunk_z)
-        chunks[(chunk_x, chunk_z)] = chunk
-    old_block = chunk.voxels[local_x][local_y][local_z]
-    chunk.voxels[local_x][local_y][local_z] = block_type
-    chunk.rebuild_mesh()
-    if old_block != AIR and block_type == AIR:
-        Item(position=(x, y + 0.5, z))
-
-# Player setup and initial chunks
-for cx in range(-2, 3):
-    for cz in range(-2, 3):
-        chunks[(cx, cz)] = Chunk(cx, cz)
-
-player = FirstPersonController()
-terrain_height = get_terrain_height(0, 0, 0, 0)
+        chunk = chunks[chunk_key] = Chunk(*chunk_key)
+    chunk.apply_mesh(*buffers)
+
+def on_chunk_unloaded(chunk_key):
+    chunk = chunks.pop(chunk_key, None)
+    if chunk:
+        destroy(chunk)
+
+# The world: chunk voxels streamed around the player, generated and meshed
+# by the job workers, saved to storage, with dropped items
+rules = SCRIPT_RULES[SCRIPT_NAME]
+world = VoxelWorld(rules['generator'], WORLD_SEED, BLOCK_PALETTE, TRANSLUCENT_BLOCKS, greedy=GREEDY_MESHING, tiles=block_atlas.tiles, split=True,
+                   storage=storage, jobs=jobs, streamer=streamer, lod_distances=LOD_DISTANCES, falling_blocks=rules['falling_blocks'],
+                   on_meshed=on_chunk_meshed, on_unloaded=on_chunk_unloaded, profiler=profiler)
+atexit.register(world.save)
+
+# Dropped items, drawn instanced
+body_renderer = BodyRenderer(world.bodies, color.yellow)
+
+# Player setup and initial chunks: the spawn chunk is built right away so the
+# player has ground to stand on, the rest stream in around the player
+world.load_chunk(0, 0)
+on_chunk_meshed((0, 0), world.mesh_buffers(0, 0))
+player = VoxelFirstPersonController(world.is_solid)
+terrain_height = world.terrain_height(0, 0)
 player.position = (0, terrain_height + 2, 0)
 
+# Block breaking and placing
+block_editor = BlockEditor(world, rules['break_key'], rules['place_key'], rules['select_keys'])
+
+# Per-frame update
+def update():
+    global autosave_timer
+    profiler.end_frame()
+    world.update(time.dt, player.position, player.forward, UPLOAD_BUDGET)
+    with profiler.timer('culling'):
+        culler.update(chunks, camera)
+    with profiler.timer('translucent_sort'):
+        translucent_sorter.update(chunks, camera)
+    autosave_timer += time.dt
+    if autosave_timer >= AUTOSAVE_INTERVAL:
+        autosave_timer = 0
+        world.save()
+
 # Input handling
+@profiler.timed('input')
 def input(key):
     global game_state
     if key == 'space' and game_state == STATE_MENU:
         game_state = STATE_PLAYING
         menu_text.enabled = False
-    elif key == 'left mouse down' and game_state == STATE_PLAYING:
-        hit_info = raycast(player.position, player.forward, distance=5)
-        if hit_info.hit and hit_info.entity in [chunk for chunk in chunks.values()]:
-            targeted_pos = [math.floor(v) for v in hit_info.world_point]
-            block_type = get_block(*targeted_pos)
-            if block_type != AIR and block_type != BEDROCK:
-                set_block(*targeted_pos, AIR)
-    elif key == 'right mouse down' and game_state == STATE_PLAYING:
-        hit_info = raycast(player.position, player.forward, distance=5)
-        if hit_info.hit and hit_info.entity in [chunk for chunk in chunks.values()]:
-            targeted_pos = [math.floor(v) for v in hit_info.world_point]
-            direction = [round(n) for n in hit_info.normal]
-            new_pos = [t + d for t, d in zip(targeted_pos, direction)]
-            if get_block(*new_pos) == AIR:
-                set_block(*new_pos, DIRT)
+    else:
+        block_editor.input(key, camera.world_position, camera.forward, player.position, game_state == STATE_PLAYING)
+
+# Frame timer overlay (F3); F4 dumps the last frames into traces/
+profiler_overlay = ProfilerOverlay(profiler, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces', os.path.splitext(os.path.basename(__file__))[0]))
+
+# Input recording (F2) for headless replays with input_replay.py, which
+# runs the same world and block editor; record in a new world, replays start
+# from freshly generated terrain
+input_recording = InputRecording(player, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings', os.path.splitext(os.path.basename(__file__))[0]),
+                                 lambda: {'script': SCRIPT_NAME, 'seed': WORLD_SEED,
+                                          'playing': game_state == STATE_PLAYING, 'view_radius': VIEW_RADIUS,
+                                          'unload_radius': UNLOAD_RADIUS, 'lod_distances': LOD_DISTANCES})
 
 # Run the app
 app.run()
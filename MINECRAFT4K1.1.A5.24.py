@@ -1,13 +1,32 @@
 from ursina import *
-from ursina.prefabs.first_person_controller import FirstPersonController
-from perlin_noise import PerlinNoise
 import random
-import math
 import time
+import os
+import atexit
+from block_atlas import BlockAtlas
+from body_renderer import BodyRenderer
+from chunk_jobs import ChunkJobQueue
+from frame_profiler import FrameProfiler
+from chunk_streaming import ChunkStreamer
+from input_recorder import InputRecording
+from profiler_overlay import ProfilerOverlay
+from region_file import WorldStorage
+from voxel_player import VoxelFirstPersonController
+from chunk_culling import ChunkCuller
+from translucent_mesh import TranslucentMesh, TranslucentSorter
+from chunk_mesher import make_palette, make_translucent_table
+from terrain import new_world_seed
+from voxel_world import SCRIPT_RULES, BlockEditor, VoxelWorld
 from ursina import Vec3  # Added import for Vec3
 
+# Chunk generation and meshing workers, forked before the window and its GL
+# context exist
+jobs = ChunkJobQueue()
+atexit.register(jobs.shutdown)
+
 # Initialize Ursina app
 app = Ursina()
+profiler = FrameProfiler()  # Named per-frame timers: F3 shows them, F4 dumps a trace
 
 # Game states
 STATE_MENU = 0
@@ -39,28 +58,26 @@ LOG = 11
 
 # Chunk settings
 CHUNK_SIZE = 16
-chunks = {}
-
-# Falling block types
-falling_blocks = {SAND, GRAVEL}
-
-# Perlin noise for terrain generation
-noise = PerlinNoise(octaves=4, seed=random.randint(0, 1000))
-
-# Biome types
-BIOME_PLAINS = 0
-BIOME_FOREST = 1
-BIOME_DESERT = 2
-
-# Function to determine biome
-def get_biome(x, z):
-    biome_noise = noise([x / 100, z / 100])
-    if biome_noise < -0.1:
-        return BIOME_DESERT
-    elif biome_noise > 0.1:
-        return BIOME_FOREST
-    else:
-        return BIOME_PLAINS
+GREEDY_MESHING = True  # Merge coplanar faces of the same block into larger quads
+UPLOAD_BUDGET = 0.004  # Seconds per frame spent applying finished chunk jobs
+VIEW_RADIUS = 4  # Chunks loaded around the player
+UNLOAD_RADIUS = 6  # Chunks further away than this are unloaded
+LOD_DISTANCES = (2, 3)  # Chunks further away than these (in chunks) merge 2x2x2, then 4x4x4 blocks
+RENDER_DISTANCE = VIEW_RADIUS * CHUNK_SIZE  # Chunks further than this from the camera are not drawn
+AUTOSAVE_INTERVAL = 30  # Seconds between saves of edited chunks
+chunks = {}  # Chunk entities by chunk key; the voxels live in world below
+streamer = ChunkStreamer(VIEW_RADIUS, UNLOAD_RADIUS)
+culler = ChunkCuller(RENDER_DISTANCE)
+translucent_sorter = TranslucentSorter()  # Water and glass drawn back to front after opaque blocks
+
+# Saved world, one directory per game script
+SCRIPT_NAME = os.path.splitext(os.path.basename(__file__))[0]
+storage = WorldStorage(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saves', SCRIPT_NAME))
+autosave_timer = 0
+
+# World seed for terrain generation, kept with the saved world
+WORLD_SEED = storage.metadata.setdefault('seed', new_world_seed())
+storage.save_metadata()
 
 # Function to get block color
 def get_block_color(block):
@@ -89,56 +106,25 @@ def get_block_color(block):
     else:
         return color.white
 
-# Item class for dropped items
-class Item(Entity):
-    def __init__(self, position):
-        super().__init__(
-            model='cube',
-            scale=0.5,
-            color=color.yellow,
-            position=position
-        )
-        self.fall_speed = 0
-        self.grounded = False
-    
-    def update(self):
-        chunk_x = math.floor(self.x / CHUNK_SIZE)
-        chunk_z = math.floor(self.z / CHUNK_SIZE)
-        local_x = (math.floor(self.x) % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-        local_z = (math.floor(self.z) % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-        terrain_height = get_terrain_height(chunk_x, chunk_z, local_x, local_z)
-        if self.y <= terrain_height + 1:
-            self.y = terrain_height + 1
-            self.grounded = True
-            self.fall_speed = 0
-        else:
-            self.fall_speed -= 0.1
-            self.y += self.fall_speed * time.dt * 10
-
-# FallingBlock class
-class FallingBlock(Entity):
-    def __init__(self, position, block_type):
-        super().__init__(
-            model='cube',
-            color=get_block_color(block_type),
-            position=position
-        )
-        self.block_type = block_type
-        self.fall_speed = 0
-    
-    def update(self):
-        chunk_x = math.floor(self.x / CHUNK_SIZE)
-        chunk_z = math.floor(self.z / CHUNK_SIZE)
-        local_x = (math.floor(self.x) % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-        local_z = (math.floor(self.z) % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-        landing_y = get_terrain_height(chunk_x, chunk_z, local_x, local_z) + 1
-        if self.y <= landing_y:
-            self.y = landing_y
-            set_block(math.floor(self.x), landing_y, math.floor(self.z), self.block_type)
-            destroy(self)
-        else:
-            self.fall_speed -= 0.1
-            self.y += self.fall_speed * time.dt * 10
+# Mesh lookup tables
+BLOCK_PALETTE = make_palette(get_block_color)
+TRANSLUCENT_BLOCKS = make_translucent_table({WATER, GLASS})
+
+# Chunk texture: an atlas tile per block face type, so every chunk is drawn
+# with the one texture
+block_atlas = BlockAtlas({
+    DIRT: ('noise', color.brown),
+    WATER: ('noise', color.blue),
+    GLASS: ('glass', color.white),
+    BEDROCK: ('noise', color.gray),
+    STONE: ('noise', color.dark_gray),
+    GRASS: {'top': ('noise', color.green), 'side': ('grass_side', color.brown, color.green), 'bottom': ('noise', color.brown)},
+    WOOD: ('planks', color.orange),
+    SAND: ('noise', color.yellow),
+    GRAVEL: ('noise', color.light_gray),
+    LEAVES: ('noise', color.lime),
+    LOG: {'top': ('rings', color.orange, color.brown), 'side': ('bark', color.brown)},
+})
 
 # Mob class (simple wandering entity) - FIXED
 class Mob(Entity):
@@ -153,201 +139,100 @@ class Mob(Entity):
         self.direction = random.choice([Vec3(1,0,0), Vec3(-1,0,0), Vec3(0,0,1), Vec3(0,0,-1)])
         self.speed = 2
     
+    @profiler.timed('mobs')
     def update(self):
         # Vec3 allows multiplication by floats
         self.position += self.direction * self.speed * time.dt
         if random.random() < 0.01:  # Randomly change direction
             self.direction = random.choice([Vec3(1,0,0), Vec3(-1,0,0), Vec3(0,0,1), Vec3(0,0,-1)])
 
-# Chunk class
+# Chunk entity: draws the meshes of the chunk's voxels in world
 class Chunk(Entity):
     def __init__(self, chunk_x, chunk_z):
-        super().__init__()
+        super().__init__(texture=block_atlas.texture, shader=block_atlas.shader)
+        self.translucent = TranslucentMesh(self, texture=block_atlas.texture, shader=block_atlas.shader)
         self.chunk_x = chunk_x
         self.chunk_z = chunk_z
-        self.voxels = [[[AIR for _ in range(CHUNK_SIZE)] for _ in range(CHUNK_SIZE)] for _ in range(CHUNK_SIZE)]
-        self.model = None
-        self.collider = None
-        self.generate_voxels()
-        self.rebuild_mesh()
-    
-    def generate_voxels(self):
-        for x in range(CHUNK_SIZE):
-            for z in range(CHUNK_SIZE):
-                world_x = self.chunk_x * CHUNK_SIZE + x
-                world_z = self.chunk_z * CHUNK_SIZE + z
-                biome = get_biome(world_x, world_z)
-                height = int((noise([world_x / 50, world_z / 50]) + 1) * 5) + 5
-                for y in range(CHUNK_SIZE):
-                    if y == 0:
-                        self.voxels[x][y][z] = BEDROCK
-                    elif y < height - 3:
-                        self.voxels[x][y][z] = STONE
-                    elif y < height:
-                        if biome == BIOME_DESERT:
-                            self.voxels[x][y][z] = SAND
-                        else:
-                            self.voxels[x][y][z] = DIRT
-                    elif y == height:
-                        if biome == BIOME_DESERT:
-                            self.voxels[x][y][z] = SAND
-                        elif biome == BIOME_FOREST:
-                            self.voxels[x][y][z] = GRASS
-                            if random.random() < 0.1:  # 10% chance for a tree
-                                self.generate_tree(x, y, z)
-                        else:
-                            self.voxels[x][y][z] = GRASS
-                    else:
-                        self.voxels[x][y][z] = AIR
-    
-    def generate_tree(self, x, y, z):
-        # Simple tree: 3 logs high with a 3x3 leaf canopy
-        for yy in range(y, y + 3):
-            if yy < CHUNK_SIZE:
-                self.voxels[x][yy][z] = LOG
-        for xx in range(x - 1, x + 2):
-            for zz in range(z - 1, z + 2):
-                if 0 <= xx < CHUNK_SIZE and 0 <= zz < CHUNK_SIZE and y + 3 < CHUNK_SIZE:
-                    self.voxels[xx][y + 3][zz] = LEAVES
     
-    def rebuild_mesh(self):
-        vertices = []
-        triangles = []
-        colors = []
-        vertex_count = 0
-        
-        for x in range(CHUNK_SIZE):
-            for y in range(CHUNK_SIZE):
-                for z in range(CHUNK_SIZE):
-                    block = self.voxels[x][y][z]
-                    if block == AIR:
-                        continue
-                    neighbors = [
-                        (x+1, y, z), (x-1, y, z),
-                        (x, y+1, z), (x, y-1, z),
-                        (x, y, z+1), (x, y, z-1)
-                    ]
-                    for i, (nx, ny, nz) in enumerate(neighbors):
-                        if not (0 <= nx < CHUNK_SIZE and 0 <= ny < CHUNK_SIZE and 0 <= nz < CHUNK_SIZE):
-                            neighbor_block = get_block(nx + self.chunk_x * CHUNK_SIZE, ny, nz + self.chunk_z * CHUNK_SIZE)
-                        else:
-                            neighbor_block = self.voxels[nx][ny][nz]
-                        if neighbor_block == AIR or (block == WATER and neighbor_block != WATER) or (block == GLASS and neighbor_block != GLASS):
-                            face_vertices = [
-                                Vec3(x, y, z+1), Vec3(x+1, y, z+1), Vec3(x+1, y+1, z+1), Vec3(x, y+1, z+1),
-                                Vec3(x+1, y, z), Vec3(x, y, z), Vec3(x, y+1, z), Vec3(x+1, y+1, z),
-                                Vec3(x+1, y, z+1), Vec3(x+1, y, z), Vec3(x+1, y+1, z), Vec3(x+1, y+1, z+1),
-                                Vec3(x, y, z), Vec3(x, y, z+1), Vec3(x, y+1, z+1), Vec3(x, y+1, z),
-                                Vec3(x, y+1, z), Vec3(x+1, y+1, z), Vec3(x+1, y+1, z+1), Vec3(x, y+1, z+1),
-                                Vec3(x, y, z), Vec3(x+1, y, z), Vec3(x+1, y, z+1), Vec3(x, y, z+1)
-                            ]
-                            fv = face_vertices[i*4:i*4+4]
-                            face_color = get_block_color(block)
-                            for vi in fv:
-                                vertices.append(vi + Vec3(self.chunk_x * CHUNK_SIZE, 0, self.chunk_z * CHUNK_SIZE))
-                                colors.append(face_color)
-                            triangles.append([vertex_count, vertex_count+1, vertex_count+2])
-                            triangles.append([vertex_count+2, vertex_count+3, vertex_count])
-                            vertex_count += 4
-        
-        self.model = Mesh(vertices=vertices, triangles=triangles, colors=colors, mode='triangle')
-        self.collider = 'mesh'
-        self.position = (self.chunk_x * CHUNK_SIZE, 0, self.chunk_z * CHUNK_SIZE)
-
-# Helper functions
-def get_terrain_height(chunk_x, chunk_z, local_x, local_z):
-    chunk = chunks.get((chunk_x, chunk_z))
+    def apply_mesh(self, opaque, translucent):
+        vertices, triangles, uvs = opaque
+        self.model = Mesh(vertices=vertices.ravel(), triangles=triangles, uvs=uvs.ravel(), mode='triangle')
+        self.translucent.apply_buffers(*translucent)
+
+# A chunk's entity is made when its first mesh arrives
+@profiler.timed('mesh_upload')
+def on_chunk_meshed(chunk_key, buffers):
+    chunk = chunks.get(chunk_key)
     if not chunk:
-        return 0
-    for y in range(CHUNK_SIZE-1, -1, -1):
-        if chunk.voxels[local_x][y][local_z] != AIR:
-            return y
-    return 0
-
-def get_block(x, y, z):
-    chunk_x = math.floor(x / CHUNK_SIZE)
-    chunk_z = math.floor(z / CHUNK_SIZE)
-    local_x = (x % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-    local_y = y
-    local_z = (z % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-    chunk = chunks.get((chunk_x, chunk_z))
-    if not chunk or local_y < 0 or local_y >= CHUNK_SIZE:
-        return AIR
-    return chunk.voxels[local_x][local_y][local_z]
-
-def set_block(x, y, z, block_type):
-    chunk_x = math.floor(x / CHUNK_SIZE)
-    chunk_z = math.floor(z / CHUNK_SIZE)
-    local_x = (x % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-    local_y = y
-    local_z = (z % CHUNK_SIZE + CHUNK_SIZE) % CHUNK_SIZE
-    if local_y < 0 or local_y >= CHUNK_SIZE:
-        return
-    chunk = chunks.get((chunk_x, chunk_z))
-    if not chunk:
-        chunk = Chunk(chunk_x, chunk_z)
-        chunks[(chunk_x, chunk_z)] = chunk
-    old_block = chunk.voxels[local_x][local_y][local_z]
-    if block_type in falling_blocks and get_block(x, y-1, z) == AIR:
-        FallingBlock(position=(x, y, z), block_type=block_type)
-    else:
-        chunk.voxels[local_x][local_y][local_z] = block_type
-        chunk.rebuild_mesh()
-    if block_type == AIR:
-        for yy in range(local_y + 1, CHUNK_SIZE):
-            if chunk.voxels[local_x][yy][local_z] in falling_blocks and chunk.voxels[local_x][yy-1][local_z] == AIR:
-                fb_type = chunk.voxels[local_x][yy][local_z]
-                chunk.voxels[local_x][yy][local_z] = AIR
-                FallingBlock(position=(x, yy, z), block_type=fb_type)
-            else:
-                break
-        chunk.rebuild_mesh()
-    if old_block != AIR and block_type == AIR:
-        Item(position=(x, y + 0.5, z))
-
-# Player setup and initial chunks
-for cx in range(-2, 3):
-    for cz in range(-2, 3):
-        chunks[(cx, cz)] = Chunk(cx, cz)
+        chunk = chunks[chunk_key] = Chunk(*chunk_key)
+    chunk.apply_mesh(*buffers)
+
+def on_chunk_unloaded(chunk_key):
+    chunk = chunks.pop(chunk_key, None)
+    if chunk:
+        destroy(chunk)
+
+# The world: chunk voxels streamed around the player, generated and meshed
+# by the job workers, saved to storage, with falling blocks and dropped items
+rules = SCRIPT_RULES[SCRIPT_NAME]
+world = VoxelWorld(rules['generator'], WORLD_SEED, BLOCK_PALETTE, TRANSLUCENT_BLOCKS, greedy=GREEDY_MESHING, tiles=block_atlas.tiles, split=True,
+                   storage=storage, jobs=jobs, streamer=streamer, lod_distances=LOD_DISTANCES, falling_blocks=rules['falling_blocks'],
+                   on_meshed=on_chunk_meshed, on_unloaded=on_chunk_unloaded, profiler=profiler)
+atexit.register(world.save)
+
+# Dropped items, drawn instanced
+body_renderer = BodyRenderer(world.bodies, color.yellow)
+
+# Player setup and initial chunks: the spawn chunk is built right away so the
+# player has ground to stand on, the rest stream in around the player
+world.load_chunk(0, 0)
+on_chunk_meshed((0, 0), world.mesh_buffers(0, 0))
 
 # Spawn a few mobs
 for _ in range(5):
     Mob(position=(random.randint(-20, 20), 10, random.randint(-20, 20)))
 
-player = FirstPersonController()
-terrain_height = get_terrain_height(0, 0, 0, 0)
+player = VoxelFirstPersonController(world.is_solid)
+terrain_height = world.terrain_height(0, 0)
 player.position = (0, terrain_height + 2, 0)
 
-# Selected block type
-selected_block = DIRT
+# Block breaking and placing, and the selected block type
+block_editor = BlockEditor(world, rules['break_key'], rules['place_key'], rules['select_keys'])
+
+# Per-frame update
+def update():
+    global autosave_timer
+    profiler.end_frame()
+    world.update(time.dt, player.position, player.forward, UPLOAD_BUDGET)
+    with profiler.timer('culling'):
+        culler.update(chunks, camera)
+    with profiler.timer('translucent_sort'):
+        translucent_sorter.update(chunks, camera)
+    autosave_timer += time.dt
+    if autosave_timer >= AUTOSAVE_INTERVAL:
+        autosave_timer = 0
+        world.save()
 
 # Input handling
+@profiler.timed('input')
 def input(key):
-    global game_state, selected_block
+    global game_state
     if key == 'space' and game_state == STATE_MENU:
         game_state = STATE_PLAYING
         menu_text.enabled = False
-    elif key == '1':
-        selected_block = DIRT
-    elif key == '2':
-        selected_block = SAND
-    elif key == '3':
-        selected_block = GRAVEL
-    elif key == 'left mouse down' and game_state == STATE_PLAYING:
-        hit_info = raycast(player.position, player.forward, distance=5)
-        if hit_info.hit and hit_info.entity in [chunk for chunk in chunks.values()]:
-            targeted_pos = [math.floor(v) for v in hit_info.world_point]
-            block_type = get_block(*targeted_pos)
-            if block_type != AIR and block_type != BEDROCK:
-                set_block(*targeted_pos, AIR)
-    elif key == 'right mouse down' and game_state == STATE_PLAYING:
-        hit_info = raycast(player.position, player.forward, distance=5)
-        if hit_info.hit and hit_info.entity in [chunk for chunk in chunks.values()]:
-            targeted_pos = [math.floor(v) for v in hit_info.world_point]
-            direction = [round(n) for n in hit_info.normal]
-            new_pos = [t + d for t, d in zip(targeted_pos, direction)]
-            if get_block(*new_pos) == AIR:
-                set_block(*new_pos, selected_block)
+    else:
+        block_editor.input(key, camera.world_position, camera.forward, player.position, game_state == STATE_PLAYING)
+
+# Frame timer overlay (F3); F4 dumps the last frames into traces/
+profiler_overlay = ProfilerOverlay(profiler, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces', os.path.splitext(os.path.basename(__file__))[0]))
+
+# Input recording (F2) for headless replays with input_replay.py, which
+# runs the same world and block editor; record in a new world, replays start
+# from freshly generated terrain
+input_recording = InputRecording(player, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings', os.path.splitext(os.path.basename(__file__))[0]),
+                                 lambda: {'script': SCRIPT_NAME, 'seed': WORLD_SEED,
+                                          'playing': game_state == STATE_PLAYING, 'view_radius': VIEW_RADIUS,
+                                          'unload_radius': UNLOAD_RADIUS, 'lod_distances': LOD_DISTANCES, 'selected_block': block_editor.selected_block})
 
 # Run the app
 app.run()
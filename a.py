@@ -1,8 +1,20 @@
 from ursina import *
-from ursina.prefabs.first_person_controller import FirstPersonController
-import random
 import math
+import os
 import time
+from block_updates import BlockUpdateQueue
+from frame_profiler import FrameProfiler
+from profiler_overlay import ProfilerOverlay
+from chunk_storage import ChunkVoxels
+from block_atlas import BlockAtlas
+from structures import apply_pending, merge_pending, split_structure
+from terrain import chunk_rng, new_world_seed
+from voxel_collision import overlaps_block
+from voxel_player import VoxelFirstPersonController
+from voxel_raycast import raycast_voxels
+from chunk_culling import ChunkCuller, fog_distance
+from translucent_mesh import TranslucentMesh, TranslucentSorter
+from chunk_mesher import build_mesh_buffers, face_exposed, make_translucent_table, padded_volume
 
 # Initialize Ursina with optimizations
 app = Ursina(vsync=True, borderless=False, fullscreen=False)
@@ -10,6 +22,7 @@ window.size = (800, 600)
 window.title = 'Minecraft Alpha v1.0.1'
 window.exit_button.visible = False
 window.fps_counter.enabled = True
+profiler = FrameProfiler()  # Named per-frame timers: F3 shows them, F4 dumps a trace
 
 # Game states
 class GameState:
@@ -21,22 +34,22 @@ current_state = GameState.MENU
 
 # Minecraft Alpha 1.0 authentic block colors
 block_colors = {
-    'grass': color.rgb(117, 181, 67),
-    'dirt': color.rgb(134, 96, 67),
-    'stone': color.rgb(125, 125, 125),
-    'cobblestone': color.rgb(122, 122, 122),
-    'wood': color.rgb(156, 127, 78),
-    'leaves': color.rgb(87, 139, 52),
-    'sand': color.rgb(218, 210, 158),
-    'gravel': color.rgb(126, 124, 122),
-    'coal_ore': color.rgb(115, 115, 115),
-    'iron_ore': color.rgb(136, 130, 127),
-    'gold_ore': color.rgb(143, 140, 125),
-    'diamond_ore': color.rgb(129, 140, 143),
-    'bedrock': color.rgb(85, 85, 85),
-    'water': color.rgba(47, 67, 244, 128),
-    'planks': color.rgb(159, 132, 77),
-    'glass': color.rgba(255, 255, 255, 128)
+    'grass': color.rgb32(117, 181, 67),
+    'dirt': color.rgb32(134, 96, 67),
+    'stone': color.rgb32(125, 125, 125),
+    'cobblestone': color.rgb32(122, 122, 122),
+    'wood': color.rgb32(156, 127, 78),
+    'leaves': color.rgb32(87, 139, 52),
+    'sand': color.rgb32(218, 210, 158),
+    'gravel': color.rgb32(126, 124, 122),
+    'coal_ore': color.rgb32(115, 115, 115),
+    'iron_ore': color.rgb32(136, 130, 127),
+    'gold_ore': color.rgb32(143, 140, 125),
+    'diamond_ore': color.rgb32(129, 140, 143),
+    'bedrock': color.rgb32(85, 85, 85),
+    'water': color.rgba32(47, 67, 244, 128),
+    'planks': color.rgb32(159, 132, 77),
+    'glass': color.rgba32(255, 255, 255, 128)
 }
 
 # Block properties with fixed values
@@ -68,108 +81,152 @@ breaking_block = None
 break_time = 0
 break_overlay = None
 
-# Optimized voxel class
-class Voxel(Button):
-    def __init__(self, position=(0,0,0), block_type='grass'):
-        super().__init__(
-            parent=scene,
-            position=position,
-            model='cube',
-            origin_y=.5,
-            color=block_colors.get(block_type, color.white),
-            texture='white_cube' if 'ore' in block_type else 'white_cube',
-            scale=1,
-            collider='box'
-        )
-        self.block_type = block_type
-        self.properties = block_properties.get(block_type, {'gravity': False, 'hardness': 1.0})
-        self.falling = False
-        
-        # Schedule gravity check for gravity blocks
-        if self.properties.get('gravity', False):
-            invoke(self.check_gravity, delay=0.1)
-    
-    def check_gravity(self):
-        if not self.properties.get('gravity', False) or self.falling:
-            return
-        
-        # Check if there's a block below
-        below_pos = self.position + Vec3(0, -1, 0)
-        for entity in scene.entities:
-            if isinstance(entity, Voxel) and entity.position == below_pos:
-                return
-        
-        # No block below, start falling
-        self.falling = True
-        self.fall()
-    
-    def fall(self):
-        if not self.falling:
-            return
-            
-        # Check the position below
-        below_pos = self.position + Vec3(0, -1, 0)
-        
-        # Check if we hit ground or another block
-        hit_ground = False
-        for entity in scene.entities:
-            if isinstance(entity, Voxel) and entity.position == below_pos:
-                hit_ground = True
-                break
-        
-        if below_pos.y <= 0:  # Hit bedrock level
-            hit_ground = True
-        
-        if not hit_ground:
-            # Continue falling
-            self.position = below_pos
-            invoke(self.fall, delay=0.1)
-        else:
-            # Stop falling
-            self.falling = False
+# Block ids for the chunk store: 0 is air, the rest follow block_colors
+AIR = 0
+block_ids = {name: block for block, name in enumerate(block_colors, start=1)}
+block_names = {block: name for name, block in block_ids.items()}
+
+# Chunk settings
+CHUNK_SIZE = 16
+GREEDY_MESHING = True  # Merge coplanar faces of the same block into larger quads
+WORLD_SEED = new_world_seed()  # Terrain seed for this session
+chunks = {}
+dirty_chunks = set()
+block_updates = BlockUpdateQueue(tick_length=0.1)  # Gravity blocks fall one block every 0.1 s
+
+# Mesh lookup tables
+TRANSLUCENT_BLOCKS = make_translucent_table({block_ids['water'], block_ids['glass']})
+
+# Chunk texture: an atlas tile per block face type, so every chunk is drawn
+# with the one texture. Ores are stone flecked with their mineral.
+ore_colors = {
+    'coal_ore': color.rgb32(30, 30, 30),
+    'iron_ore': color.rgb32(216, 175, 147),
+    'gold_ore': color.rgb32(252, 238, 75),
+    'diamond_ore': color.rgb32(93, 236, 245),
+}
+block_tiles = {name: ('noise', block_color) for name, block_color in block_colors.items()}
+block_tiles.update({name: ('ore', block_colors['stone'], ore_color) for name, ore_color in ore_colors.items()})
+block_tiles['grass'] = {'top': ('noise', block_colors['grass']), 'side': ('grass_side', block_colors['dirt'], block_colors['grass']),
+                        'bottom': ('noise', block_colors['dirt'])}
+block_tiles['wood'] = {'top': ('rings', block_colors['planks'], block_colors['wood']), 'side': ('bark', block_colors['wood'])}
+block_tiles['planks'] = ('planks', block_colors['planks'])
+block_tiles['glass'] = ('glass', block_colors['glass'])
+block_atlas = BlockAtlas({block_ids[name]: tile for name, tile in block_tiles.items()})
+
+# One entity per 16x16x16 chunk, drawn as a single combined mesh
+class Chunk(Entity):
+    def __init__(self, chunk_x, chunk_z):
+        super().__init__(parent=scene, texture=block_atlas.texture, shader=block_atlas.shader)
+        self.translucent = TranslucentMesh(self, texture=block_atlas.texture, shader=block_atlas.shader)
+        self.chunk_x = chunk_x
+        self.chunk_z = chunk_z
+        self.voxels = ChunkVoxels(CHUNK_SIZE)
     
-    def input(self, key):
-        global breaking_block, break_time, break_overlay
-        
-        if self.hovered and current_state == GameState.PLAYING:
-            # Place blocks with right click
-            if key == 'right mouse down':
-                # Calculate placement position
-                hit_info = raycast(camera.world_position, camera.forward, distance=5)
-                if hit_info.hit and hit_info.entity == self:
-                    new_pos = self.position + hit_info.normal
-                    # Check if position is empty
-                    position_empty = True
-                    for entity in scene.entities:
-                        if isinstance(entity, Voxel) and entity.position == new_pos:
-                            position_empty = False
-                            break
-                    
-                    if position_empty:
-                        new_voxel = Voxel(position=new_pos, block_type=hotbar.current_block)
-
-            # Start breaking blocks with left click
-            elif key == 'left mouse down' and self.properties['hardness'] >= 0:
-                breaking_block = self
-                break_time = 0
-                # Create break overlay
-                if break_overlay:
-                    destroy(break_overlay)
-                break_overlay = Entity(
-                    parent=scene,
-                    model='cube',
-                    color=color.rgba(0, 0, 0, 50),
-                    position=self.position,
-                    scale=1.01
-                )
-            
-            elif key == 'left mouse up':
-                # Stop breaking
-                breaking_block = None
-                break_time = 0
-                if break_overlay:
-                    destroy(break_overlay)
-                    break_overlay = None
+    def rebuild_mesh(self):
+        padded = padded_volume(self.voxels.data, neighbour_voxels(self.chunk_x, self.chunk_z))
+        origin = (self.chunk_x * CHUNK_SIZE, 0, self.chunk_z * CHUNK_SIZE)
+        opaque, translucent = build_mesh_buffers(padded, None, TRANSLUCENT_BLOCKS, origin=origin, greedy=GREEDY_MESHING,
+                                                 tiles=block_atlas.tiles, split=True)
+        vertices, triangles, uvs = opaque
+        self.model = Mesh(vertices=vertices.ravel(), triangles=triangles, uvs=uvs.ravel(), mode='triangle')
+        self.translucent.apply_buffers(*translucent)
+
+# Voxel arrays of the six adjacent chunks in FACE_NORMALS order (chunks span
+# the full world height, so there is nothing above or below)
+def neighbour_voxels(chunk_x, chunk_z):
+    def voxels_at(chunk_key):
+        chunk = chunks.get(chunk_key)
+        return chunk.voxels.data if chunk else None
+    return (voxels_at((chunk_x + 1, chunk_z)), voxels_at((chunk_x - 1, chunk_z)), None, None,
+            voxels_at((chunk_x, chunk_z + 1)), voxels_at((chunk_x, chunk_z - 1)))
+
+def get_block(x, y, z):
+    chunk = chunks.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+    if not chunk or not 0 <= y < CHUNK_SIZE:
+        return AIR
+    return chunk.voxels.get_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE)
+
+# Blocks the player collides with (everything but air, as the chunk mesh
+# colliders used to)
+def is_solid(x, y, z):
+    return get_block(x, y, z) != AIR
+
+# Write a block id without remeshing, creating the chunk if needed
+def write_block(x, y, z, block):
+    if not 0 <= y < CHUNK_SIZE:
+        return AIR
+    chunk_key = (x // CHUNK_SIZE, z // CHUNK_SIZE)
+    chunk = chunks.get(chunk_key)
+    if not chunk:
+        chunk = chunks[chunk_key] = Chunk(*chunk_key)
+    old_block = chunk.voxels.get_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE)
+    chunk.voxels.set_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE, block)
+    return old_block
+
+# Place or remove a block by name ('air' removes) and queue the remesh of its
+# chunk, plus any neighbouring chunk whose border face changes visibility
+def set_block(x, y, z, block_type):
+    block = block_ids.get(block_type, AIR)
+    old_block = write_block(x, y, z, block)
+    if old_block == block or not 0 <= y < CHUNK_SIZE:
+        return
+    chunk_key = (x // CHUNK_SIZE, z // CHUNK_SIZE)
+    dirty_chunks.add(chunk_key)
+    for nx, nz in ((x - 1, z), (x + 1, z), (x, z - 1), (x, z + 1)):
+        neighbour_key = (nx // CHUNK_SIZE, nz // CHUNK_SIZE)
+        if neighbour_key == chunk_key or neighbour_key not in chunks:
+            continue
+        neighbour = get_block(nx, y, nz)
+        if face_exposed(neighbour, old_block, TRANSLUCENT_BLOCKS) != face_exposed(neighbour, block, TRANSLUCENT_BLOCKS):
+            dirty_chunks.add(neighbour_key)
+
+# Rebuild every chunk edited since the last frame, once per chunk
+@profiler.timed('remesh')
+def remesh_dirty_chunks():
+    for chunk_key in dirty_chunks:
+        chunk = chunks.get(chunk_key)
+        if chunk:
+            chunk.rebuild_mesh()
+    dirty_chunks.clear()
+
+def get_block_name(x, y, z):
+    return block_names.get(get_block(x, y, z))
+
+def get_block_properties(block_type):
+    return block_properties.get(block_type, {'gravity': False, 'hardness': 1.0})
+
+# Gravity blocks fall through scheduled block updates, one block per tick
+def check_gravity(x, y, z):
+    block_updates.schedule((x, y, z))
+
+# Move every due gravity block with air beneath it down one block and check it
+# again next tick, along with the block above the gap it leaves. Positions come
+# bottom first, so a whole column drops together.
+@profiler.timed('block_updates')
+def update_falling_blocks(positions):
+    for x, y, z in positions:
+        block_type = get_block_name(x, y, z)
+        if not block_type or not get_block_properties(block_type).get('gravity', False):
+            continue
+        if y - 1 <= 0 or get_block(x, y - 1, z) != AIR:  # Hit ground, another block or bedrock level
+            continue
+        set_block(x, y, z, 'air')
+        set_block(x, y - 1, z, block_type)
+        block_updates.schedule((x, y - 1, z))
+        block_updates.schedule((x, y + 1, z))
+
+# Block under the crosshair and the face normal it was hit on
+def target_block(distance=5):
+    return raycast_voxels(camera.world_position, camera.forward, distance, get_block)
+
+def stop_breaking():
+    global breaking_block, break_time, break_overlay
+    breaking_block = None
+    break_time = 0
+    if break_overlay:
+        destroy(break_overlay)
+        break_overlay = None
 
 # Inventory system
 class Inventory(Entity):
@@ -337,75 +394,107 @@ class Hotbar:
         for i, (bg, slot) in enumerate(self.slots):
             bg.color = color.white if i == self.current_index else color.rgb(50, 50, 50)
 
+# One column of terrain: bedrock, stone with ores, dirt and grass. Returns the
+# blocks of the tree rooted on it, if any.
+def generate_column(x, z, rng):
+    # Generate height using perlin-like noise
+    height = int(4 + 3 * math.sin(x * 0.1) * math.cos(z * 0.1) + 
+                rng.uniform(-1, 1))
+    height = max(1, min(height, 8))
+    
+    # Bedrock layer
+    write_block(x, 0, z, block_ids['bedrock'])
+    
+    # Generate layers
+    for y in range(1, height + 1):
+        if y == height:
+            write_block(x, y, z, block_ids['grass'])
+        elif y > height - 3:
+            write_block(x, y, z, block_ids['dirt'])
+        else:
+            # Ore generation
+            ore_chance = rng.random()
+            if y < 3 and ore_chance < 0.02:
+                block = 'diamond_ore'
+            elif ore_chance < 0.05:
+                block = 'coal_ore'
+            elif ore_chance < 0.08:
+                block = 'iron_ore'
+            elif y < 8 and ore_chance < 0.1:
+                block = 'gold_ore'
+            else:
+                block = 'stone'
+            write_block(x, y, z, block_ids[block])
+    
+    # Tree generation, returned as (x, y, z, block) for the structure stage
+    tree = []
+    if rng.random() < 0.02 and height > 4:
+        trunk_height = rng.randint(4, 6)
+        # Trunk
+        for h in range(trunk_height):
+            tree.append((x, height + h + 1, z, block_ids['wood']))
+        
+        # Leaves
+        leaf_start = height + trunk_height - 1
+        for ly in range(3):
+            for lx in range(-2, 3):
+                for lz in range(-2, 3):
+                    if abs(lx) + abs(lz) <= 3 - ly:
+                        if not (lx == 0 and lz == 0 and ly < 2):
+                            tree.append((x + lx, leaf_start + ly, z + lz, block_ids['leaves']))
+    return tree
+
 # Terrain generation
+@profiler.timed('terrain')
 def generate_terrain():
     # Clear existing terrain
-    for entity in scene.entities[:]:
-        if isinstance(entity, Voxel):
-            destroy(entity)
+    for chunk in chunks.values():
+        destroy(chunk)
+    chunks.clear()
+    dirty_chunks.clear()
     
     world_size = 20
-    chunk_updates = []
+    pending = {}
     
-    for z in range(-world_size, world_size):
-        for x in range(-world_size, world_size):
-            # Generate height using perlin-like noise
-            height = int(4 + 3 * math.sin(x * 0.1) * math.cos(z * 0.1) + 
-                        random.uniform(-1, 1))
-            height = max(1, min(height, 8))
-            
-            # Bedrock layer
-            Voxel(position=(x, 0, z), block_type='bedrock')
-            
-            # Generate layers
-            for y in range(1, height + 1):
-                if y == height:
-                    Voxel(position=(x, y, z), block_type='grass')
-                elif y > height - 3:
-                    Voxel(position=(x, y, z), block_type='dirt')
-                else:
-                    # Ore generation
-                    ore_chance = random.random()
-                    if y < 3 and ore_chance < 0.02:
-                        block = 'diamond_ore'
-                    elif ore_chance < 0.05:
-                        block = 'coal_ore'
-                    elif ore_chance < 0.08:
-                        block = 'iron_ore'
-                    elif y < 8 and ore_chance < 0.1:
-                        block = 'gold_ore'
-                    else:
-                        block = 'stone'
-                    Voxel(position=(x, y, z), block_type=block)
-            
-            # Tree generation
-            if random.random() < 0.02 and height > 4:
-                trunk_height = random.randint(4, 6)
-                # Trunk
-                for h in range(trunk_height):
-                    Voxel(position=(x, height + h + 1, z), block_type='wood')
-                
-                # Leaves
-                leaf_start = height + trunk_height - 1
-                for ly in range(3):
-                    for lx in range(-2, 3):
-                        for lz in range(-2, 3):
-                            if abs(lx) + abs(lz) <= 3 - ly:
-                                if not (lx == 0 and lz == 0 and ly < 2):
-                                    Voxel(position=(x + lx, leaf_start + ly, z + lz), 
-                                         block_type='leaves')
+    # Each chunk draws from its own generator, seeded from the world seed and
+    # the chunk position, so the world does not depend on generation order
+    for chunk_z in range(-world_size // CHUNK_SIZE, (world_size - 1) // CHUNK_SIZE + 1):
+        for chunk_x in range(-world_size // CHUNK_SIZE, (world_size - 1) // CHUNK_SIZE + 1):
+            rng = chunk_rng(WORLD_SEED, chunk_x, chunk_z)
+            trees = []
+            for z in range(max(chunk_z * CHUNK_SIZE, -world_size), min((chunk_z + 1) * CHUNK_SIZE, world_size)):
+                for x in range(max(chunk_x * CHUNK_SIZE, -world_size), min((chunk_x + 1) * CHUNK_SIZE, world_size)):
+                    trees.extend(generate_column(x, z, rng))
+            # Trees go in once the chunk's terrain is done; blocks reaching
+            # into other chunks wait until every chunk has its terrain
+            inside, outside = split_structure(chunk_x, chunk_z, trees)
+            for local_x, y, local_z, block in inside:
+                write_block(chunk_x * CHUNK_SIZE + local_x, y, chunk_z * CHUNK_SIZE + local_z, block)
+            merge_pending(pending, outside)
+    
+    for chunk_key, writes in pending.items():
+        chunk = chunks.get(chunk_key)
+        if not chunk:
+            chunk = chunks[chunk_key] = Chunk(*chunk_key)
+        apply_pending(chunk.voxels.data, writes)
+    
+    # One mesh per chunk, built once all chunks exist so borders are culled
+    for chunk in chunks.values():
+        chunk.rebuild_mesh()
 
 # Set up scene
 scene.fog_color = color.rgb(198, 215, 251)
 scene.fog_density = 0.02
 sky = Sky()
+culler = ChunkCuller(fog_distance(scene.fog_density))  # Chunks hidden by the fog are not drawn
+translucent_sorter = TranslucentSorter()  # Water and glass drawn back to front after opaque blocks
 
 # Player
-player = FirstPersonController(
+player = VoxelFirstPersonController(
+    is_solid,
     position=(0, 10, 0),
     speed=4.3,
     jump_height=1.25,
-    jump_duration=0.25,
     gravity=1.0,
     enabled=False,
     mouse_sensitivity=Vec2(40, 40)
@@ -434,72 +523,79 @@ crosshair2 = Entity(
     enabled=False
 )
 
+# Day/night cycle: advance the time of day and tint the sky and fog
+@profiler.timed('day_night')
+def update_day_night():
+    global day_time
+    
+    day_time += time.dt / day_length
+    if day_time > 1:
+        day_time = 0
+    
+    # Sky color based on time
+    if day_time < 0.25:  # Morning
+        t = day_time * 4
+        sky.color = color.rgb(
+            int(20 + 115 * t),
+            int(24 + 182 * t),
+            int(82 + 153 * t)
+        )
+        scene.fog_color = sky.color
+        
+    elif day_time < 0.5:  # Day
+        sky.color = color.rgb(135, 206, 235)
+        scene.fog_color = color.rgb(198, 215, 251)
+        
+    elif day_time < 0.75:  # Evening
+        t = (day_time - 0.5) * 4
+        sky.color = color.rgb(
+            int(135 + 120 * t),
+            int(206 - 112 * t),
+            int(235 - 158 * t)
+        )
+        scene.fog_color = sky.color
+        
+    else:  # Night
+        sky.color = color.rgb(20, 24, 82)
+        scene.fog_color = color.rgb(20, 24, 82)
+
 # Update function
 def update():
-    global day_time, breaking_block, break_time, break_overlay
+    global breaking_block, break_time, break_overlay
+    profiler.end_frame()
     
     if current_state == GameState.PLAYING:
-        # Day/night cycle
-        day_time += time.dt / day_length
-        if day_time > 1:
-            day_time = 0
-        
-        # Sky color based on time
-        if day_time < 0.25:  # Morning
-            t = day_time * 4
-            sky.color = color.rgb(
-                int(20 + 115 * t),
-                int(24 + 182 * t),
-                int(82 + 153 * t)
-            )
-            scene.fog_color = sky.color
-            
-        elif day_time < 0.5:  # Day
-            sky.color = color.rgb(135, 206, 235)
-            scene.fog_color = color.rgb(198, 215, 251)
-            
-        elif day_time < 0.75:  # Evening
-            t = (day_time - 0.5) * 4
-            sky.color = color.rgb(
-                int(135 + 120 * t),
-                int(206 - 112 * t),
-                int(235 - 158 * t)
-            )
-            scene.fog_color = sky.color
-            
-        else:  # Night
-            sky.color = color.rgb(20, 24, 82)
-            scene.fog_color = color.rgb(20, 24, 82)
+        update_day_night()
         
         # Block breaking
         if breaking_block and mouse.left:
             break_time += time.dt
-            hardness = breaking_block.properties['hardness']
+            hardness = get_block_properties(get_block_name(*breaking_block))['hardness']
             
             if hardness > 0 and break_time >= hardness:
                 # Break the block
-                if breaking_block.position[1] > 0:  # Don't break bedrock
+                x, y, z = breaking_block
+                if y > 0:  # Don't break bedrock
+                    set_block(x, y, z, 'air')
                     # Check for gravity blocks above
-                    above_pos = breaking_block.position + Vec3(0, 1, 0)
-                    for entity in scene.entities:
-                        if isinstance(entity, Voxel) and entity.position == above_pos:
-                            if entity.properties.get('gravity', False):
-                                entity.check_gravity()
-                    
-                    destroy(breaking_block)
-                    
-                breaking_block = None
-                break_time = 0
-                if break_overlay:
-                    destroy(break_overlay)
-                    break_overlay = None
+                    check_gravity(x, y + 1, z)
+                stop_breaking()
             else:
                 # Update break overlay
                 if break_overlay:
                     progress = break_time / hardness if hardness > 0 else 0
                     break_overlay.color = color.rgba(0, 0, 0, int(50 + 150 * progress))
+    
+    for positions in block_updates.advance(time.dt):
+        update_falling_blocks(positions)
+    remesh_dirty_chunks()
+    with profiler.timer('culling'):
+        culler.update(chunks, camera)
+    with profiler.timer('translucent_sort'):
+        translucent_sorter.update(chunks, camera)
 
 # Input handler
+@profiler.timed('input')
 def input(key):
     global current_state, breaking_block, break_time, break_overlay
     
@@ -515,11 +611,7 @@ def input(key):
             crosshair2.enabled = False
             inventory.enabled = False
             # Clear breaking state
-            breaking_block = None
-            break_time = 0
-            if break_overlay:
-                destroy(break_overlay)
-                break_overlay = None
+            stop_breaking()
         else:
             application.quit()
     
@@ -547,12 +639,44 @@ def input(key):
             hotbar.current_block = hotbar.blocks[hotbar.current_index]
             hotbar.update_selection()
         
+        # Place blocks with right click
+        if key == 'right mouse down':
+            block_pos, normal = target_block()
+            if block_pos:
+                new_pos = tuple(int(p + n) for p, n in zip(block_pos, normal))
+                # Check the position is empty and not inside the player
+                if get_block(*new_pos) == AIR and not overlaps_block(player.position, player.size, new_pos):
+                    set_block(*new_pos, hotbar.current_block)
+                    check_gravity(*new_pos)
+        
+        # Start breaking blocks with left click
+        elif key == 'left mouse down':
+            block_pos, normal = target_block()
+            if block_pos and get_block_properties(get_block_name(*block_pos))['hardness'] >= 0:
+                stop_breaking()
+                breaking_block = block_pos
+                # Create break overlay
+                break_overlay = Entity(
+                    parent=scene,
+                    model='cube',
+                    color=color.rgba(0, 0, 0, 50),
+                    position=Vec3(*block_pos) + Vec3(0.5, 0.5, 0.5),
+                    scale=1.01
+                )
+        
+        elif key == 'left mouse up':
+            # Stop breaking
+            stop_breaking()
+        
         # Sprint
         if key == 'left shift':
             player.speed = 6.5
         elif key == 'left shift up':
             player.speed = 4.3
 
+# Frame timer overlay (F3); F4 dumps the last frames into traces/
+profiler_overlay = ProfilerOverlay(profiler, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces', os.path.splitext(os.path.basename(__file__))[0]))
+
 # Run the game
 if __name__ == '__main__':
     app.run()
@@ -0,0 +1,559 @@
+import argparse
+import json
+import math
+import platform
+import random
+import tempfile
+import time
+
+import numpy as np
+from panda3d.core import CollisionNode, CollisionPolygon, Point3
+from perlin_noise import PerlinNoise
+
+from chunk_culling import boxes_visible, frustum_planes
+from chunk_lod import LOD_FACTORS, build_lod_mesh_buffers
+from chunk_mesher import back_to_front_triangles, build_mesh_buffers, make_translucent_table, padded_volume
+from chunk_storage import CHUNK_SIZE, ChunkVoxels
+from input_replay import replay, write_scripted_session
+from physics_bodies import PhysicsBodies, ground_heights
+from region_file import WorldStorage
+from terrain import generate_flat_chunk, generate_hills_chunk, generate_perlin_area, generate_perlin_chunk
+from voxel_collision import PLAYER_HEIGHT, PLAYER_WIDTH, move_aabb
+from voxel_world import SCRIPT_RULES, VoxelWorld
+
+# Block types (as in MINECRAFT4K1.1.A5.24.py)
+AIR = 0
+DIRT = 1
+WATER = 2
+GLASS = 3
+BEDROCK = 4
+STONE = 5
+GRASS = 6
+SAND = 8
+
+PALETTE = np.ones((256, 4), dtype=np.float32)
+TRANSLUCENT_BLOCKS = make_translucent_table({WATER, GLASS})
+TILES = np.zeros((256, 6, 2), dtype=np.uint8)  # Atlas tile table (every face on tile 0) for textured meshing
+
+
+# Seeded (2 * radius + 1)^2 chunk world of the Perlin terrain of
+# MINECRAFT4K1.1.A5.24.py, trees included; tree blocks reaching past the
+# area are dropped
+def seeded_world(seed, radius=2):
+    chunks, pending = generate_perlin_area(-radius, -radius, 2 * radius + 1, 2 * radius + 1, seed)
+    return {chunk_key: ChunkVoxels(CHUNK_SIZE, voxels) for chunk_key, voxels in chunks.items()}
+
+
+# The same columns generated with one PerlinNoise call per column and per
+# block (no trees), as the Perlin script did before terrain's noise grids:
+# the baseline of bench_generation
+def per_column_world(seed, radius=2):
+    noise = PerlinNoise(octaves=4, seed=seed)
+    world = {}
+    for cx in range(-radius, radius + 1):
+        for cz in range(-radius, radius + 1):
+            voxels = ChunkVoxels(CHUNK_SIZE)
+            for x in range(CHUNK_SIZE):
+                for z in range(CHUNK_SIZE):
+                    world_x = cx * CHUNK_SIZE + x
+                    world_z = cz * CHUNK_SIZE + z
+                    desert = noise([world_x / 100, world_z / 100]) < -0.1
+                    height = min(int((noise([world_x / 50, world_z / 50]) + 1) * 5) + 5, CHUNK_SIZE - 1)
+                    column = np.full(CHUNK_SIZE, AIR, dtype=np.uint8)
+                    column[1:max(height - 3, 1)] = STONE
+                    column[max(height - 3, 1):height] = SAND if desert else DIRT
+                    column[height] = SAND if desert else GRASS
+                    column[0] = BEDROCK
+                    voxels.set_column(x, z, column)
+            world[(cx, cz)] = voxels
+    return world
+
+
+def world_neighbours(world, cx, cz):
+    def voxels_at(key):
+        voxels = world.get(key)
+        return voxels.data if voxels is not None else None
+    return (voxels_at((cx + 1, cz)), voxels_at((cx - 1, cz)), None, None,
+            voxels_at((cx, cz + 1)), voxels_at((cx, cz - 1)))
+
+
+# Quad counts and mesh build time of the per-face mesher vs. greedy meshing
+def bench_greedy(seeds):
+    print(f"{'seed':>6} {'chunks':>6} {'quads':>8} {'greedy':>8} {'ratio':>6} {'ms/chunk':>9} {'greedy ms':>9}")
+    for seed in seeds:
+        world = seeded_world(seed)
+        counts = {False: 0, True: 0}
+        timings = {False: 0.0, True: 0.0}
+        for (cx, cz), voxels in world.items():
+            padded = padded_volume(voxels.data, world_neighbours(world, cx, cz))
+            for greedy in (False, True):
+                start = time.perf_counter()
+                vertices, triangles, colors = build_mesh_buffers(padded, PALETTE, TRANSLUCENT_BLOCKS, greedy=greedy)
+                timings[greedy] += time.perf_counter() - start
+                counts[greedy] += len(vertices) // 4
+        chunk_count = len(world)
+        print(f"{seed:>6} {chunk_count:>6} {counts[False]:>8} {counts[True]:>8} "
+              f"{counts[False] / max(counts[True], 1):>6.1f} "
+              f"{timings[False] * 1000 / chunk_count:>9.2f} {timings[True] * 1000 / chunk_count:>9.2f}")
+
+
+# Loading saved chunks from region files vs. generating them with PerlinNoise
+def bench_storage(seed, radius):
+    keys = [(cx, cz) for cx in range(-radius, radius + 1) for cz in range(-radius, radius + 1)]
+    start = time.perf_counter()
+    generated = {key: generate_perlin_chunk(*key, seed)[0] for key in keys}
+    generate_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as path:
+        world = WorldStorage(path)
+        start = time.perf_counter()
+        for key, voxels in generated.items():
+            world.save_chunk(*key, voxels)
+        world.flush()
+        save_time = time.perf_counter() - start
+        world.close()
+
+        world = WorldStorage(path)
+        start = time.perf_counter()
+        for key in keys:
+            world.load_chunk(*key)
+        load_time = time.perf_counter() - start
+        world.close()
+
+    count = len(keys)
+    print(f"{count} chunks: generate {generate_time * 1000 / count:.2f} ms/chunk, "
+          f"save {save_time * 1000 / count:.3f} ms/chunk, load {load_time * 1000 / count:.3f} ms/chunk "
+          f"({generate_time / load_time:.0f}x faster than generating)")
+
+
+# Chunks per second of per-column PerlinNoise calls vs. the NumPy noise grids,
+# one chunk at a time and for the whole area at once
+def bench_generation(seed, radius):
+    width = 2 * radius + 1
+    count = width * width
+    start = time.perf_counter()
+    per_column_world(seed, radius)
+    column_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for cx in range(-radius, radius + 1):
+        for cz in range(-radius, radius + 1):
+            generate_perlin_chunk(cx, cz, seed)
+    chunk_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generate_perlin_area(-radius, -radius, width, width, seed)
+    area_time = time.perf_counter() - start
+
+    print(f"{count} chunks: per-column noise {count / column_time:.0f} chunks/s, "
+          f"grid per chunk {count / chunk_time:.0f} chunks/s, "
+          f"grid per area {count / area_time:.0f} chunks/s")
+
+
+# Per-frame ground height lookups of dropped items: scanning the column (the
+# old get_terrain_height) vs. the chunk heightmap, over a frame's worth of calls
+def bench_heightmap(item_counts, frames=100):
+    voxels = seeded_world(1, 0)[(0, 0)]
+    rng = random.Random(0)
+    print(f"{'items':>6} {'scan ms/frame':>14} {'heightmap ms/frame':>19}")
+    for count in item_counts:
+        columns = [(rng.randrange(CHUNK_SIZE), rng.randrange(CHUNK_SIZE)) for _ in range(count)]
+        start = time.perf_counter()
+        for _ in range(frames):
+            for x, z in columns:
+                solid = np.flatnonzero(voxels.column(x, z) != AIR)
+                int(solid[-1]) if len(solid) else 0
+        scan_time = (time.perf_counter() - start) / frames
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            for x, z in columns:
+                max(voxels.height(x, z), 0)
+        heightmap_time = (time.perf_counter() - start) / frames
+        print(f"{count:>6} {scan_time * 1000:>14.3f} {heightmap_time * 1000:>19.3f}")
+
+
+# Per-frame cost of dropped items: the old per-entity update (floor/mod math,
+# chunk dict lookup and column scan for every item) vs. one PhysicsBodies step.
+# The step has a fixed cost of a few dozen array operations, so the entity
+# loop wins for a handful of bodies; the last line reports the crossover.
+def bench_bodies(body_counts, frames=200):
+    world = seeded_world(1, 2)
+    rng = random.Random(0)
+    span = 2 * CHUNK_SIZE
+    print(f"{'bodies':>7} {'entities ms/frame':>18} {'batched ms/frame':>17}")
+    faster = []
+    for count in body_counts:
+        spawns = [(rng.uniform(-span, span), CHUNK_SIZE, rng.uniform(-span, span)) for _ in range(count)]
+
+        items = [[x, y, z, 0.0] for x, y, z in spawns]
+        start = time.perf_counter()
+        for _ in range(frames):
+            for item in items:
+                voxels = world.get((math.floor(item[0] / CHUNK_SIZE), math.floor(item[2] / CHUNK_SIZE)))
+                solid = np.flatnonzero(voxels.column(math.floor(item[0]) % CHUNK_SIZE, math.floor(item[2]) % CHUNK_SIZE) != AIR)
+                terrain_height = int(solid[-1]) if len(solid) else 0
+                if item[1] <= terrain_height + 1:
+                    item[1] = terrain_height + 1
+                    item[3] = 0.0
+                else:
+                    item[3] -= 0.1
+                    item[1] += item[3] / 60 * 10
+        entity_time = (time.perf_counter() - start) / frames
+
+        bodies = PhysicsBodies()
+        for position in spawns:
+            bodies.spawn_item(position, DIRT)
+        start = time.perf_counter()
+        for _ in range(frames):
+            bodies.step(1 / 60, lambda xs, zs: ground_heights(world.get, xs, zs))
+        batched_time = (time.perf_counter() - start) / frames
+        print(f"{count:>7} {entity_time * 1000:>18.3f} {batched_time * 1000:>17.3f}")
+        faster.append(batched_time < entity_time)
+    slower = [count for count, wins in zip(body_counts, faster) if not wins]
+    if not slower:
+        print("batched step faster at every count measured")
+    elif all(not wins for wins in faster):
+        print("batched step slower at every count measured")
+    else:
+        print(f"batched step slower up to {max(slower)} bodies, faster above")
+
+
+# Block lookup by world position through the chunk dict (as get_block in a.py
+# and the chunk scripts do) vs. the old linear scan over every block entity
+def bench_lookup(radii, lookups=20000, scans=50):
+    print(f"{'chunks':>7} {'blocks':>9} {'index ns':>9} {'scan us':>9}")
+    rng = random.Random(0)
+    for radius in radii:
+        world = {}
+        for cx in range(-radius, radius + 1):
+            for cz in range(-radius, radius + 1):
+                voxels = ChunkVoxels(CHUNK_SIZE)
+                voxels[:, :8, :] = STONE
+                world[(cx, cz)] = voxels
+        span = (2 * radius + 1) * CHUNK_SIZE
+        positions = [(rng.randrange(-radius * CHUNK_SIZE, span - radius * CHUNK_SIZE), rng.randrange(CHUNK_SIZE),
+                      rng.randrange(-radius * CHUNK_SIZE, span - radius * CHUNK_SIZE)) for _ in range(lookups)]
+
+        start = time.perf_counter()
+        for x, y, z in positions:
+            voxels = world.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+            if voxels is not None:
+                voxels.get_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE)
+        index_time = (time.perf_counter() - start) / lookups
+
+        solid = [(x, y, z) for x in range(-radius * CHUNK_SIZE, span - radius * CHUNK_SIZE)
+                 for z in range(-radius * CHUNK_SIZE, span - radius * CHUNK_SIZE) for y in range(8)]
+        start = time.perf_counter()
+        for target in positions[:scans]:
+            for position in solid:
+                if position == target:
+                    break
+        scan_time = (time.perf_counter() - start) / scans
+
+        print(f"{len(world):>7} {len(solid):>9} {index_time * 1e9:>9.0f} {scan_time * 1e6:>9.0f}")
+
+
+# Chunk remesh with and without the triangle collision mesh that
+# collider = 'mesh' built (one CollisionPolygon per triangle, as Ursina's
+# MeshCollider does), and the per-frame cost of the voxel box collision
+# that replaced it
+def bench_collision(seed, frames=1000):
+    world = seeded_world(seed)
+    mesh_time = collider_time = 0.0
+    polygons = 0
+    for (cx, cz), voxels in world.items():
+        padded = padded_volume(voxels.data, world_neighbours(world, cx, cz))
+        start = time.perf_counter()
+        vertices, triangles, colors = build_mesh_buffers(padded, PALETTE, TRANSLUCENT_BLOCKS)
+        mesh_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        node = CollisionNode('chunk')
+        points = vertices[triangles.reshape(-1, 3)].tolist()
+        for a, b, c in points:
+            node.addSolid(CollisionPolygon(Point3(*c), Point3(*b), Point3(*a)))
+        collider_time += time.perf_counter() - start
+        polygons += node.getNumSolids()
+    chunk_count = len(world)
+    print(f"remesh ms/chunk: {mesh_time * 1000 / chunk_count:.2f} without collider, "
+          f"{(mesh_time + collider_time) * 1000 / chunk_count:.2f} with mesh collider "
+          f"({polygons // chunk_count} collision polygons/chunk)")
+
+    def is_solid(x, y, z):
+        voxels = world.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+        return voxels is not None and 0 <= y < CHUNK_SIZE and voxels.get_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE) != AIR
+
+    # Walk diagonally across chunk seams under gravity
+    position = (0.5, CHUNK_SIZE - PLAYER_HEIGHT, 0.5)
+    size = (PLAYER_WIDTH, PLAYER_HEIGHT, PLAYER_WIDTH)
+    start = time.perf_counter()
+    for frame in range(frames):
+        direction = 1 if frame % 400 < 200 else -1
+        position, _ = move_aabb(position, size, (direction * 0.07, -0.3, direction * 0.07), is_solid)
+    move_time = (time.perf_counter() - start) / frames
+    print(f"player box collision us/frame: {move_time * 1e6:.1f}")
+
+
+# Chunk visibility pass over a square of loaded chunks, for a camera at the
+# centre turning through a full circle: pass cost and share of chunks culled
+def bench_culling(radii, render_distance, turns=360):
+    fov = (90, 58.7)
+    print(f"{'chunks':>7} {'visible':>8} {'culled':>7} {'us/pass':>8}")
+    for radius in radii:
+        keys = np.array([(cx, cz) for cx in range(-radius, radius + 1) for cz in range(-radius, radius + 1)], dtype=np.float64)
+        lows = np.column_stack((keys[:, 0] * CHUNK_SIZE, np.zeros(len(keys)), keys[:, 1] * CHUNK_SIZE))
+        highs = lows + CHUNK_SIZE
+        position = np.array([0.5, 12.0, 0.5])
+        visible = 0
+        start = time.perf_counter()
+        for turn in range(turns):
+            angle = math.radians(turn)
+            forward = (math.sin(angle), 0, math.cos(angle))
+            right = (math.cos(angle), 0, -math.sin(angle))
+            planes = frustum_planes(position, forward, right, (0, 1, 0), fov)
+            visible += int(boxes_visible(planes, position, lows, highs, render_distance).sum())
+        pass_time = (time.perf_counter() - start) / turns
+        visible /= turns
+        print(f"{len(keys):>7} {visible:>8.1f} {len(keys) - visible:>7.1f} {pass_time * 1e6:>8.1f}")
+
+
+# Vertex count and mesh build time of every chunk at each level of detail
+def bench_lod(seeds):
+    print(f"{'seed':>6} {'factor':>6} {'vertices':>9} {'ratio':>6} {'ms/chunk':>9}")
+    for seed in seeds:
+        world = seeded_world(seed)
+        full = None
+        for factor in LOD_FACTORS:
+            vertices = 0
+            start = time.perf_counter()
+            for (cx, cz), voxels in world.items():
+                buffers = build_lod_mesh_buffers(voxels.data, world_neighbours(world, cx, cz), factor,
+                                                 PALETTE, TRANSLUCENT_BLOCKS, greedy=True)
+                vertices += len(buffers[0])
+            elapsed = time.perf_counter() - start
+            full = full or vertices
+            print(f"{seed:>6} {factor:>6} {vertices:>9} {full / max(vertices, 1):>6.1f} {elapsed * 1000 / len(world):>9.2f}")
+
+
+# Per-vertex colors vs. atlas UVs: mesh build time and the size of the
+# attribute buffer each uploads
+def bench_atlas(seeds):
+    print(f"{'seed':>6} {'buffer':>7} {'vertices':>9} {'bytes/vtx':>10} {'attr MB':>8} {'ms/chunk':>9}")
+    for seed in seeds:
+        world = seeded_world(seed)
+        for name, tiles in (('colors', None), ('uvs', TILES)):
+            vertices = nbytes = 0
+            start = time.perf_counter()
+            for (cx, cz), voxels in world.items():
+                padded = padded_volume(voxels.data, world_neighbours(world, cx, cz))
+                buffers = build_mesh_buffers(padded, PALETTE, TRANSLUCENT_BLOCKS, greedy=True, tiles=tiles)
+                vertices += len(buffers[0])
+                nbytes += buffers[2].nbytes
+            elapsed = time.perf_counter() - start
+            print(f"{seed:>6} {name:>7} {vertices:>9} {nbytes / max(vertices, 1):>10.0f} {nbytes / 1e6:>8.2f} {elapsed * 1000 / len(world):>9.2f}")
+
+
+# Terrain generators of the game scripts, by name
+GENERATORS = {
+    'perlin': generate_perlin_chunk,
+    'hills': generate_hills_chunk,
+    'flat': generate_flat_chunk,
+}
+
+
+# Opaque and translucent passes per generator: the share of quads that needs
+# blending, and the cost of one back-to-front sort of a chunk's translucent
+# mesh (paid only when the camera has moved a block)
+def bench_translucent(seed, radius):
+    print(f"{'generator':>10} {'opaque quads':>13} {'translucent':>12} {'sort us p50':>12} {'sort us p99':>12}")
+    eye = np.array((0.5, CHUNK_SIZE + 2.0, 0.5), dtype=np.float32)
+    for name, generator in GENERATORS.items():
+        world = VoxelWorld(generator, seed, PALETTE, TRANSLUCENT_BLOCKS)
+        opaque = translucent = 0
+        sort_times = []
+        for cx in range(-radius, radius + 1):
+            for cz in range(-radius, radius + 1):
+                world.load_chunk(cx, cz)
+        for cx, cz in world.chunks:
+            padded = padded_volume(world.chunks[(cx, cz)].data, world.neighbour_voxels(cx, cz))
+            opaque_buffers, translucent_buffers = build_mesh_buffers(padded, PALETTE, TRANSLUCENT_BLOCKS, origin=(cx * CHUNK_SIZE, 0, cz * CHUNK_SIZE),
+                                                                     greedy=True, split=True)
+            opaque += len(opaque_buffers[0]) // 4
+            translucent += len(translucent_buffers[0]) // 4
+            if len(translucent_buffers[0]):
+                start = time.perf_counter()
+                back_to_front_triangles(translucent_buffers[0], eye)
+                sort_times.append(time.perf_counter() - start)
+        sort = percentiles(sort_times, 1e6) if sort_times else {'p50': 0.0, 'p99': 0.0}
+        print(f"{name:>10} {opaque:>13} {translucent:>12} {sort['p50']:>12.1f} {sort['p99']:>12.1f}")
+
+
+def percentiles(samples, scale=1):
+    samples = np.asarray(samples) * scale
+    return {'p50': round(float(np.percentile(samples, 50)), 4), 'p99': round(float(np.percentile(samples, 99)), 4)}
+
+
+# Headless benchmark suite over VoxelWorld: generation throughput, mesh build
+# time and size per chunk, and set_block latency (with and without the remesh
+# it causes), for each terrain generator. Returns the results as a dict so
+# runs can be saved as JSON and diffed between versions.
+def bench_suite(seed, radius, edits):
+    results = {
+        'meta': {'seed': seed, 'radius': radius, 'edits': edits, 'python': platform.python_version(), 'numpy': np.__version__},
+        'generators': {},
+        }
+    keys = [(cx, cz) for cx in range(-radius, radius + 1) for cz in range(-radius, radius + 1)]
+    for name, generator in GENERATORS.items():
+        world = VoxelWorld(generator, seed, PALETTE, TRANSLUCENT_BLOCKS)
+        start = time.perf_counter()
+        for chunk_key in keys:
+            world.load_chunk(*chunk_key)
+        generation_time = time.perf_counter() - start
+        world.dirty.clear()
+
+        mesh_times = []
+        vertex_counts = []
+        for chunk_key in keys:
+            start = time.perf_counter()
+            vertices, triangles, colors = world.mesh_buffers(*chunk_key)
+            mesh_times.append(time.perf_counter() - start)
+            vertex_counts.append(len(vertices))
+
+        # Dig out and refill random blocks at or below the surface of the
+        # inner chunks, so every edit changes a block
+        rng = random.Random(seed)
+        span = radius * CHUNK_SIZE
+        set_times = []
+        edit_times = []
+        for _ in range(edits):
+            x = rng.randrange(-span, span)
+            z = rng.randrange(-span, span)
+            y = rng.randint(1, max(world.terrain_height(x, z), 1))
+            block = world.get_block(x, y, z)
+            for new_block in (AIR, block) if block != AIR else (DIRT, AIR):
+                start = time.perf_counter()
+                world.set_block(x, y, z, new_block)
+                set_times.append(time.perf_counter() - start)
+                world.remesh_dirty()
+                edit_times.append(time.perf_counter() - start)
+
+        results['generators'][name] = {
+            'chunks': len(keys),
+            'chunks_per_second': round(len(keys) / generation_time, 2),
+            'mesh_ms': percentiles(mesh_times, 1000),
+            'vertices_per_chunk': {'mean': round(float(np.mean(vertex_counts)), 1), 'max': int(max(vertex_counts))},
+            'set_block_us': percentiles(set_times, 1e6),
+            'set_block_remesh_ms': percentiles(edit_times, 1000),
+            }
+    return results
+
+
+def print_suite(results):
+    print(f"{'generator':>10} {'chunks/s':>9} {'mesh p50':>9} {'mesh p99':>9} {'verts/chunk':>12} "
+          f"{'set us p50':>11} {'set us p99':>11} {'edit ms p99':>12}")
+    for name, result in results['generators'].items():
+        print(f"{name:>10} {result['chunks_per_second']:>9.1f} {result['mesh_ms']['p50']:>9.2f} {result['mesh_ms']['p99']:>9.2f} "
+              f"{result['vertices_per_chunk']['mean']:>12.0f} {result['set_block_us']['p50']:>11.1f} "
+              f"{result['set_block_us']['p99']:>11.1f} {result['set_block_remesh_ms']['p99']:>12.2f}")
+
+
+def print_replay(results):
+    print(f"{results['script']} seed {results['seed']}: {results['frames']} frames, {results['events']} events, {results['edits']} edits")
+    print(f"{'':>10} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for label, key in (('recorded', 'recorded_frame_ms'), ('replay', 'replay_frame_ms'), ('workers', 'worker_wait_ms')):
+        stats = results[key]
+        if stats:
+            print(f"{label:>10} " + ' '.join(f"{stats[name]:>8.2f}" for name in ('mean', 'p50', 'p95', 'p99', 'max')))
+    print(f"world hash {results['world_hash']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless benchmarks for chunk storage and meshing')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    greedy_parser = subparsers.add_parser('greedy', help='quad counts of the stock mesher vs. greedy meshing')
+    greedy_parser.add_argument('--seeds', type=int, nargs='+', default=[1, 2, 3])
+    storage_parser = subparsers.add_parser('storage', help='region file save/load vs. terrain generation')
+    storage_parser.add_argument('--seed', type=int, default=1)
+    storage_parser.add_argument('--radius', type=int, default=3)
+    generation_parser = subparsers.add_parser('generation', help='terrain generation throughput in chunks/s')
+    generation_parser.add_argument('--seed', type=int, default=1)
+    generation_parser.add_argument('--radius', type=int, default=3)
+    heightmap_parser = subparsers.add_parser('heightmap', help='ground height lookups per frame: column scan vs. heightmap')
+    heightmap_parser.add_argument('--items', type=int, nargs='+', default=[10, 100, 500])
+    bodies_parser = subparsers.add_parser('bodies', help='dropped item physics per frame: entities vs. batched step')
+    bodies_parser.add_argument('--counts', type=int, nargs='+', default=[1, 10, 20, 100, 1000])
+    lookup_parser = subparsers.add_parser('lookup', help='block lookup cost vs. world size')
+    lookup_parser.add_argument('--radii', type=int, nargs='+', default=[1, 2, 4, 8])
+    collision_parser = subparsers.add_parser('collision', help='remesh cost with vs. without a mesh collider, and player box collision')
+    collision_parser.add_argument('--seed', type=int, default=1)
+    culling_parser = subparsers.add_parser('culling', help='chunk frustum and distance culling pass vs. world size')
+    culling_parser.add_argument('--radii', type=int, nargs='+', default=[2, 4, 8, 16])
+    culling_parser.add_argument('--distance', type=float, default=64)
+    lod_parser = subparsers.add_parser('lod', help='vertex counts and mesh time per level of detail')
+    lod_parser.add_argument('--seeds', type=int, nargs='+', default=[1, 2, 3])
+    atlas_parser = subparsers.add_parser('atlas', help='mesh build time and attribute size: vertex colors vs. atlas UVs')
+    atlas_parser.add_argument('--seeds', type=int, nargs='+', default=[1, 2, 3])
+    translucent_parser = subparsers.add_parser('translucent', help='opaque vs. translucent quads and translucent sort cost per chunk')
+    translucent_parser.add_argument('--seed', type=int, default=1)
+    translucent_parser.add_argument('--radius', type=int, default=3)
+    suite_parser = subparsers.add_parser('suite', help='generation, meshing and set_block benchmarks for every terrain generator')
+    suite_parser.add_argument('--seed', type=int, default=1)
+    suite_parser.add_argument('--radius', type=int, default=3)
+    suite_parser.add_argument('--edits', type=int, default=500)
+    suite_parser.add_argument('--json', metavar='PATH', help="also write the results as JSON to PATH ('-' for stdout)")
+    replay_parser = subparsers.add_parser('replay', help='replay a recorded input session headlessly: frame times and final world hash')
+    replay_parser.add_argument('path', help='recording written by F2 in a chunk script')
+    replay_parser.add_argument('--scripted', metavar='SCRIPT', choices=sorted(SCRIPT_RULES),
+                               help='first write a scripted session for SCRIPT to path: dig a trench, then place blocks')
+    replay_parser.add_argument('--seed', type=int, default=1, help='world seed of a scripted session')
+    replay_parser.add_argument('--dig', type=int, default=20, help='trench length of a scripted session')
+    replay_parser.add_argument('--places', type=int, default=500, help='blocks placed by a scripted session')
+    replay_parser.add_argument('--expect-hash', metavar='HASH', help='exit with an error if the final world hash differs')
+    replay_parser.add_argument('--json', metavar='PATH', help="also write the results as JSON to PATH ('-' for stdout)")
+    args = parser.parse_args()
+
+    if args.command == 'greedy':
+        bench_greedy(args.seeds)
+    elif args.command == 'storage':
+        bench_storage(args.seed, args.radius)
+    elif args.command == 'generation':
+        bench_generation(args.seed, args.radius)
+    elif args.command == 'heightmap':
+        bench_heightmap(args.items)
+    elif args.command == 'bodies':
+        bench_bodies(args.counts)
+    elif args.command == 'lookup':
+        bench_lookup(args.radii)
+    elif args.command == 'collision':
+        bench_collision(args.seed)
+    elif args.command == 'culling':
+        bench_culling(args.radii, args.distance)
+    elif args.command == 'lod':
+        bench_lod(args.seeds)
+    elif args.command == 'atlas':
+        bench_atlas(args.seeds)
+    elif args.command == 'translucent':
+        bench_translucent(args.seed, args.radius)
+    elif args.command == 'suite':
+        results = bench_suite(args.seed, args.radius, args.edits)
+        if args.json == '-':
+            print(json.dumps(results, indent=2))
+        else:
+            print_suite(results)
+            if args.json:
+                with open(args.json, 'w') as file:
+                    json.dump(results, file, indent=2)
+    elif args.command == 'replay':
+        if args.scripted:
+            write_scripted_session(args.path, args.scripted, args.seed, args.dig, args.places)
+        results = replay(args.path)
+        if args.json == '-':
+            print(json.dumps(results, indent=2))
+        else:
+            print_replay(results)
+            if args.json:
+                with open(args.json, 'w') as file:
+                    json.dump(results, file, indent=2)
+        if args.expect_hash and results['world_hash'] != args.expect_hash:
+            raise SystemExit(f"world hash {results['world_hash']} does not match {args.expect_hash}")
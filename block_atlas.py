@@ -0,0 +1,171 @@
+import numpy as np
+from PIL import Image
+from ursina import Shader, Texture
+
+from chunk_mesher import UV_TILE_MARGIN, UV_TILE_STRIDE
+
+TILE_PIXELS = 16  # Side of a tile in pixels
+ATLAS_TILES = 8  # Tiles per side of the atlas (64 tiles)
+ALPHA_CUTOFF = 0.05  # Texels below this alpha are not drawn (the inside of glass)
+
+# Which sides of a block a face of each FACE_NORMALS direction shows
+FACE_SIDES = ('side', 'side', 'top', 'bottom', 'side', 'side')
+
+
+# A color (Ursina Color or tuple, 0-1) as a float RGBA array
+def rgba(value):
+    return np.array((tuple(value) + (1.0,))[:4], dtype=np.float32)
+
+
+# Tile painters: each fills a (TILE_PIXELS, TILE_PIXELS, 4) float RGBA tile,
+# row 0 at the top, from the spec's colors and a per-tile random generator
+
+# Base color with per-texel brightness noise (dirt, stone, sand, leaves)
+def paint_noise(rng, base, amount=0.12):
+    shade = 1 + rng.uniform(-amount, amount, (TILE_PIXELS, TILE_PIXELS, 1))
+    tile = np.empty((TILE_PIXELS, TILE_PIXELS, 4), dtype=np.float32)
+    tile[..., :3] = rgba(base)[:3] * shade
+    tile[..., 3] = rgba(base)[3]
+    return tile
+
+
+# Stone with clusters of ore-colored specks
+def paint_ore(rng, stone, ore):
+    tile = paint_noise(rng, stone)
+    for _ in range(5):
+        x, y = rng.integers(1, TILE_PIXELS - 2, 2)
+        tile[y:y + 2, x:x + 2, :3] = rgba(ore)[:3] * rng.uniform(0.85, 1.1)
+    return tile
+
+
+# Dirt with a ragged strip of grass along the top
+def paint_grass_side(rng, dirt, grass):
+    tile = paint_noise(rng, dirt)
+    grass_tile = paint_noise(rng, grass)
+    depth = rng.integers(2, 5, TILE_PIXELS)
+    rows = np.arange(TILE_PIXELS)[:, None] < depth[None, :]
+    tile[rows] = grass_tile[rows]
+    return tile
+
+
+# Bark: vertical streaks
+def paint_bark(rng, base):
+    tile = paint_noise(rng, base, 0.05)
+    tile[..., :3] *= rng.uniform(0.75, 1.05, (1, TILE_PIXELS, 1))
+    return tile
+
+
+# Cut log: growth rings around the centre, bark at the rim
+def paint_rings(rng, wood, bark):
+    tile = paint_noise(rng, wood, 0.05)
+    y, x = np.mgrid[:TILE_PIXELS, :TILE_PIXELS] - (TILE_PIXELS - 1) / 2
+    radius = np.maximum(abs(x), abs(y))
+    tile[..., :3] *= np.where(radius.astype(int) % 3 == 0, 0.8, 1.0)[..., None]
+    tile[radius > TILE_PIXELS / 2 - 1.5] = paint_noise(rng, bark)[radius > TILE_PIXELS / 2 - 1.5]
+    return tile
+
+
+# Planks: horizontal boards with dark seams
+def paint_planks(rng, base):
+    tile = paint_noise(rng, base, 0.06)
+    tile[TILE_PIXELS // 4 - 1::TILE_PIXELS // 4, :, :3] *= 0.7
+    return tile
+
+
+# Glass: a frame with a clear middle
+def paint_glass(rng, base):
+    tile = paint_noise(rng, base, 0.03)
+    tile[1:-1, 1:-1, 3] = 0.0
+    return tile
+
+
+PAINTERS = {
+    'noise': paint_noise,
+    'ore': paint_ore,
+    'grass_side': paint_grass_side,
+    'bark': paint_bark,
+    'rings': paint_rings,
+    'planks': paint_planks,
+    'glass': paint_glass,
+    }
+
+
+# Shader for textured chunk meshes: splits each UV into its tile and the
+# position on the quad (see chunk_mesher.quad_uvs) and repeats the tile once
+# per block. A shader replaces the fixed function pipeline's fog, so the
+# scene's exponential fog (scene.fog_density) is applied here, with the fog
+# color clamped as the fixed function pipeline does. Texels of (almost) zero
+# alpha are dropped instead of blended.
+ATLAS_SHADER = Shader(name='block_atlas_shader', language=Shader.GLSL, vertex='''#version 130
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform mat4 p3d_ModelViewMatrix;
+in vec4 p3d_Vertex;
+in vec2 p3d_MultiTexCoord0;
+in vec4 p3d_Color;
+out vec2 texcoords;
+out vec4 vertex_color;
+out float view_distance;
+
+void main() {
+    gl_Position = p3d_ModelViewProjectionMatrix * p3d_Vertex;
+    texcoords = p3d_MultiTexCoord0;
+    vertex_color = p3d_Color;
+    view_distance = length((p3d_ModelViewMatrix * p3d_Vertex).xyz);
+}
+''', fragment=f'''#version 130
+uniform sampler2D p3d_Texture0;
+uniform vec4 p3d_ColorScale;
+uniform struct {{ vec4 color; float density; }} p3d_Fog;
+in vec2 texcoords;
+in vec4 vertex_color;
+in float view_distance;
+out vec4 fragColor;
+
+void main() {{
+    vec2 tile = floor(texcoords / {UV_TILE_STRIDE}.0);
+    vec2 inside = fract(texcoords - tile * {UV_TILE_STRIDE}.0 - {UV_TILE_MARGIN}.0);
+    vec4 color = texture(p3d_Texture0, (tile + inside) / {ATLAS_TILES}.0) * p3d_ColorScale * vertex_color;
+    if (color.a < {ALPHA_CUTOFF}) discard;
+    float fog = exp(-p3d_Fog.density * view_distance);
+    fragColor = vec4(mix(clamp(p3d_Fog.color.rgb, 0.0, 1.0), color.rgb, fog), color.a);
+}}
+''')
+
+
+# One texture holding a tile for every face type of every block, for drawing
+# a whole chunk with a single texture. block_tiles maps a block id to a tile
+# spec, (painter name, *colors), or to a dict of specs for its 'top', 'side'
+# and 'bottom' faces ('side' stands in for the ones not given). Equal specs
+# share a tile; each tile's noise is seeded from its position in the atlas,
+# so the atlas looks the same every run. tiles is the (block_count, 6, 2)
+# table of atlas (column, row) per block and face that build_mesh_buffers
+# takes; unlisted blocks show a plain white tile.
+class BlockAtlas:
+    def __init__(self, block_tiles, block_count=256):
+        specs = [('noise', (1.0, 1.0, 1.0, 1.0))]
+        self.tiles = np.zeros((block_count, 6, 2), dtype=np.uint8)
+        for block, faces in block_tiles.items():
+            if not isinstance(faces, dict):
+                faces = {'side': faces}
+            for face, side in enumerate(FACE_SIDES):
+                spec = faces.get(side, faces['side'])
+                spec = (spec[0],) + tuple(tuple(value) for value in spec[1:])
+                if spec not in specs:
+                    specs.append(spec)
+                index = specs.index(spec)
+                self.tiles[block, face] = (index % ATLAS_TILES, index // ATLAS_TILES)
+        if len(specs) > ATLAS_TILES ** 2:
+            raise ValueError(f'{len(specs)} tiles do not fit a {ATLAS_TILES}x{ATLAS_TILES} atlas')
+
+        # Tile rows count up from the bottom of the image, like texture v
+        side = ATLAS_TILES * TILE_PIXELS
+        pixels = np.zeros((side, side, 4), dtype=np.float32)
+        for index, (painter, *colors) in enumerate(specs):
+            column, row = index % ATLAS_TILES, index // ATLAS_TILES
+            top = side - (row + 1) * TILE_PIXELS
+            left = column * TILE_PIXELS
+            tile = PAINTERS[painter](np.random.default_rng(index), *colors)
+            pixels[top:top + TILE_PIXELS, left:left + TILE_PIXELS] = tile
+        self.image = Image.fromarray((np.clip(pixels, 0, 1) * 255).round().astype(np.uint8), 'RGBA')
+        self.texture = Texture(self.image, filtering=None)
+        self.shader = ATLAS_SHADER
@@ -0,0 +1,47 @@
+# Scheduled block updates. Positions are queued for a future tick, each at most
+# once: scheduling a position that is already due no later is a no-op, so a
+# collapsing column queues every block once per tick no matter how many of
+# its neighbours moved. advance() runs the clock and hands back the positions
+# due in each elapsed tick, lowest first, for the caller to process in a batch.
+TICK_LENGTH = 0.05  # Seconds per tick (20 ticks per second)
+MAX_TICKS_PER_FRAME = 4  # Ticks run in one frame at most, so a slow frame cannot snowball
+
+
+class BlockUpdateQueue:
+    def __init__(self, tick_length=TICK_LENGTH):
+        self.tick_length = tick_length
+        self.tick = 0
+        self.elapsed = 0.0
+        self.scheduled = {}  # position -> tick it is due in
+        self.due = {}  # tick -> set of positions
+
+    def schedule(self, position, delay=1):
+        tick = self.tick + max(delay, 1)
+        current = self.scheduled.get(position)
+        if current is not None:
+            if current <= tick:
+                return False
+            self.due[current].discard(position)
+        self.scheduled[position] = tick
+        self.due.setdefault(tick, set()).add(position)
+        return True
+
+    # Advance the clock by dt seconds. Returns one list of positions per tick
+    # that elapsed, sorted bottom to top.
+    def advance(self, dt):
+        self.elapsed += dt
+        batches = []
+        while self.elapsed >= self.tick_length:
+            if len(batches) == MAX_TICKS_PER_FRAME:
+                self.elapsed = 0.0
+                break
+            self.elapsed -= self.tick_length
+            self.tick += 1
+            positions = self.due.pop(self.tick, ())
+            for position in positions:
+                del self.scheduled[position]
+            batches.append(sorted(positions, key=lambda position: position[1]))
+        return batches
+
+    def __len__(self):
+        return len(self.scheduled)
@@ -0,0 +1,62 @@
+import numpy as np
+from panda3d.core import GeomEnums, OmniBoundingVolume, Texture
+from ursina import Entity, Shader
+
+# Every body is one instance of the same cube. Per instance the shader reads
+# two texels of a buffer texture: (x, y, z, scale) and the RGBA color.
+instanced_body_shader = Shader(language=Shader.GLSL, vertex='''#version 140
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform samplerBuffer instance_data;
+in vec4 p3d_Vertex;
+out vec4 body_color;
+
+void main() {
+    vec4 placement = texelFetch(instance_data, gl_InstanceID * 2);
+    body_color = texelFetch(instance_data, gl_InstanceID * 2 + 1);
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(p3d_Vertex.xyz * placement.w + placement.xyz, 1.0);
+}
+''', fragment='''#version 140
+in vec4 body_color;
+out vec4 fragColor;
+
+void main() {
+    fragColor = body_color;
+}
+''')
+
+
+# Draws all bodies of a PhysicsBodies store with a single instanced draw call.
+# Items are drawn smaller than a block in item_color, as the old Item entities
+# were.
+class BodyRenderer(Entity):
+    def __init__(self, bodies, item_color, item_scale=0.5):
+        super().__init__(model='cube', shader=instanced_body_shader)
+        self.bodies = bodies
+        self.item_color = np.asarray(tuple(item_color), dtype=np.float32)
+        self.item_scale = item_scale
+        self.capacity = 0
+        self.instance_data = Texture('body_instances')
+        self.instances = np.zeros((0, 4), dtype=np.float32)
+        # Instances are placed by the shader, so the cube's own bounds say
+        # nothing about where they are drawn
+        self.node().set_bounds(OmniBoundingVolume())
+        self.node().set_final(True)
+        self.visible = False
+
+    def update(self):
+        bodies = self.bodies
+        n = bodies.count
+        self.visible = n > 0
+        if n == 0:
+            return
+        if n > self.capacity:
+            self.capacity = max(n, self.capacity * 2, 64)
+            self.instance_data.setup_buffer_texture(self.capacity * 2, Texture.T_float, Texture.F_rgba32, GeomEnums.UH_dynamic)
+            self.instances = np.zeros((self.capacity * 2, 4), dtype=np.float32)
+            self.set_shader_input('instance_data', self.instance_data)
+        placements = self.instances[0:2 * n:2]
+        placements[:, :3] = bodies.positions[:n]
+        placements[:, 3] = self.item_scale
+        self.instances[1:2 * n:2] = self.item_color
+        self.instance_data.set_ram_image(self.instances)
+        self.setInstanceCount(n)
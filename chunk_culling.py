@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+
+from chunk_storage import CHUNK_SIZE
+
+# Share of a surface's colour left at the distance where fog has hidden it
+FOG_CUTOFF = 1 / 255
+
+
+# Distance at which exponential fog (Panda3D's exp(-density * distance), as
+# set by scene.fog_density = density) leaves less than cutoff of a surface
+def fog_distance(density, cutoff=FOG_CUTOFF):
+    return math.log(1 / cutoff) / density
+
+
+# Planes (nx, ny, nz, d) of a perspective camera's view frustum, normals
+# pointing inwards so that n . p + d >= 0 for points in front of a plane:
+# left, right, bottom, top and the camera plane. fov is the (horizontal,
+# vertical) field of view in degrees. There is no far plane; max render
+# distance is tested separately.
+def frustum_planes(position, forward, right, up, fov):
+    position, forward, right, up = (np.asarray(v, dtype=np.float64) for v in (position, forward, right, up))
+    half_h = math.radians(fov[0]) / 2
+    half_v = math.radians(fov[1]) / 2
+    normals = np.array([
+        forward * math.sin(half_h) + right * math.cos(half_h),
+        forward * math.sin(half_h) - right * math.cos(half_h),
+        forward * math.sin(half_v) + up * math.cos(half_v),
+        forward * math.sin(half_v) - up * math.cos(half_v),
+        forward,
+        ])
+    return np.column_stack((normals, -normals @ position))
+
+
+# Which of the boxes lows[i]..highs[i] are at least partly inside the frustum
+# and no further than max_distance from position. A box is outside a plane
+# when even its corner furthest along the plane normal is behind it.
+def boxes_visible(planes, position, lows, highs, max_distance):
+    centers = (lows + highs) / 2
+    extents = (highs - lows) / 2
+    normals = planes[:, :3]
+    reach = centers @ normals.T + extents @ np.abs(normals).T + planes[:, 3]
+    inside = (reach >= 0).all(axis=1)
+    nearest = np.clip(position, lows, highs)
+    near = ((nearest - position) ** 2).sum(axis=1) <= max_distance * max_distance
+    return inside & near
+
+
+# Chunk visibility pass: shows the chunk entities whose bounds (the full
+# chunk column, CHUNK_SIZE high) are in the camera frustum and within
+# max_distance, and hides the rest so they skip the cull and draw traversal.
+# visible and culled count the chunks of the last update.
+class ChunkCuller:
+    def __init__(self, max_distance, height=CHUNK_SIZE):
+        self.max_distance = max_distance
+        self.height = height
+        self.visible = 0
+        self.culled = 0
+
+    def update(self, chunks, camera):
+        if not chunks:
+            self.visible = self.culled = 0
+            return
+        position = np.array(camera.world_position, dtype=np.float64)
+        planes = frustum_planes(position, camera.forward, camera.right, camera.up, camera.lens.getFov())
+        keys = np.array(list(chunks), dtype=np.float64)
+        lows = np.column_stack((keys[:, 0] * CHUNK_SIZE, np.zeros(len(keys)), keys[:, 1] * CHUNK_SIZE))
+        highs = lows + (CHUNK_SIZE, self.height, CHUNK_SIZE)
+        visible = boxes_visible(planes, position, lows, highs, self.max_distance)
+        for chunk, shown in zip(chunks.values(), visible.tolist()):
+            if chunk.visible != shown:
+                chunk.visible = shown
+        self.visible = int(visible.sum())
+        self.culled = len(visible) - self.visible
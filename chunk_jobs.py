@@ -0,0 +1,130 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from chunk_lod import build_lod_mesh_buffers
+from chunk_mesher import build_mesh_buffers
+
+# Job kinds
+JOB_GENERATE = 'generate'
+JOB_MESH = 'mesh'
+
+logger = logging.getLogger(__name__)
+
+
+# Worker pool for the pure-data side of chunk generation and meshing.
+# The game scripts build their scene at import time, so worker processes are
+# forked rather than spawned (a spawned worker would re-run the script and open
+# a window); where fork is unavailable a thread pool is used instead. Forking
+# a process that holds a window and GL context is unsafe, so the workers are
+# started here, all at once, and the scripts create their job queue before
+# Ursina() opens the window.
+def make_executor(max_workers=None):
+    if 'fork' in multiprocessing.get_all_start_methods():
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork'))
+        # A fork pool launches every worker on its first job
+        executor.submit(os.getpid).result()
+        return executor
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+# Runs chunk generation and mesh buffer construction off the main thread.
+# Only finished results are handed back, through process(), under a time budget
+# so uploading meshes never stalls a frame. A job that raises is logged and
+# dropped. If a worker process dies the pool is broken for good; its jobs are
+# then run again on a thread pool, as a new process pool would have to be
+# forked from the game with its window open.
+class ChunkJobQueue:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.executor = make_executor(max_workers)
+        self.jobs = deque()
+        self.generating = set()
+
+    # Run fn(*args, **kwargs) in the pool, replacing a broken process pool first
+    def _submit(self, kind, chunk_key, version, fn, *args, **kwargs):
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            self._replace_broken_pool()
+            future = self.executor.submit(fn, *args, **kwargs)
+        self.jobs.append((kind, chunk_key, version, future, (fn, args, kwargs)))
+
+    def _replace_broken_pool(self):
+        if isinstance(self.executor, ThreadPoolExecutor):
+            return
+        logger.error('chunk worker process died; running chunk jobs on threads from now on')
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    # Queue terrain generation for a chunk; generator(*args) must return the voxel array
+    def submit_generate(self, chunk_key, generator, *args):
+        if chunk_key in self.generating:
+            return False
+        self.generating.add(chunk_key)
+        self._submit(JOB_GENERATE, chunk_key, None, generator, *args)
+        return True
+
+    # Queue mesh buffer construction for a padded chunk volume. version lets the
+    # caller drop results that were overtaken by a newer edit. tiles, an atlas
+    # tile table, makes textured meshes; split, separate opaque and
+    # translucent buffers.
+    def submit_mesh(self, chunk_key, version, padded, palette, translucent, origin, greedy, tiles=None, split=False):
+        self._submit(JOB_MESH, chunk_key, version, build_mesh_buffers, padded, palette, translucent, origin, greedy, tiles=tiles, split=split)
+
+    # Queue mesh buffer construction for a chunk drawn at a reduced level of
+    # detail; the downsampling is done by the worker as well. Results come back
+    # through on_meshed like those of submit_mesh.
+    def submit_lod_mesh(self, chunk_key, version, voxels, neighbours, factor, palette, translucent, origin, greedy, tiles=None, split=False):
+        self._submit(JOB_MESH, chunk_key, version, build_lod_mesh_buffers, voxels, neighbours, factor, palette, translucent, origin, greedy,
+                     tiles=tiles, split=split)
+
+    # Hand finished jobs to on_generated(chunk_key, voxels) and
+    # on_meshed(chunk_key, version, buffers) until budget seconds have passed.
+    # Jobs that are still running, or over budget, stay queued in order; a
+    # failed generation can be submitted again.
+    def process(self, on_generated, on_meshed, budget):
+        start = time.perf_counter()
+        waiting = deque()
+        while self.jobs:
+            if time.perf_counter() - start > budget:
+                break
+            job = self.jobs.popleft()
+            kind, chunk_key, version, future, (fn, args, kwargs) = job
+            if not future.done():
+                waiting.append(job)
+                continue
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                self._replace_broken_pool()
+                waiting.append((kind, chunk_key, version, self.executor.submit(fn, *args, **kwargs), (fn, args, kwargs)))
+                continue
+            except Exception:
+                logger.exception('%s job for chunk %s failed', kind, chunk_key)
+                if kind == JOB_GENERATE:
+                    self.generating.discard(chunk_key)
+                continue
+            if kind == JOB_GENERATE:
+                self.generating.discard(chunk_key)
+                on_generated(chunk_key, result)
+            else:
+                on_meshed(chunk_key, version, result)
+        waiting.extend(self.jobs)
+        self.jobs = waiting
+
+    # Block until every queued job has finished, for headless callers that
+    # need the results of a frame before the next one
+    def wait(self):
+        wait([future for _, _, _, future, _ in self.jobs])
+
+    @property
+    def pending(self):
+        return len(self.jobs)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+
+from chunk_mesher import build_mesh_buffers, padded_volume
+from chunk_storage import AIR
+
+# Blocks merged along each axis at each level of detail: level 0 is full
+# resolution, level 1 merges 2x2x2 blocks, level 2 merges 4x4x4
+LOD_FACTORS = (1, 2, 4)
+
+
+# Level of detail for a chunk: the number of distances (in chunks, measured
+# like ChunkStreamer's view radius) it lies beyond. Full detail while the
+# centre is unknown.
+def lod_level(chunk_key, center, distances):
+    if center is None:
+        return 0
+    distance = math.hypot(chunk_key[0] - center[0], chunk_key[1] - center[1])
+    return min(sum(distance > limit for limit in distances), len(LOD_FACTORS) - 1)
+
+
+# Merge every factor^3 cell of a voxel array into one block. A cell is solid
+# when at least half of it is, and then takes its most common non-air block;
+# ties go to the block found highest in the cell, so a grass-topped cell stays
+# grass. Each side of voxels must be a multiple of factor.
+def downsample(voxels, factor):
+    sx, sy, sz = (side // factor for side in voxels.shape)
+    cells = voxels.reshape(sx, factor, sy, factor, sz, factor).transpose(0, 2, 4, 3, 1, 5)
+    values = cells[:, :, :, ::-1].reshape(-1, factor ** 3)
+    solid = values != AIR
+    counts = ((values[:, :, None] == values[:, None, :]) & solid[:, None, :]).sum(axis=2)
+    blocks = values[np.arange(len(values)), counts.argmax(axis=1)]
+    keep = solid.sum(axis=1) * 2 >= factor ** 3
+    return np.where(keep, blocks, AIR).astype(np.uint8).reshape(sx, sy, sz)
+
+
+# Downsample only the slab of each neighbour (FACE_NORMALS order) that touches
+# the chunk, which is all padded_volume reads from it
+def downsample_neighbours(neighbours, factor):
+    slabs = (np.s_[:factor, :, :], np.s_[-factor:, :, :], np.s_[:, :factor, :],
+             np.s_[:, -factor:, :], np.s_[:, :, :factor], np.s_[:, :, -factor:])
+    return tuple(None if neighbour is None else downsample(neighbour[slab], factor)
+                 for neighbour, slab in zip(neighbours, slabs))
+
+
+# Mesh buffers for a chunk drawn at a reduced level of detail: the chunk and
+# its neighbours are downsampled by factor, meshed as a small chunk, and the
+# result is scaled back up to world size. neighbours are full-resolution voxel
+# arrays as for padded_volume. With an atlas tile table textures are scaled
+# along, so a merged block shows factor tiles per side like the blocks it
+# replaces; split works as for build_mesh_buffers.
+def build_lod_mesh_buffers(voxels, neighbours, factor, palette, translucent, origin=(0, 0, 0), greedy=False, tiles=None, split=False):
+    padded = padded_volume(downsample(voxels, factor), downsample_neighbours(neighbours, factor))
+    buffers = build_mesh_buffers(padded, palette, translucent, greedy=greedy, tiles=tiles, uv_scale=factor, split=split)
+    scaled = tuple((vertices * factor + np.asarray(origin, dtype=np.float32), triangles, attributes)
+                   for vertices, triangles, attributes in (buffers if split else (buffers,)))
+    return scaled if split else scaled[0]
@@ -0,0 +1,204 @@
+import numpy as np
+
+from chunk_storage import AIR
+
+# Neighbour offsets in the order faces are tested: right, left, top, bottom, front, back
+FACE_NORMALS = np.array([
+    (1, 0, 0), (-1, 0, 0),
+    (0, 1, 0), (0, -1, 0),
+    (0, 0, 1), (0, 0, -1),
+], dtype=np.int64)
+
+# Quad corners for each face, relative to the block origin. Each quad lies on
+# the side of the neighbour it was tested against and is wound so it faces
+# outward (Ursina culls the other side).
+FACE_CORNERS = np.array([
+    [(1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0)],
+    [(0, 0, 1), (0, 0, 0), (0, 1, 0), (0, 1, 1)],
+    [(0, 1, 0), (1, 1, 0), (1, 1, 1), (0, 1, 1)],
+    [(0, 0, 0), (0, 0, 1), (1, 0, 1), (1, 0, 0)],
+    [(1, 0, 1), (0, 0, 1), (0, 1, 1), (1, 1, 1)],
+    [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)],
+], dtype=np.float32)
+
+# For each face: the axis it faces along, then the two in-plane axes greedy
+# meshing merges over
+FACE_AXES = [(0, 1, 2), (0, 1, 2), (1, 0, 2), (1, 0, 2), (2, 0, 1), (2, 0, 1)]
+
+# Two triangles per quad
+QUAD_TRIANGLES = np.array([0, 1, 2, 2, 3, 0], dtype=np.uint32)
+
+# For each face: the axes its texture's u and v run along. Side faces have v
+# along y, so a grass side tile stays upright.
+FACE_UV_AXES = np.array([(2, 1), (2, 1), (0, 2), (0, 2), (0, 1), (0, 1)], dtype=np.int64)
+
+# Textured meshes pack an atlas tile and the position inside a (possibly
+# merged) quad into one UV: tile * UV_TILE_STRIDE + UV_TILE_MARGIN + position
+# in blocks. The atlas shader splits them again and repeats the tile once per
+# block, so greedy quads stay textured per block. Quads are at most one chunk
+# (16 blocks) across, well inside the stride.
+UV_TILE_STRIDE = 64
+UV_TILE_MARGIN = 8
+
+
+# Build a per-block-id RGBA lookup table from a block -> color function
+def make_palette(block_color, block_count=256):
+    return np.array([tuple(block_color(block))[:4] for block in range(block_count)], dtype=np.float32)
+
+
+# Build a per-block-id boolean table marking see-through blocks (WATER, GLASS)
+def make_translucent_table(translucent_blocks, block_count=256):
+    table = np.zeros(block_count, dtype=bool)
+    table[list(translucent_blocks)] = True
+    return table
+
+
+# Copy a chunk into a (size + 2)^3 array with a one-block border ring around it.
+# neighbours holds the voxel arrays of the six adjacent chunks in FACE_NORMALS
+# order (None where there is no chunk, which reads as AIR); only the slab of
+# each neighbour that touches this chunk is copied.
+def padded_volume(voxels, neighbours=None):
+    size = voxels.shape[0]
+    padded = np.full((size + 2, size + 2, size + 2), AIR, dtype=np.uint8)
+    padded[1:-1, 1:-1, 1:-1] = voxels
+    if neighbours is None:
+        return padded
+    right, left, top, bottom, front, back = neighbours
+    if right is not None:
+        padded[-1, 1:-1, 1:-1] = right[0, :, :]
+    if left is not None:
+        padded[0, 1:-1, 1:-1] = left[-1, :, :]
+    if top is not None:
+        padded[1:-1, -1, 1:-1] = top[:, 0, :]
+    if bottom is not None:
+        padded[1:-1, 0, 1:-1] = bottom[:, -1, :]
+    if front is not None:
+        padded[1:-1, 1:-1, -1] = front[:, :, 0]
+    if back is not None:
+        padded[1:-1, 1:-1, 0] = back[:, :, -1]
+    return padded
+
+
+# Single-face version of the exposure rule used by exposed_faces
+def face_exposed(block, neighbour, translucent):
+    return block != AIR and (neighbour == AIR or (neighbour != block and (translucent[block] or translucent[neighbour])))
+
+
+# Exposed-face mask for all six directions at once, shape (size, size, size, 6).
+# A face is exposed when the neighbour is AIR, or when a different block
+# touches it and either of the two is translucent (so the ground shows
+# through water and glass).
+def exposed_faces(padded, translucent):
+    size = padded.shape[0] - 2
+    blocks = padded[1:-1, 1:-1, 1:-1]
+    solid = blocks != AIR
+    see_through = translucent[blocks]
+    masks = np.empty(blocks.shape + (6,), dtype=bool)
+    for i, (dx, dy, dz) in enumerate(FACE_NORMALS):
+        neighbour = padded[1 + dx:size + 1 + dx, 1 + dy:size + 1 + dy, 1 + dz:size + 1 + dz]
+        masks[..., i] = solid & ((neighbour == AIR) | ((see_through | translucent[neighbour]) & (neighbour != blocks)))
+    return masks
+
+
+# Merge exposed faces of one direction into maximal rectangles of the same
+# block type: runs along the second in-plane axis first, then identical runs
+# in consecutive rows are stacked. Returns quad positions, extents and blocks.
+def greedy_quads(keys, face):
+    axis, u_axis, v_axis = FACE_AXES[face]
+    planes = keys.transpose(axis, u_axis, v_axis)
+    size = planes.shape[2]
+
+    # Runs of equal, non-zero keys along v in every (slice, u) row at once
+    rows = planes.reshape(-1, size)
+    padded_rows = np.zeros((rows.shape[0], size + 2), dtype=rows.dtype)
+    padded_rows[:, 1:-1] = rows
+    changed = padded_rows[:, 1:] != padded_rows[:, :-1]
+    run_row, run_start = np.nonzero(changed[:, :-1] & (padded_rows[:, 1:-1] != 0))
+    ends_row, run_end = np.nonzero(changed[:, 1:] & (padded_rows[:, 1:-1] != 0))
+    run_key = rows[run_row, run_start]
+
+    # Stack identical runs from consecutive rows of the same slice
+    open_rects = {}
+    rects = []
+    for row, v0, v1, key in zip(run_row.tolist(), run_start.tolist(), run_end.tolist(), run_key.tolist()):
+        layer, u = divmod(row, size)
+        rect = open_rects.pop((layer, u - 1, v0, v1, key), None)
+        if rect is None:
+            rect = [layer, u, u, v0, v1, key]
+            rects.append(rect)
+        rect[2] = u
+        open_rects[(layer, u, v0, v1, key)] = rect
+
+    rects = np.array(rects, dtype=np.int64).reshape(-1, 6)
+    positions = np.zeros((len(rects), 3), dtype=np.float32)
+    extents = np.ones((len(rects), 3), dtype=np.float32)
+    positions[:, axis] = rects[:, 0]
+    positions[:, u_axis] = rects[:, 1]
+    positions[:, v_axis] = rects[:, 3]
+    extents[:, u_axis] = rects[:, 2] - rects[:, 1] + 1
+    extents[:, v_axis] = rects[:, 4] - rects[:, 3] + 1
+    return positions, extents, rects[:, 5]
+
+
+# UVs (N, 2) for quads of the given faces and extents: per-block tile
+# coordinates from tiles (a (block_count, 6) table of atlas (column, row)
+# pairs per face, see block_atlas) packed with the corner's position in the
+# quad. uv_scale stretches the position, for quads of downsampled blocks.
+def quad_uvs(tiles, quad_blocks, faces, extents, uv_scale=1):
+    axes = FACE_UV_AXES[faces]
+    corners = np.take_along_axis(FACE_CORNERS[faces], axes[:, None, :], axis=2)
+    sizes = np.take_along_axis(extents, axes, axis=1)
+    tile = tiles[quad_blocks, faces].astype(np.float32)
+    uvs = tile[:, None, :] * UV_TILE_STRIDE + UV_TILE_MARGIN + corners * sizes[:, None, :] * uv_scale
+    return uvs.reshape(-1, 2)
+
+
+# Vertex (N, 3), triangle index (M * 3,) and color (N, 4) buffers for quads at
+# positions (in world coordinates) with extents, or atlas UVs (N, 2) instead
+# of colors given a tile table
+def quad_buffers(positions, extents, quad_blocks, faces, palette, tiles=None, uv_scale=1):
+    vertices = (positions[:, None, :] + FACE_CORNERS[faces] * extents[:, None, :]).reshape(-1, 3)
+    first_vertex = np.arange(len(faces), dtype=np.uint32) * 4
+    triangles = (first_vertex[:, None] + QUAD_TRIANGLES).ravel()
+    if tiles is not None:
+        return vertices, triangles, quad_uvs(tiles, quad_blocks, faces, extents, uv_scale)
+    colors = np.repeat(palette[quad_blocks], 4, axis=0)
+    return vertices, triangles, colors
+
+
+# Mesh buffers for one chunk (see quad_buffers). Without greedy meshing faces
+# are emitted one quad per block face in x, y, z, face order; with it,
+# coplanar faces of the same block are merged. Given an atlas tile table the
+# third buffer holds UVs into the atlas and palette is not used. split
+# returns two sets of buffers, for the opaque and the translucent blocks, so
+# they can be drawn in separate passes.
+def build_mesh_buffers(padded, palette, translucent, origin=(0, 0, 0), greedy=False, tiles=None, uv_scale=1, split=False):
+    blocks = padded[1:-1, 1:-1, 1:-1]
+    masks = exposed_faces(padded, translucent)
+
+    if greedy:
+        parts = [greedy_quads(np.where(masks[..., face], blocks, 0), face) for face in range(6)]
+        positions = np.concatenate([part[0] for part in parts])
+        extents = np.concatenate([part[1] for part in parts])
+        quad_blocks = np.concatenate([part[2] for part in parts])
+        faces = np.repeat(np.arange(6), [len(part[2]) for part in parts])
+    else:
+        x, y, z, faces = np.nonzero(masks)
+        positions = np.stack((x, y, z), axis=1).astype(np.float32)
+        extents = np.ones_like(positions)
+        quad_blocks = blocks[x, y, z]
+
+    positions += np.asarray(origin, dtype=np.float32)
+    if not split:
+        return quad_buffers(positions, extents, quad_blocks, faces, palette, tiles, uv_scale)
+    see_through = translucent[quad_blocks]
+    return tuple(quad_buffers(positions[keep], extents[keep], quad_blocks[keep], faces[keep], palette, tiles, uv_scale)
+                 for keep in (~see_through, see_through))
+
+
+# Triangle indices of a translucent mesh's quads ordered back to front as
+# seen from eye (by quad centre), so they blend over each other correctly
+def back_to_front_triangles(vertices, eye):
+    centers = vertices.reshape(-1, 4, 3).mean(axis=1)
+    order = np.argsort(-((centers - np.asarray(eye, dtype=np.float32)) ** 2).sum(axis=1), kind='stable')
+    return (order.astype(np.uint32)[:, None] * 4 + QUAD_TRIANGLES).ravel()
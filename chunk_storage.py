@@ -0,0 +1,90 @@
+import numpy as np
+
+# Chunk settings
+CHUNK_SIZE = 16
+AIR = 0
+
+# Highest non-air y of every column of a voxel array, indexed [x, z]; -1 for
+# columns that are all air
+def compute_heightmap(data):
+    solid = data != AIR
+    heights = (data.shape[1] - 1 - np.argmax(solid[:, ::-1, :], axis=1)).astype(np.int16)
+    heights[~solid.any(axis=1)] = -1
+    return heights
+
+# Compact voxel storage for one chunk: a contiguous uint8 array indexed [x, y, z]
+# (one byte per block, 4 KB for a 16x16x16 chunk).
+# The column heightmap is built on first use and then kept up to date by
+# set_block; bulk writes simply drop it to be rebuilt.
+class ChunkVoxels:
+    def __init__(self, size=CHUNK_SIZE, data=None):
+        if data is None:
+            data = np.full((size, size, size), AIR, dtype=np.uint8)
+        self.size = size
+        self.data = data
+        self.heightmap = None
+
+    # Single block access (returns a plain int, not a NumPy scalar)
+    def get_block(self, x, y, z):
+        return self.data.item(x, y, z)
+
+    # A placement can only raise its column; removing the top block rescans
+    # just that column
+    def set_block(self, x, y, z, block):
+        self.data[x, y, z] = block
+        if self.heightmap is None:
+            return
+        height = self.heightmap[x, z]
+        if block != AIR:
+            if y > height:
+                self.heightmap[x, z] = y
+        elif y == height:
+            solid = np.flatnonzero(self.data[x, :y, z])
+            self.heightmap[x, z] = solid[-1] if len(solid) else -1
+
+    # Highest non-air y in column (x, z), or -1 if the column is empty
+    def height(self, x, z):
+        return int(self.get_heightmap()[x, z])
+
+    def get_heightmap(self):
+        if self.heightmap is None:
+            self.heightmap = compute_heightmap(self.data)
+        return self.heightmap
+
+    def invalidate_heightmap(self):
+        self.heightmap = None
+
+    # Bulk access: voxels[x, y, z], voxels[:, 4:8, :] = STONE, etc.
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.heightmap = None
+
+    # Vertical column of blocks at (x, z), bottom to top
+    def column(self, x, z):
+        return self.data[x, :, z]
+
+    def set_column(self, x, z, blocks):
+        self.data[x, :, z] = blocks
+        self.heightmap = None
+
+    # Horizontal layer of blocks at height y, indexed [x, z]
+    def layer(self, y):
+        return self.data[:, y, :]
+
+    def set_layer(self, y, blocks):
+        self.data[:, y, :] = blocks
+        self.heightmap = None
+
+    def fill(self, block):
+        self.data.fill(block)
+        self.heightmap = None
+
+    def copy(self):
+        return ChunkVoxels(self.size, self.data.copy())
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
@@ -0,0 +1,50 @@
+import math
+
+
+# Decides which chunks to load and unload around the player. Chunks within
+# view_radius (in chunks) of the player's chunk are loaded nearest first, with
+# chunks in front of the player ahead of those behind at the same distance.
+# Loaded chunks are only dropped once they are beyond unload_radius, so walking
+# back and forth over a chunk border does not reload the same ring of chunks.
+class ChunkStreamer:
+    def __init__(self, view_radius=4, unload_radius=6):
+        if unload_radius < view_radius:
+            raise ValueError('unload_radius must not be smaller than view_radius')
+        self.view_radius = view_radius
+        self.unload_radius = unload_radius
+        self.center = None
+
+    # Returns True when the player has moved into a different chunk
+    def move_to(self, center):
+        if center == self.center:
+            return False
+        self.center = center
+        return True
+
+    def in_range(self, chunk_key):
+        return self._distance(chunk_key) <= self.unload_radius
+
+    # Missing chunks within the view radius, highest priority first
+    def chunks_to_load(self, loaded, forward=(0, 0)):
+        cx, cz = self.center
+        fx, fz = forward
+        length = math.hypot(fx, fz) or 1
+        fx, fz = fx / length, fz / length
+        wanted = []
+        for dx in range(-self.view_radius, self.view_radius + 1):
+            for dz in range(-self.view_radius, self.view_radius + 1):
+                chunk_key = (cx + dx, cz + dz)
+                distance = math.hypot(dx, dz)
+                if distance > self.view_radius or chunk_key in loaded:
+                    continue
+                facing = (dx * fx + dz * fz) / distance if distance else 1
+                wanted.append((distance - 0.5 * facing, chunk_key))
+        wanted.sort()
+        return [chunk_key for _, chunk_key in wanted]
+
+    # Loaded chunks beyond the unload radius
+    def chunks_to_unload(self, loaded):
+        return [chunk_key for chunk_key in loaded if not self.in_range(chunk_key)]
+
+    def _distance(self, chunk_key):
+        return math.hypot(chunk_key[0] - self.center[0], chunk_key[1] - self.center[1])
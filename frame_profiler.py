@@ -0,0 +1,96 @@
+import csv
+import functools
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TRACE_FRAMES = 1200  # Frames kept for a trace dump (20 seconds at 60 fps)
+
+
+# Named wall-clock timers, totalled per frame. Code is timed with
+# `with profiler.timer(name):` or by decorating a function with
+# @profiler.timed(name); a name used several times in one frame (every mob's
+# update, say) adds up. end_frame() closes the frame: its length and the
+# totals go into a ring buffer of the last trace_frames frames, which can be
+# summarised for an overlay or dumped to CSV or JSON to see what a spike was.
+# Timers can nest; each name simply counts its own time.
+class FrameProfiler:
+    def __init__(self, trace_frames=TRACE_FRAMES):
+        self.enabled = True
+        self.frames = deque(maxlen=trace_frames)
+        self.names = {}  # Timer names in first-use order
+        self.current = {}
+        self.frame = 0
+        self.frame_start = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+        self.names.setdefault(name, None)
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.add(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    # Close the frame that began at the previous call. Call it once per frame,
+    # first thing in update(), so everything that ran since then (entity
+    # updates, input, rendering) belongs to the frame being closed.
+    def end_frame(self):
+        now = time.perf_counter()
+        if self.enabled:
+            record = {'frame': self.frame, 'frame_ms': (now - self.frame_start) * 1000}
+            record.update((name, seconds * 1000) for name, seconds in self.current.items())
+            self.frames.append(record)
+        self.current = {}
+        self.frame += 1
+        self.frame_start = now
+
+    # (name, mean ms, max ms) for the frame length and every timer over the
+    # last frames, timers sorted by mean, slowest first
+    def summary(self, frames=60):
+        recent = list(self.frames)[-frames:]
+        if not recent:
+            return []
+        rows = []
+        for name in ['frame_ms'] + list(self.names):
+            values = [record.get(name, 0.0) for record in recent]
+            rows.append((name, sum(values) / len(values), max(values)))
+        return rows[:1] + sorted(rows[1:], key=lambda row: -row[1])
+
+    # Write the buffered frames to path, as JSON if it ends in .json and CSV
+    # otherwise: one row per frame, one millisecond column per timer (0 for
+    # frames it did not run in)
+    def dump(self, path):
+        columns = ['frame', 'frame_ms'] + list(self.names)
+        rows = [{column: round(record.get(column, 0.0), 4) for column in columns} for record in self.frames]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', newline='') as file:
+            if path.endswith('.json'):
+                json.dump({'columns': columns, 'frames': rows}, file)
+            else:
+                writer = csv.DictWriter(file, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(rows)
+        return path
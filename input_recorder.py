@@ -0,0 +1,45 @@
+import os
+import time
+
+from ursina import Entity, camera, print_on_screen, window
+
+from recording_file import InputRecorder
+
+MESSAGE_SECONDS = 3  # How long the recording start and stop messages stay on screen
+
+
+# Records the game's input for input_replay: toggle_key starts a recording in
+# <recording_prefix>-<date>-<time>.jsonl and stops it again. header() is
+# called when recording starts and returns the script, world seed and game
+# state to store with it. Every key is written through an InputRecorder with
+# the camera and player position at the time, every frame with its time.dt
+# and where the player is.
+class InputRecording(Entity):
+    def __init__(self, player, recording_prefix, header, toggle_key='f2'):
+        super().__init__()
+        self.player = player
+        self.recording_prefix = recording_prefix
+        self.header = header
+        self.toggle_key = toggle_key
+        self.recorder = None
+
+    def update(self):
+        if self.recorder is not None:
+            self.recorder.end_frame(time.dt, self.player.position, self.player.forward)
+
+    def input(self, key):
+        if key == self.toggle_key:
+            if self.recorder is None:
+                path = f'{self.recording_prefix}-{time.strftime("%Y%m%d-%H%M%S")}.jsonl'
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self.recorder = InputRecorder(path, self.header())
+                self.message(f'Recording input to {os.path.relpath(path)}')
+            else:
+                self.recorder.close()
+                self.message(f'Recorded {self.recorder.frames} frames')
+                self.recorder = None
+        elif self.recorder is not None:
+            self.recorder.record(key, camera.world_position, camera.forward, self.player.position)
+
+    def message(self, text):
+        print_on_screen(text, position=window.bottom_left + (0.02, 0.06), scale=0.8, duration=MESSAGE_SECONDS)
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from chunk_jobs import ChunkJobQueue
+from chunk_mesher import make_translucent_table
+from chunk_storage import CHUNK_SIZE
+from chunk_streaming import ChunkStreamer
+from recording_file import RECORDING_VERSION, InputRecorder
+from region_file import WorldStorage
+from terrain import AIR, DIRT, GLASS, WATER
+from voxel_world import SCRIPT_RULES, BlockEditor, VoxelWorld
+
+# Streaming settings of the chunk scripts, for recordings that do not carry them
+VIEW_RADIUS = 4
+UNLOAD_RADIUS = 6
+LOD_DISTANCES = (2, 3)
+
+
+# Header and frames of a recording
+def read_recording(path):
+    with open(path) as file:
+        header = json.loads(file.readline())
+        frames = [json.loads(line) for line in file if line.strip()]
+    if header.get('version') != RECORDING_VERSION:
+        raise ValueError(f'unsupported recording version {header.get("version")}')
+    return header, frames
+
+
+# SHA-256 of the blocks of the given chunks, in chunk key order
+def world_hash(chunks):
+    digest = hashlib.sha256()
+    for chunk_key in sorted(chunks):
+        digest.update(np.array(chunk_key, dtype=np.int64).tobytes())
+        digest.update(chunks[chunk_key].tobytes())
+    return digest.hexdigest()
+
+
+# A chunk script's world driven by recorded input instead of Ursina: the same
+# VoxelWorld and BlockEditor the script builds from SCRIPT_RULES, streaming
+# around the recorded player through a job queue and saving what it unloads to
+# a temporary world. Meshes are built by the job workers as in the game and
+# then dropped, as there is nothing to draw them on.
+class ReplaySession:
+    def __init__(self, header):
+        rules = SCRIPT_RULES.get(header['script'])
+        if rules is None:
+            raise ValueError(f'no replay rules for {header["script"]}')
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = WorldStorage(self.directory.name)
+        self.jobs = ChunkJobQueue()
+        self.unloaded = set()
+        palette = np.ones((256, 4), dtype=np.float32)
+        streamer = ChunkStreamer(header.get('view_radius', VIEW_RADIUS), header.get('unload_radius', UNLOAD_RADIUS))
+        self.world = VoxelWorld(rules['generator'], header['seed'], palette, make_translucent_table({WATER, GLASS}), split=True,
+                                storage=self.storage, jobs=self.jobs, streamer=streamer, lod_distances=tuple(header.get('lod_distances', LOD_DISTANCES)),
+                                falling_blocks=rules['falling_blocks'], on_meshed=lambda chunk_key, buffers: None, on_unloaded=self.unloaded.add)
+        self.editor = BlockEditor(self.world, rules['break_key'], rules['place_key'], rules['select_keys'], header.get('selected_block', DIRT))
+        self.playing = header.get('playing', False)
+        # The scripts build the spawn chunk before the first frame
+        self.world.load_chunk(0, 0)
+
+    # The script's input(): space leaves the menu, everything else goes to the
+    # block editor
+    def input(self, key, origin, direction, player_position):
+        if key == 'space' and not self.playing:
+            self.playing = True
+        else:
+            self.editor.input(key, origin, direction, player_position, self.playing)
+
+    def update(self, dt, player_position, forward):
+        self.world.update(dt, player_position, forward, float('inf'))
+
+    # Wait for the jobs of the frame and apply them, so the next frame sees
+    # the same chunks however fast the workers are; returns the seconds spent
+    # applying them
+    def finish_jobs(self):
+        self.jobs.wait()
+        start = time.perf_counter()
+        self.world.process_jobs(float('inf'))
+        return time.perf_counter() - start
+
+    def settling(self):
+        return len(self.world.block_updates) > 0
+
+    # Blocks of every chunk the replay loaded: in memory, or saved when unloaded
+    def chunks(self):
+        self.world.save()
+        chunks = {chunk_key: chunk.data for chunk_key, chunk in self.world.chunks.items()}
+        for chunk_key in self.unloaded - set(chunks):
+            voxels = self.storage.load_chunk(*chunk_key)
+            if voxels is not None:
+                chunks[chunk_key] = voxels
+        return chunks
+
+    def close(self):
+        self.jobs.shutdown()
+        self.storage.close()
+        self.directory.cleanup()
+
+
+# Play a recording back headlessly. Returns frame-time statistics for the
+# recorded session (its time.dt) and for the replayed main-thread world work,
+# the time spent waiting for the job workers, the number of block edits and
+# the hash of the final world, which is the same on every build that handles
+# the input the same way.
+def replay(path):
+    header, frames = read_recording(path)
+    session = ReplaySession(header)
+    work_times = []
+    wait_times = []
+    try:
+        for frame in frames:
+            start = time.perf_counter()
+            for key, origin, direction, player_position in frame['events']:
+                session.input(key, origin, direction, player_position)
+            session.update(frame['dt'], frame['player'], frame['forward'])
+            work = time.perf_counter() - start
+            start = time.perf_counter()
+            applied = session.finish_jobs()
+            wait_times.append(time.perf_counter() - start - applied)
+            work_times.append(work + applied)
+        # Let blocks still falling at the end of the recording settle
+        while frames and session.settling():
+            session.update(session.world.block_updates.tick_length, frames[-1]['player'], frames[-1]['forward'])
+            session.finish_jobs()
+        chunks = session.chunks()
+    finally:
+        session.close()
+
+    def stats(samples):
+        samples = np.asarray(samples, dtype=np.float64) * 1000
+        if not len(samples):
+            return {}
+        return {'mean': round(float(samples.mean()), 4), 'p50': round(float(np.percentile(samples, 50)), 4),
+                'p95': round(float(np.percentile(samples, 95)), 4), 'p99': round(float(np.percentile(samples, 99)), 4),
+                'max': round(float(samples.max()), 4)}
+    return {
+        'script': header['script'],
+        'seed': header['seed'],
+        'frames': len(frames),
+        'events': sum(len(frame['events']) for frame in frames),
+        'edits': session.editor.edits,
+        'recorded_frame_ms': stats([frame['dt'] for frame in frames]),
+        'replay_frame_ms': stats(work_times),
+        'worker_wait_ms': stats(wait_times),
+        'world_hash': world_hash(chunks),
+        }
+
+
+# Scripted load test for a script: dig a trench of dig_length blocks along x
+# looking straight down, one click per frame, then place places blocks on top
+# of the terrain beside it. Recorded at 60 fps, as if played in a new world.
+def write_scripted_session(path, script, seed, dig_length=20, places=500):
+    rules = SCRIPT_RULES[script]
+    world = VoxelWorld(rules['generator'], seed, np.ones((256, 4), dtype=np.float32), make_translucent_table({WATER, GLASS}))
+    recorder = InputRecorder(path, {'script': script, 'seed': seed, 'playing': True, 'selected_block': DIRT, 'view_radius': VIEW_RADIUS,
+                                    'unload_radius': UNLOAD_RADIUS, 'lod_distances': LOD_DISTANCES})
+    down = (0.0, -1.0, 0.0)
+    forward = (0.0, 0.0, 1.0)
+
+    def click(key, x, z):
+        world.load_chunk(x // CHUNK_SIZE, z // CHUNK_SIZE)
+        camera = (x + 0.5, world.terrain_height(x, z) + 3.5, z + 0.5)
+        player = (x + 2.5, camera[1] - 1.5, z + 2.5)
+        recorder.record(key, camera, down, player)
+        recorder.end_frame(1 / 60, player, forward)
+
+    for x in range(dig_length):
+        for _ in range(3):
+            click(rules['break_key'], x, 0)
+            world.set_block(x, world.terrain_height(x, 0), 0, AIR)
+    for i in range(places):
+        x, z = i % dig_length, 2 + (i // dig_length) % 8
+        click(rules['place_key'], x, z)
+        world.set_block(x, world.terrain_height(x, z) + 1, z, DIRT)
+    recorder.close()
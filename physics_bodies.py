@@ -0,0 +1,138 @@
+# Dropped items as one batched physics system: a vectorised step per frame
+# instead of an update() per item entity. The step has a fixed cost the
+# per-entity loop did not, so it only wins once there are a few items.
+# `benchmarks.py bodies` measures the crossover. At 10 items the two cost
+# about the same: 0.058-0.062 ms a frame for the entity loop against
+# 0.052-0.056 ms for the batched step. Below that the loop is cheaper, by at
+# most about 0.03 ms (0.006 against 0.035 ms for one item). Above it the
+# step pulls ahead: 0.11 against 0.06 ms at 20 items, 5.4 against 0.25 ms at
+# 1000.
+
+import numpy as np
+
+from chunk_storage import CHUNK_SIZE
+
+# Physics settings. GRAVITY matches the old per-entity update at 60 fps
+# (fall_speed -= 0.1 per frame, y += fall_speed * dt * 10), but per second.
+GRAVITY = 60.0
+ITEM_LIFETIME = 300.0  # Seconds before a dropped item despawns
+MERGE_INTERVAL = 0.5  # Seconds between merges of resting items
+GATHER_MIN_COLUMNS = 64  # Columns from which ground_heights gathers from stacked heightmaps
+
+
+# Ground heights (highest solid y, 0 for empty or missing columns) of world
+# columns xs, zs. voxels_at(chunk_key) returns a chunk's ChunkVoxels or None.
+# The heightmaps of the chunks the columns fall in are stacked once and then
+# read with a single gather, rather than one lookup per body. Below
+# GATHER_MIN_COLUMNS columns the fixed cost of that (np.unique and the stack)
+# is higher than looking each column up on its own.
+def ground_heights(voxels_at, xs, zs):
+    if len(xs) < GATHER_MIN_COLUMNS:
+        heights = []
+        for x, z in zip(xs.tolist(), zs.tolist()):
+            voxels = voxels_at((x // CHUNK_SIZE, z // CHUNK_SIZE))
+            heights.append(max(voxels.height(x % CHUNK_SIZE, z % CHUNK_SIZE), 0) if voxels is not None else 0)
+        return np.array(heights, dtype=np.int64)
+    chunk_xs = xs // CHUNK_SIZE
+    chunk_zs = zs // CHUNK_SIZE
+    _, first, groups = np.unique(chunk_xs * (1 << 32) + chunk_zs, return_index=True, return_inverse=True)
+    heightmaps = np.zeros((len(first), CHUNK_SIZE, CHUNK_SIZE), dtype=np.int16)
+    for group, index in enumerate(first.tolist()):
+        voxels = voxels_at((int(chunk_xs[index]), int(chunk_zs[index])))
+        if voxels is not None:
+            heightmaps[group] = voxels.get_heightmap()
+    heights = heightmaps[groups.ravel(), xs % CHUNK_SIZE, zs % CHUNK_SIZE]
+    return np.maximum(heights, 0).astype(np.int64)
+
+
+# Dropped items, stored as parallel arrays (structure of arrays) and
+# integrated together in one vectorised step per frame. Items rest on the
+# ground, merge with identical items resting in the same block cell and
+# despawn after ITEM_LIFETIME. Falling sand and gravel are not bodies: they
+# move through scheduled block updates (block_updates.py).
+class PhysicsBodies:
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.positions = np.zeros((capacity, 3), dtype=np.float64)
+        self.velocities = np.zeros(capacity, dtype=np.float64)
+        self.blocks = np.zeros(capacity, dtype=np.uint8)
+        self.amounts = np.zeros(capacity, dtype=np.int32)
+        self.ages = np.zeros(capacity, dtype=np.float64)
+        self.grounded = np.zeros(capacity, dtype=bool)
+        self.merge_timer = 0.0
+
+    def _arrays(self):
+        return ('positions', 'velocities', 'blocks', 'amounts', 'ages', 'grounded')
+
+    def spawn_item(self, position, block, amount=1):
+        if self.count == len(self.blocks):
+            for name in self._arrays():
+                array = getattr(self, name)
+                grown = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+                grown[:self.count] = array[:self.count]
+                setattr(self, name, grown)
+        index = self.count
+        self.positions[index] = position
+        self.velocities[index] = 0
+        self.blocks[index] = block
+        self.amounts[index] = amount
+        self.ages[index] = 0
+        self.grounded[index] = False
+        self.count += 1
+
+    # Keep only the bodies where keep is True, preserving their order
+    def _compact(self, keep):
+        count = int(keep.sum())
+        for name in self._arrays():
+            array = getattr(self, name)
+            array[:count] = array[:self.count][keep]
+        self.count = count
+
+    # Advance every body by dt seconds. ground_heights(xs, zs) gives the
+    # highest solid y of each column.
+    def step(self, dt, ground_heights):
+        n = self.count
+        if n == 0:
+            return
+        positions = self.positions[:n]
+        columns = np.floor(positions[:, [0, 2]]).astype(np.int64)
+        rest_y = ground_heights(columns[:, 0], columns[:, 1]) + 1
+
+        falling = positions[:, 1] > rest_y
+        self.velocities[:n][falling] -= GRAVITY * dt
+        positions[falling, 1] += self.velocities[:n][falling] * dt
+        landed = positions[:, 1] <= rest_y
+        positions[landed, 1] = rest_y[landed]
+        self.velocities[:n][landed] = 0
+        self.grounded[:n] = landed
+        self.ages[:n] += dt
+
+        keep = self.ages[:n] <= ITEM_LIFETIME
+        if not keep.all():
+            self._compact(keep)
+
+        self.merge_timer += dt
+        if self.merge_timer >= MERGE_INTERVAL:
+            self.merge_timer = 0.0
+            self.merge_items()
+
+    # Merge items of the same block resting in the same block cell into the
+    # oldest one of them, adding up their amounts
+    def merge_items(self):
+        n = self.count
+        resting = np.flatnonzero(self.grounded[:n])
+        if len(resting) < 2:
+            return
+        cells = np.floor(self.positions[resting]).astype(np.int64)
+        keys = np.column_stack((cells, self.blocks[resting]))
+        _, first, groups = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        if len(first) == len(resting):
+            return
+        targets = resting[first][groups.ravel()]
+        totals = np.zeros(n, dtype=np.int32)
+        np.add.at(totals, targets, self.amounts[resting])
+        self.amounts[:n][resting[first]] = totals[resting[first]]
+        keep = np.ones(n, dtype=bool)
+        keep[resting] = False
+        keep[resting[first]] = True
+        self._compact(keep)
@@ -0,0 +1,47 @@
+import os
+import time
+
+from ursina import Text, camera, color, print_on_screen, window
+
+REFRESH_INTERVAL = 0.25  # Seconds between overlay text updates
+SUMMARY_FRAMES = 60  # Frames averaged by the overlay
+MESSAGE_SECONDS = 3  # How long the trace dump message stays on screen
+
+
+# In-game view of a FrameProfiler: mean and worst milliseconds of the frame
+# and of every timer over the last SUMMARY_FRAMES frames. toggle_key shows and
+# hides it; dump_key writes the buffered frames to
+# <trace_prefix>-<date>-<time>.csv and .json whether it is shown or not.
+class ProfilerOverlay(Text):
+    def __init__(self, profiler, trace_prefix, toggle_key='f3', dump_key='f4'):
+        super().__init__(parent=camera.ui, position=window.top_left + (0.01, -0.01), origin=(-0.5, 0.5),
+                         font='VeraMono.ttf', scale=0.75, color=color.white, background=True)
+        self.profiler = profiler
+        self.trace_prefix = trace_prefix
+        self.toggle_key = toggle_key
+        self.dump_key = dump_key
+        self.refresh_timer = 0.0
+        self.visible = False
+        self.ignore = False  # Text entities skip update() and input() by default
+
+    def update(self):
+        self.refresh_timer += time.dt
+        if not self.visible or self.refresh_timer < REFRESH_INTERVAL:
+            return
+        self.refresh_timer = 0.0
+        lines = [f'{"":<16}{"mean":>7}{"max":>8}']
+        for name, mean, worst in self.profiler.summary(SUMMARY_FRAMES):
+            lines.append(f'{name:<16}{mean:>7.2f}{worst:>8.2f}')
+        lines.append(f'{self.dump_key.upper()}: dump trace')
+        self.text = '\n'.join(lines)
+
+    def input(self, key):
+        if key == self.toggle_key:
+            self.visible = not self.visible
+            self.refresh_timer = REFRESH_INTERVAL
+        elif key == self.dump_key:
+            path = f'{self.trace_prefix}-{time.strftime("%Y%m%d-%H%M%S")}'
+            self.profiler.dump(path + '.csv')
+            self.profiler.dump(path + '.json')
+            print_on_screen(f'Frame trace written to {os.path.relpath(path)}.csv/.json', position=window.bottom_left + (0.02, 0.06),
+                            scale=0.8, duration=MESSAGE_SECONDS)
@@ -0,0 +1,29 @@
+import json
+
+RECORDING_VERSION = 1
+
+
+# Writes an input recording as JSON lines: a header (script, world seed, the
+# game state when recording started and the script's streaming settings),
+# then one line per frame with its time.dt, the player position and facing
+# and the input events of that frame. Each event keeps the camera position
+# and direction and the player position at the time, which is all a click
+# needs to be replayed without a window.
+class InputRecorder:
+    def __init__(self, path, header):
+        self.file = open(path, 'w')
+        self.file.write(json.dumps({'version': RECORDING_VERSION, **header}) + '\n')
+        self.events = []
+        self.frames = 0
+
+    def record(self, key, origin, direction, player_position):
+        self.events.append([key, [float(v) for v in origin], [float(v) for v in direction], [float(v) for v in player_position]])
+
+    def end_frame(self, dt, player_position, forward):
+        self.file.write(json.dumps({'dt': dt, 'player': [float(v) for v in player_position], 'forward': [float(v) for v in forward],
+                                    'events': self.events}) + '\n')
+        self.events = []
+        self.frames += 1
+
+    def close(self):
+        self.file.close()
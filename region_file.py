@@ -0,0 +1,137 @@
+import json
+import math
+import mmap
+import os
+import zlib
+
+import numpy as np
+
+from chunk_storage import CHUNK_SIZE
+
+# Region files hold REGION_SIZE x REGION_SIZE chunks. The file starts with a
+# magic string and an offset table of (offset, length) uint32 pairs, one per
+# chunk slot, followed by zlib-compressed chunk blobs aligned to SECTOR_SIZE.
+# An offset of 0 means the chunk has never been saved.
+REGION_SIZE = 32
+SECTOR_SIZE = 256
+MAGIC = b'MC4KRGN1'
+HEADER_SIZE = len(MAGIC) + REGION_SIZE * REGION_SIZE * 8
+
+
+def region_key(chunk_x, chunk_z):
+    return (chunk_x // REGION_SIZE, chunk_z // REGION_SIZE)
+
+
+# Chunks are stored column by column ([x, z, y] order), which keeps the long
+# vertical runs of stone, dirt and air together for the compressor
+def compress_chunk(voxels):
+    return zlib.compress(np.ascontiguousarray(voxels.transpose(0, 2, 1)).tobytes())
+
+
+def decompress_chunk(blob, size=CHUNK_SIZE):
+    data = np.frombuffer(zlib.decompress(blob), dtype=np.uint8)
+    if data.size != size ** 3:
+        raise ValueError(f'chunk blob holds {data.size} blocks, expected {size ** 3}')
+    return data.reshape(size, size, size).transpose(0, 2, 1).copy()
+
+
+# One region file. The offset table is memory-mapped, so finding a chunk is a
+# lookup in the mapped header followed by a single read of its blob.
+class RegionFile:
+    def __init__(self, path):
+        exists = os.path.exists(path)
+        self.path = path
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self.file.write(MAGIC + bytes(HEADER_SIZE - len(MAGIC)))
+            self.file.flush()
+        self.header = mmap.mmap(self.file.fileno(), HEADER_SIZE)
+        if self.header[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a region file')
+        self.table = np.frombuffer(self.header, dtype='<u4', offset=len(MAGIC)).reshape(-1, 2)
+
+    def _slot(self, chunk_x, chunk_z):
+        return (chunk_z % REGION_SIZE) * REGION_SIZE + (chunk_x % REGION_SIZE)
+
+    def has_chunk(self, chunk_x, chunk_z):
+        return self.table[self._slot(chunk_x, chunk_z), 0] != 0
+
+    def read_chunk(self, chunk_x, chunk_z):
+        offset, length = self.table[self._slot(chunk_x, chunk_z)]
+        if offset == 0:
+            return None
+        self.file.seek(int(offset))
+        return decompress_chunk(self.file.read(int(length)))
+
+    # Rewrite the chunk in place when it still fits its sectors, otherwise
+    # append it at the end of the file
+    def write_chunk(self, chunk_x, chunk_z, voxels):
+        blob = compress_chunk(voxels)
+        slot = self._slot(chunk_x, chunk_z)
+        offset, length = (int(value) for value in self.table[slot])
+        sectors = math.ceil(len(blob) / SECTOR_SIZE)
+        if offset == 0 or math.ceil(length / SECTOR_SIZE) < sectors:
+            end = self.file.seek(0, os.SEEK_END)
+            offset = math.ceil(max(end, HEADER_SIZE) / SECTOR_SIZE) * SECTOR_SIZE
+        self.file.seek(offset)
+        self.file.write(blob.ljust(sectors * SECTOR_SIZE, b'\0'))
+        self.table[slot] = (offset, len(blob))
+
+    def flush(self):
+        self.file.flush()
+        self.header.flush()
+
+    def close(self):
+        self.table = None
+        if not self.header.closed:
+            self.header.flush()
+            self.header.close()
+        self.file.close()
+
+
+# A saved world: a directory of region files plus world.json for settings
+# such as the seed. Region files are opened on first use and kept open.
+class WorldStorage:
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.regions = {}
+        self.metadata_path = os.path.join(path, 'world.json')
+        self.metadata = {}
+        if os.path.exists(self.metadata_path):
+            with open(self.metadata_path) as f:
+                self.metadata = json.load(f)
+
+    def region(self, chunk_x, chunk_z, create=False):
+        key = region_key(chunk_x, chunk_z)
+        region = self.regions.get(key)
+        if region is None:
+            path = os.path.join(self.path, f'r.{key[0]}.{key[1]}.mc4r')
+            if not create and not os.path.exists(path):
+                return None
+            region = self.regions[key] = RegionFile(path)
+        return region
+
+    # Saved voxel array of a chunk, or None if it was never saved
+    def load_chunk(self, chunk_x, chunk_z):
+        region = self.region(chunk_x, chunk_z)
+        if region is None:
+            return None
+        return region.read_chunk(chunk_x, chunk_z)
+
+    def save_chunk(self, chunk_x, chunk_z, voxels):
+        self.region(chunk_x, chunk_z, create=True).write_chunk(chunk_x, chunk_z, voxels)
+
+    def save_metadata(self):
+        with open(self.metadata_path, 'w') as f:
+            json.dump(self.metadata, f)
+
+    def flush(self):
+        for region in self.regions.values():
+            region.flush()
+
+    def close(self):
+        for region in self.regions.values():
+            region.close()
+        self.regions.clear()
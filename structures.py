@@ -0,0 +1,66 @@
+from chunk_storage import AIR, CHUNK_SIZE
+
+# Structures such as trees can reach past the chunk they are rooted in. A
+# generator only writes the blocks that land in its own chunk; the rest become
+# pending writes for the neighbouring chunks, applied whenever those chunks
+# arrive (generated, loaded from disk or already in memory), so no neighbour has
+# to be generated first and chunks can still be generated in parallel.
+# Pending writes only fill air, so the outcome does not depend on whether the
+# neighbour was generated before or after the structure.
+
+
+# Split structure blocks given in world coordinates into the writes for the
+# chunk at (chunk_x, chunk_z) and {chunk_key: [(x, y, z, block), ...]} pending
+# writes for other chunks, all in chunk-local coordinates. Blocks above or
+# below the world are dropped.
+def split_structure(chunk_x, chunk_z, blocks):
+    inside = []
+    pending = {}
+    for x, y, z, block in blocks:
+        if not 0 <= y < CHUNK_SIZE:
+            continue
+        chunk_key = (x // CHUNK_SIZE, z // CHUNK_SIZE)
+        write = (x % CHUNK_SIZE, y, z % CHUNK_SIZE, block)
+        if chunk_key == (chunk_x, chunk_z):
+            inside.append(write)
+        else:
+            pending.setdefault(chunk_key, []).append(write)
+    return inside, pending
+
+
+def merge_pending(pending, more):
+    for chunk_key, writes in more.items():
+        pending.setdefault(chunk_key, []).extend(writes)
+
+
+# Apply pending writes to a chunk's voxel array; returns True if any block changed
+def apply_pending(voxels, writes):
+    changed = False
+    for x, y, z, block in writes:
+        if voxels[x, y, z] == AIR:
+            voxels[x, y, z] = block
+            changed = True
+    return changed
+
+
+# Pending writes waiting for chunks that are not loaded yet. They are kept in
+# the world metadata between sessions, keyed by "chunk_x,chunk_z".
+class PendingWrites:
+    def __init__(self, saved=None):
+        self.writes = {}
+        for key, writes in (saved or {}).items():
+            chunk_x, chunk_z = (int(value) for value in key.split(','))
+            self.writes[(chunk_x, chunk_z)] = [tuple(write) for write in writes]
+
+    def add(self, pending):
+        merge_pending(self.writes, pending)
+
+    # Remove and return the writes waiting for a chunk
+    def take(self, chunk_key):
+        return self.writes.pop(chunk_key, [])
+
+    def to_json(self):
+        return {f'{chunk_x},{chunk_z}': writes for (chunk_x, chunk_z), writes in self.writes.items()}
+
+    def __len__(self):
+        return len(self.writes)
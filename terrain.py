@@ -0,0 +1,204 @@
+import random
+
+import numpy as np
+
+from chunk_storage import CHUNK_SIZE, ChunkVoxels
+from structures import apply_pending, merge_pending, split_structure
+
+# Block types (same ids as the chunk-based scripts)
+AIR = 0
+DIRT = 1
+WATER = 2
+GLASS = 3
+BEDROCK = 4
+STONE = 5
+GRASS = 6
+WOOD = 7
+SAND = 8
+GRAVEL = 9
+LEAVES = 10
+LOG = 11
+
+# Biome types
+BIOME_PLAINS = 0
+BIOME_FOREST = 1
+BIOME_DESERT = 2
+
+# Chunk generators are plain functions of (chunk_x, chunk_z, seed) returning the
+# chunk's uint8 voxel array, so they can run in worker processes. All their
+# randomness comes from chunk_rng, never from the global random module, so a
+# chunk is the same bit for bit whatever order or process it is generated in.
+
+# World seeds are positive (PerlinNoise treats a seed of 0 as "pick one")
+MAX_SEED = 2 ** 31 - 1
+
+def new_world_seed():
+    return random.randint(1, MAX_SEED)
+
+# Random generator for one chunk, derived only from the world seed and the
+# chunk position (string seeds are hashed with SHA-512, not hash(), so this
+# does not change between runs)
+def chunk_rng(seed, chunk_x, chunk_z):
+    return random.Random(f'{seed}:{chunk_x}:{chunk_z}')
+
+# Terrain noise settings (as passed to perlin_noise.PerlinNoise)
+NOISE_OCTAVES = 4
+BIOME_SCALE = 100
+HEIGHT_SCALE = 50
+
+# Gradient vectors of noise lattice points per seed, built once per process
+_gradients_by_seed = {}
+
+# Gradient vector of one lattice point, derived the way the perlin_noise
+# library does it, so the grids below match PerlinNoise(octaves=4, seed=seed)
+def lattice_gradient(seed, i, j):
+    gradients = _gradients_by_seed.setdefault(seed, {})
+    gradient = gradients.get((i, j))
+    if gradient is None:
+        rng = random.Random(seed * max(1, abs(i + 10 * j + 1)))
+        gradient = gradients[(i, j)] = (rng.uniform(-1, 1), rng.uniform(-1, 1))
+    return gradient
+
+def fade(t):
+    return 6 * t ** 5 - 15 * t ** 4 + 10 * t ** 3
+
+# Noise values for every (x, z) pair of the world coordinate arrays xs and zs,
+# as a (len(xs), len(zs)) grid. Only the handful of lattice gradients the grid
+# touches are looked up in Python; the blending is done with array arithmetic.
+def noise_grid(seed, xs, zs, scale):
+    px = (np.asarray(xs, dtype=np.float64) / scale * NOISE_OCTAVES)[:, None]
+    pz = (np.asarray(zs, dtype=np.float64) / scale * NOISE_OCTAVES)[None, :]
+    ix = np.floor(px).astype(np.int64)
+    iz = np.floor(pz).astype(np.int64)
+    i0, j0 = int(ix.min()), int(iz.min())
+    gradients = np.array([[lattice_gradient(seed, i, j) for j in range(j0, int(iz.max()) + 2)]
+                          for i in range(i0, int(ix.max()) + 2)])
+    total = np.zeros((px.shape[0], pz.shape[1]))
+    for ox in (0, 1):
+        for oz in (0, 1):
+            dx = px - (ix + ox)
+            dz = pz - (iz + oz)
+            gradient = gradients[ix - i0 + ox, iz - j0 + oz]
+            weight = fade(1 - np.abs(dx)) * fade(1 - np.abs(dz))
+            total = total + weight * (gradient[..., 0] * dx + gradient[..., 1] * dz)
+    return total
+
+# Surface height and biome of every column of the xs by zs grid
+def terrain_columns(seed, xs, zs):
+    biome_noise = noise_grid(seed, xs, zs, BIOME_SCALE)
+    biomes = np.full(biome_noise.shape, BIOME_PLAINS, dtype=np.uint8)
+    biomes[biome_noise < -0.1] = BIOME_DESERT
+    biomes[biome_noise > 0.1] = BIOME_FOREST
+    heights = ((noise_grid(seed, xs, zs, HEIGHT_SCALE) + 1) * 5).astype(np.int64) + 5
+    return heights, biomes
+
+# Fill an (X, CHUNK_SIZE, Z) volume from column heights and biomes: bedrock
+# floor, stone up to three blocks below the surface, then dirt (sand in
+# deserts) and a grass (sand) top
+def fill_columns(heights, biomes):
+    y = np.arange(CHUNK_SIZE)[None, :, None]
+    height = heights[:, None, :]
+    desert = (biomes == BIOME_DESERT)[:, None, :]
+    voxels = np.full((heights.shape[0], CHUNK_SIZE, heights.shape[1]), AIR, dtype=np.uint8)
+    voxels[y < height] = DIRT
+    voxels[(y < height) & desert] = SAND
+    voxels[y == height] = GRASS
+    voxels[(y == height) & desert] = SAND
+    voxels[y < height - 3] = STONE
+    voxels[:, 0, :] = BEDROCK
+    return voxels
+
+# 10% of forest columns get a tree on top of their grass. Tree blocks inside
+# the chunk are written to voxels; returns the pending writes for the
+# neighbouring chunks that the leaves reach into.
+def plant_trees(voxels, chunk_x, chunk_z, heights, biomes, rng):
+    pending = {}
+    for x, z in zip(*np.nonzero(biomes == BIOME_FOREST)):
+        if rng.random() < 0.1:
+            height = int(heights[x, z])
+            if height < CHUNK_SIZE:
+                blocks = tree_blocks(chunk_x * CHUNK_SIZE + int(x), height, chunk_z * CHUNK_SIZE + int(z))
+                inside, outside = split_structure(chunk_x, chunk_z, blocks)
+                for local_x, y, local_z, block in inside:
+                    voxels[local_x, y, local_z] = block
+                merge_pending(pending, outside)
+    return pending
+
+# Perlin terrain with plains, forest and desert biomes (MINECRAFT4K1.1.A5.24.py).
+# Returns the voxel array and the pending writes for neighbouring chunks.
+def generate_perlin_chunk(chunk_x, chunk_z, seed):
+    chunks, pending = generate_perlin_area(chunk_x, chunk_z, 1, 1, seed)
+    return chunks[(chunk_x, chunk_z)], pending
+
+# A width by depth block of chunks starting at (chunk_x, chunk_z), with the
+# noise evaluated once for the whole area. Returns {(chunk_x, chunk_z): voxels}
+# and the pending writes for chunks outside the area; writes between chunks of
+# the area are applied once every chunk has its own trees, as they would be
+# if the chunks were generated one by one.
+def generate_perlin_area(chunk_x, chunk_z, width, depth, seed):
+    xs = np.arange(chunk_x * CHUNK_SIZE, (chunk_x + width) * CHUNK_SIZE)
+    zs = np.arange(chunk_z * CHUNK_SIZE, (chunk_z + depth) * CHUNK_SIZE)
+    heights, biomes = terrain_columns(seed, xs, zs)
+    volume = fill_columns(heights, biomes)
+    chunks = {}
+    pending = {}
+    for dx in range(width):
+        for dz in range(depth):
+            chunk_key = (chunk_x + dx, chunk_z + dz)
+            columns = (slice(dx * CHUNK_SIZE, (dx + 1) * CHUNK_SIZE), slice(dz * CHUNK_SIZE, (dz + 1) * CHUNK_SIZE))
+            voxels = chunks[chunk_key] = volume[columns[0], :, columns[1]].copy()
+            merge_pending(pending, plant_trees(voxels, *chunk_key, heights[columns], biomes[columns], chunk_rng(seed, *chunk_key)))
+    for chunk_key in list(pending):
+        if chunk_key in chunks:
+            apply_pending(chunks[chunk_key], pending.pop(chunk_key))
+    return chunks, pending
+
+# Simple tree in world coordinates: 3 logs high from the surface block with a
+# 3x3 leaf canopy on top
+def tree_blocks(x, y, z):
+    blocks = [(x, yy, z, LOG) for yy in range(y, y + 3)]
+    for xx in range(x - 1, x + 2):
+        for zz in range(z - 1, z + 2):
+            blocks.append((xx, y + 3, zz, LEAVES))
+    return blocks
+
+# Random column heights with grass and water pools (MC4K5.24.25.0.py)
+def generate_hills_chunk(chunk_x, chunk_z, seed):
+    rng = chunk_rng(seed, chunk_x, chunk_z)
+    voxels = ChunkVoxels(CHUNK_SIZE)
+    for x in range(CHUNK_SIZE):
+        for z in range(CHUNK_SIZE):
+            height = rng.randint(5, 10)
+            for y in range(CHUNK_SIZE):
+                if y == 0:
+                    voxels.set_block(x, y, z, BEDROCK)
+                elif y < height - 3:
+                    voxels.set_block(x, y, z, STONE)
+                elif y < height:
+                    voxels.set_block(x, y, z, DIRT)
+                elif y == height:
+                    if rng.random() < 0.2:
+                        voxels.set_block(x, y, z, WATER)
+                    else:
+                        voxels.set_block(x, y, z, GRASS)
+                else:
+                    voxels.set_block(x, y, z, AIR)
+    return voxels.data
+
+# Low dirt flats with water and glass (MINECRAFT4K5.24.251.0A.py)
+def generate_flat_chunk(chunk_x, chunk_z, seed):
+    rng = chunk_rng(seed, chunk_x, chunk_z)
+    voxels = ChunkVoxels(CHUNK_SIZE)
+    for x in range(CHUNK_SIZE):
+        for z in range(CHUNK_SIZE):
+            height = int(rng.uniform(0, 3))
+            for y in range(CHUNK_SIZE):
+                if y == 0:
+                    voxels.set_block(x, y, z, BEDROCK)  # Bottom layer is bedrock
+                elif y < height:
+                    voxels.set_block(x, y, z, DIRT)
+                elif y == height and rng.random() < 0.2:
+                    voxels.set_block(x, y, z, WATER)
+                elif y == height + 1 and rng.random() < 0.1:
+                    voxels.set_block(x, y, z, GLASS)
+    return voxels.data
@@ -0,0 +1,46 @@
+from block_updates import MAX_TICKS_PER_FRAME, TICK_LENGTH, BlockUpdateQueue
+
+
+def test_positions_come_due_after_their_delay():
+    queue = BlockUpdateQueue()
+    assert queue.schedule((0, 5, 0))
+    assert queue.schedule((1, 2, 0), delay=3)
+    assert queue.advance(TICK_LENGTH / 2) == []
+    assert queue.advance(TICK_LENGTH / 2) == [[(0, 5, 0)]]
+    assert queue.advance(TICK_LENGTH) == [[]]
+    assert queue.advance(TICK_LENGTH) == [[(1, 2, 0)]]
+    assert len(queue) == 0
+
+
+# A position is queued once, at its earliest due tick
+def test_scheduling_is_deduplicated():
+    queue = BlockUpdateQueue()
+    assert queue.schedule((0, 0, 0), delay=2)
+    assert not queue.schedule((0, 0, 0), delay=3)
+    assert queue.schedule((0, 0, 0), delay=1)
+    assert len(queue) == 1
+    assert queue.advance(TICK_LENGTH) == [[(0, 0, 0)]]
+    assert queue.advance(TICK_LENGTH) == [[]]
+    # A delay below one tick still waits for the next tick
+    assert queue.schedule((0, 0, 0), delay=0)
+    assert queue.advance(TICK_LENGTH) == [[(0, 0, 0)]]
+
+
+def test_batches_are_sorted_bottom_first():
+    queue = BlockUpdateQueue()
+    for y in (7, 2, 9, 0, 4):
+        queue.schedule((3, y, 1))
+    assert queue.advance(TICK_LENGTH) == [[(3, 0, 1), (3, 2, 1), (3, 4, 1), (3, 7, 1), (3, 9, 1)]]
+
+
+# A long frame runs at most MAX_TICKS_PER_FRAME ticks and drops the rest of
+# the time; positions due later stay queued
+def test_slow_frames_do_not_snowball():
+    queue = BlockUpdateQueue()
+    queue.schedule((0, 0, 0), delay=MAX_TICKS_PER_FRAME + 2)
+    batches = queue.advance(TICK_LENGTH * 100)
+    assert len(batches) == MAX_TICKS_PER_FRAME
+    assert queue.tick == MAX_TICKS_PER_FRAME
+    assert queue.elapsed == 0.0
+    assert len(queue) == 1
+    assert queue.advance(TICK_LENGTH * 2)[-1] == [(0, 0, 0)]
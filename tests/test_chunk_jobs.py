@@ -0,0 +1,87 @@
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from chunk_jobs import ChunkJobQueue
+from chunk_mesher import build_mesh_buffers, make_translucent_table, padded_volume
+from chunk_storage import CHUNK_SIZE
+
+PALETTE = np.ones((256, 4), dtype=np.float32)
+TRANSLUCENT = make_translucent_table({2, 3})
+
+
+# Stone up to y = 3 on bedrock, with the chunk position in the corner column
+def layered_generator(chunk_x, chunk_z):
+    voxels = np.zeros((CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint8)
+    voxels[:, 0, :] = 4
+    voxels[:, 1:4, :] = 5
+    voxels[0, 4:6, 0] = (chunk_x, chunk_z)
+    return voxels
+
+
+def failing_generator(chunk_x, chunk_z):
+    raise ValueError('no terrain here')
+
+
+# Process jobs until none is left, collecting what is handed back
+def drain(jobs):
+    generated = {}
+    meshed = {}
+    deadline = time.monotonic() + 30
+    while jobs.pending and time.monotonic() < deadline:
+        jobs.process(generated.__setitem__, lambda chunk_key, version, buffers: meshed.__setitem__((chunk_key, version), buffers), 1.0)
+        time.sleep(0.001)
+    return generated, meshed
+
+
+def test_results_come_back_through_the_callbacks():
+    jobs = ChunkJobQueue(max_workers=2)
+    try:
+        assert jobs.submit_generate((1, 2), layered_generator, 1, 2)
+        assert not jobs.submit_generate((1, 2), layered_generator, 1, 2)
+        voxels = np.random.default_rng(7).integers(0, 6, size=(CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint8)
+        jobs.submit_mesh((0, 0), 3, padded_volume(voxels), PALETTE, TRANSLUCENT, (0, 0, 0), True)
+        generated, meshed = drain(jobs)
+        np.testing.assert_array_equal(generated[(1, 2)], layered_generator(1, 2))
+        for want, got in zip(build_mesh_buffers(padded_volume(voxels), PALETTE, TRANSLUCENT, greedy=True), meshed[((0, 0), 3)]):
+            np.testing.assert_array_equal(got, want)
+        assert not jobs.generating
+    finally:
+        jobs.shutdown()
+
+
+# A job that raises is dropped without stopping the others, and its chunk can
+# be requested again
+def test_failed_job_is_dropped():
+    jobs = ChunkJobQueue(max_workers=2)
+    try:
+        jobs.submit_generate((0, 0), failing_generator, 0, 0)
+        jobs.submit_generate((1, 0), layered_generator, 1, 0)
+        generated, meshed = drain(jobs)
+        assert list(generated) == [(1, 0)]
+        assert jobs.submit_generate((0, 0), layered_generator, 0, 0)
+        generated, meshed = drain(jobs)
+        assert list(generated) == [(0, 0)]
+    finally:
+        jobs.shutdown()
+
+
+# Jobs of a pool whose worker died run again on threads
+def test_dead_worker_falls_back_to_threads():
+    jobs = ChunkJobQueue(max_workers=2)
+    try:
+        processes = getattr(jobs.executor, '_processes', None)
+        if not processes:
+            pytest.skip('no worker processes on this platform')
+        os.kill(next(iter(processes)), signal.SIGKILL)
+        time.sleep(0.5)
+        jobs.submit_generate((0, 0), layered_generator, 0, 0)
+        generated, meshed = drain(jobs)
+        assert isinstance(jobs.executor, ThreadPoolExecutor)
+        np.testing.assert_array_equal(generated[(0, 0)], layered_generator(0, 0))
+    finally:
+        jobs.shutdown()
@@ -0,0 +1,200 @@
+import numpy as np
+import pytest
+
+from chunk_mesher import build_mesh_buffers, make_palette, make_translucent_table, padded_volume
+from chunk_storage import AIR, CHUNK_SIZE
+
+DIRT = 1
+WATER = 2
+GLASS = 3
+STONE = 5
+
+TRANSLUCENT = make_translucent_table({WATER, GLASS})
+NEIGHBOUR_KEYS = ((1, 0), (-1, 0), None, None, (0, 1), (0, -1))
+
+
+# Block colors as the scripts' get_block_color returns them, one per block id
+def block_color(block):
+    return (block / 255, (block * 7 % 256) / 255, (block * 13 % 256) / 255, 1.0)
+
+
+PALETTE = make_palette(block_color)
+
+
+# Block at world (x, y, z) of a {chunk_key: voxels} world, AIR outside it
+def world_block(world, x, y, z):
+    voxels = world.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+    if voxels is None or not 0 <= y < CHUNK_SIZE:
+        return AIR
+    return int(voxels[x % CHUNK_SIZE, y, z % CHUNK_SIZE])
+
+
+# The per-block mesher the chunk scripts used before chunk_mesher: every block,
+# every neighbour in right, left, top, bottom, front, back order, neighbours
+# outside the chunk read through get_block. Two changes made since are
+# applied: quads lie on the side they face, wound outward, and a face
+# between different blocks is drawn when either of them is translucent.
+def reference_mesh(world, chunk_x, chunk_z):
+    ox, oz = chunk_x * CHUNK_SIZE, chunk_z * CHUNK_SIZE
+    vertices = []
+    triangles = []
+    colors = []
+    for x in range(CHUNK_SIZE):
+        for y in range(CHUNK_SIZE):
+            for z in range(CHUNK_SIZE):
+                block = world_block(world, ox + x, y, oz + z)
+                if block == AIR:
+                    continue
+                neighbours = [(x + 1, y, z), (x - 1, y, z), (x, y + 1, z), (x, y - 1, z), (x, y, z + 1), (x, y, z - 1)]
+                for i, (nx, ny, nz) in enumerate(neighbours):
+                    neighbour = world_block(world, ox + nx, ny, oz + nz)
+                    if not (neighbour == AIR or (neighbour != block and (block in (WATER, GLASS) or neighbour in (WATER, GLASS)))):
+                        continue
+                    face_vertices = [
+                        (x+1, y, z), (x+1, y, z+1), (x+1, y+1, z+1), (x+1, y+1, z),
+                        (x, y, z+1), (x, y, z), (x, y+1, z), (x, y+1, z+1),
+                        (x, y+1, z), (x+1, y+1, z), (x+1, y+1, z+1), (x, y+1, z+1),
+                        (x, y, z), (x, y, z+1), (x+1, y, z+1), (x+1, y, z),
+                        (x+1, y, z+1), (x, y, z+1), (x, y+1, z+1), (x+1, y+1, z+1),
+                        (x, y, z), (x+1, y, z), (x+1, y+1, z), (x, y+1, z),
+                    ]
+                    first = len(vertices)
+                    for vx, vy, vz in face_vertices[i * 4:i * 4 + 4]:
+                        vertices.append((vx + ox, vy, vz + oz))
+                        colors.append(block_color(block))
+                    triangles.extend([first, first + 1, first + 2, first + 2, first + 3, first])
+    return (np.array(vertices, dtype=np.float32).reshape(-1, 3), np.array(triangles, dtype=np.uint32),
+            np.array(colors, dtype=np.float32).reshape(-1, 4))
+
+
+def vectorized_mesh(world, chunk_x, chunk_z, greedy=False):
+    neighbours = tuple(None if key is None else world.get((chunk_x + key[0], chunk_z + key[1])) for key in NEIGHBOUR_KEYS)
+    padded = padded_volume(world[(chunk_x, chunk_z)], neighbours)
+    return build_mesh_buffers(padded, PALETTE, TRANSLUCENT, origin=(chunk_x * CHUNK_SIZE, 0, chunk_z * CHUNK_SIZE), greedy=greedy)
+
+
+def random_chunk(rng, blocks=(AIR, AIR, AIR, DIRT, WATER, GLASS, STONE)):
+    return rng.choice(blocks, size=(CHUNK_SIZE,) * 3).astype(np.uint8)
+
+
+def filled_chunk(block):
+    return np.full((CHUNK_SIZE,) * 3, block, dtype=np.uint8)
+
+
+def assert_same_mesh(world, chunk_key):
+    expected = reference_mesh(world, *chunk_key)
+    actual = vectorized_mesh(world, *chunk_key)
+    for name, want, got in zip(('vertices', 'triangles', 'colors'), expected, actual):
+        assert got.dtype == want.dtype, name
+        np.testing.assert_array_equal(got, want, err_msg=name)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_random_chunks_match_reference(seed):
+    rng = np.random.default_rng(seed)
+    chunk_key = (seed - 3, 2 - seed)
+    world = {chunk_key: random_chunk(rng)}
+    # Some neighbours loaded, some missing (read as AIR)
+    for i, (dx, dz) in enumerate(((1, 0), (-1, 0), (0, 1), (0, -1))):
+        if (seed >> i) & 1 == 0:
+            world[(chunk_key[0] + dx, chunk_key[1] + dz)] = random_chunk(rng)
+    assert_same_mesh(world, chunk_key)
+
+
+def test_empty_chunk():
+    world = {(0, 0): filled_chunk(AIR), (1, 0): filled_chunk(STONE)}
+    assert_same_mesh(world, (0, 0))
+    vertices, triangles, colors = vectorized_mesh(world, 0, 0)
+    assert len(vertices) == len(triangles) == len(colors) == 0
+
+
+def test_full_chunk_without_neighbours():
+    world = {(0, 0): filled_chunk(STONE)}
+    assert_same_mesh(world, (0, 0))
+    assert len(vectorized_mesh(world, 0, 0)[0]) == 6 * CHUNK_SIZE * CHUNK_SIZE * 4
+
+
+def test_full_chunk_enclosed_by_neighbours():
+    world = {key: filled_chunk(STONE) for key in ((0, 0), (1, 0), (-1, 0), (0, 1), (0, -1))}
+    assert_same_mesh(world, (0, 0))
+    # Only the top and bottom of the world stay exposed
+    assert len(vectorized_mesh(world, 0, 0)[0]) == 2 * CHUNK_SIZE * CHUNK_SIZE * 4
+
+
+# Index of the slab of the neighbour at (dx, dz) that touches the chunk
+def border_slab(dx, dz):
+    def side(offset):
+        return {1: 0, -1: -1, 0: slice(None)}[offset]
+    return side(dx), slice(None), side(dz)
+
+
+# Only the border slab of a neighbour is read: blocks behind it must not matter
+@pytest.mark.parametrize('block', (AIR, STONE, WATER, GLASS))
+def test_chunk_borders_with_neighbour_slabs(block):
+    rng = np.random.default_rng(block)
+    chunk = random_chunk(rng)
+    chunk[[0, -1], :, :] = WATER
+    chunk[:, :, [0, -1]] = GLASS
+    world = {(0, 0): chunk}
+    for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        neighbour = random_chunk(rng)
+        neighbour[border_slab(dx, dz)] = block
+        world[(dx, dz)] = neighbour
+    assert_same_mesh(world, (0, 0))
+    expected = vectorized_mesh(world, 0, 0)
+
+    for (dx, dz), neighbour in list(world.items()):
+        if (dx, dz) != (0, 0):
+            solid = filled_chunk(STONE)
+            solid[border_slab(dx, dz)] = neighbour[border_slab(dx, dz)]
+            world[(dx, dz)] = solid
+    for want, got in zip(expected, vectorized_mesh(world, 0, 0)):
+        np.testing.assert_array_equal(got, want)
+
+
+# Every unit face a mesh covers, as (x, y, z, normal, color): merged quads are
+# split back into their blocks, and the normal comes from the winding
+def unit_faces(vertices, colors):
+    faces = []
+    for quad, quad_color in zip(vertices.reshape(-1, 4, 3), colors[::4]):
+        low, high = quad.min(axis=0), quad.max(axis=0)
+        normal = tuple(np.sign(np.cross(quad[1] - quad[0], quad[2] - quad[0])).astype(int))
+        spans = [range(int(a), int(b)) if a != b else (int(a),) for a, b in zip(low, high)]
+        for x in spans[0]:
+            for y in spans[1]:
+                for z in spans[2]:
+                    faces.append((x, y, z, normal, tuple(quad_color)))
+    return faces
+
+
+def terrain_chunk(rng):
+    heights = rng.integers(3, CHUNK_SIZE - 2, size=(CHUNK_SIZE, CHUNK_SIZE))
+    y = np.arange(CHUNK_SIZE)[None, :, None]
+    chunk = np.where(y < heights[:, None, :], STONE, AIR).astype(np.uint8)
+    chunk[y == heights[:, None, :] - 1] = DIRT
+    chunk[(y == 4) & (chunk == AIR)] = WATER
+    return chunk
+
+
+# Greedy quads cover exactly the faces of the per-face mesher, once each,
+# with the same block and facing, in fewer quads
+@pytest.mark.parametrize('seed', range(8))
+def test_greedy_covers_the_same_faces(seed):
+    rng = np.random.default_rng(seed)
+    chunk = terrain_chunk(rng) if seed % 2 else random_chunk(rng)
+    world = {(0, 0): chunk, (1, 0): random_chunk(rng), (0, -1): filled_chunk(STONE)}
+    per_face = vectorized_mesh(world, 0, 0)
+    greedy = vectorized_mesh(world, 0, 0, greedy=True)
+    faces = unit_faces(greedy[0], greedy[2])
+    assert len(faces) == len(set(faces))
+    assert sorted(faces) == sorted(unit_faces(per_face[0], per_face[2]))
+    assert len(greedy[0]) <= len(per_face[0])
+    np.testing.assert_array_equal(greedy[1], (np.arange(len(greedy[0]) // 4, dtype=np.uint32)[:, None] * 4 + (0, 1, 2, 2, 3, 0)).ravel())
+
+
+def test_greedy_merges_flat_layers():
+    chunk = filled_chunk(AIR)
+    chunk[:, :4, :] = STONE
+    vertices, triangles, colors = vectorized_mesh({(0, 0): chunk}, 0, 0, greedy=True)
+    # One quad per side of the slab
+    assert len(vertices) == 6 * 4
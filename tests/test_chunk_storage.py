@@ -0,0 +1,53 @@
+import numpy as np
+
+from chunk_storage import AIR, CHUNK_SIZE, ChunkVoxels, compute_heightmap
+
+STONE = 5
+
+
+def test_compute_heightmap():
+    data = np.zeros((CHUNK_SIZE,) * 3, dtype=np.uint8)
+    data[0, :5, 0] = STONE
+    data[1, 9, 2] = STONE
+    data[2, 0, 3] = STONE
+    heights = compute_heightmap(data)
+    assert heights[0, 0] == 4
+    assert heights[1, 2] == 9
+    assert heights[2, 3] == 0
+    assert heights[3, 3] == -1
+
+
+# The heightmap kept up to date by set_block matches a full rebuild after
+# every edit: placements above, below and at the top of columns, removals of
+# the top block, of blocks under it and of the last block of a column
+def test_incremental_heightmap_matches_rebuild():
+    rng = np.random.default_rng(0)
+    voxels = ChunkVoxels(CHUNK_SIZE, rng.choice([AIR, STONE], size=(CHUNK_SIZE,) * 3, p=[0.7, 0.3]).astype(np.uint8))
+    voxels.height(0, 0)  # Build the heightmap before editing
+    for _ in range(5000):
+        x, y, z = rng.integers(0, CHUNK_SIZE, 3)
+        voxels.set_block(x, y, z, STONE if rng.random() < 0.4 else AIR)
+        if rng.random() < 0.05:
+            np.testing.assert_array_equal(voxels.heightmap, compute_heightmap(voxels.data))
+    np.testing.assert_array_equal(voxels.heightmap, compute_heightmap(voxels.data))
+    voxels.column(4, 4)[:] = AIR
+    voxels.invalidate_heightmap()
+    assert voxels.height(4, 4) == -1
+
+
+# Bulk writes drop the heightmap, so it is rebuilt on the next read
+def test_bulk_writes_rebuild_heightmap():
+    voxels = ChunkVoxels()
+    assert voxels.height(0, 0) == -1
+    voxels[:, :3, :] = STONE
+    assert voxels.height(0, 0) == 2
+    voxels.set_column(1, 1, np.full(CHUNK_SIZE, STONE, dtype=np.uint8))
+    assert voxels.height(1, 1) == CHUNK_SIZE - 1
+    voxels.set_layer(7, np.full((CHUNK_SIZE, CHUNK_SIZE), STONE, dtype=np.uint8))
+    assert voxels.height(0, 0) == 7
+    voxels.fill(AIR)
+    assert voxels.height(1, 1) == -1
+    copy = voxels.copy()
+    copy.set_block(2, 2, 2, STONE)
+    assert voxels.get_block(2, 2, 2) == AIR
+    assert copy.height(2, 2) == 2
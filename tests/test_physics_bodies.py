@@ -0,0 +1,70 @@
+import numpy as np
+
+from chunk_storage import CHUNK_SIZE, ChunkVoxels
+from physics_bodies import GATHER_MIN_COLUMNS, ITEM_LIFETIME, MERGE_INTERVAL, PhysicsBodies, ground_heights
+
+STONE = 5
+SAND = 8
+
+
+def hilly_world(seed=0):
+    rng = np.random.default_rng(seed)
+    world = {}
+    for chunk_key in ((0, 0), (-1, 0), (0, -1), (-1, -1)):
+        voxels = ChunkVoxels()
+        for x in range(CHUNK_SIZE):
+            for z in range(CHUNK_SIZE):
+                voxels.column(x, z)[:rng.integers(1, CHUNK_SIZE)] = STONE
+        voxels.invalidate_heightmap()
+        world[chunk_key] = voxels
+    return world
+
+
+# Per-column lookups for few bodies and the heightmap gather for many give
+# the same heights; missing chunks read as 0
+def test_ground_heights_paths_agree():
+    world = hilly_world()
+    rng = np.random.default_rng(1)
+    for count in (1, GATHER_MIN_COLUMNS - 1, GATHER_MIN_COLUMNS, 500):
+        xs = rng.integers(-CHUNK_SIZE - 4, CHUNK_SIZE + 4, count)
+        zs = rng.integers(-CHUNK_SIZE - 4, CHUNK_SIZE + 4, count)
+        expected = []
+        for x, z in zip(xs.tolist(), zs.tolist()):
+            voxels = world.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+            expected.append(max(voxels.height(x % CHUNK_SIZE, z % CHUNK_SIZE), 0) if voxels else 0)
+        heights = ground_heights(world.get, xs, zs)
+        assert heights.dtype == np.int64
+        np.testing.assert_array_equal(heights, expected)
+
+
+# Items fall onto the ground of whichever chunk they are over and despawn
+# after ITEM_LIFETIME
+def test_items_land_and_despawn():
+    world = hilly_world()
+    bodies = PhysicsBodies()
+    bodies.spawn_item((3.5, CHUNK_SIZE + 5, 4.5), SAND)
+    bodies.spawn_item((-3.5, CHUNK_SIZE, 4.5), STONE)
+    for _ in range(600):
+        bodies.step(1 / 60, lambda xs, zs: ground_heights(world.get, xs, zs))
+    assert bodies.count == 2 and bodies.grounded[:2].all()
+    assert bodies.positions[0, 1] == world[(0, 0)].height(3, 4) + 1
+    assert bodies.positions[1, 1] == world[(-1, 0)].height(CHUNK_SIZE - 4, 4) + 1
+    bodies.step(ITEM_LIFETIME, lambda xs, zs: ground_heights(world.get, xs, zs))
+    assert bodies.count == 0
+
+
+# Items of the same block resting in the same cell merge into one stack;
+# other blocks and other cells stay apart
+def test_resting_items_merge():
+    world = hilly_world()
+    bodies = PhysicsBodies(capacity=2)
+    for offset in (0.1, 0.5, 0.9):
+        bodies.spawn_item((5 + offset, CHUNK_SIZE, 5.5), STONE)
+    bodies.spawn_item((5.5, CHUNK_SIZE, 5.5), SAND)
+    bodies.spawn_item((6.5, CHUNK_SIZE, 5.5), STONE)
+    steps = int(2 * MERGE_INTERVAL * 60) + 120
+    for _ in range(steps):
+        bodies.step(1 / 60, lambda xs, zs: ground_heights(world.get, xs, zs))
+    n = bodies.count
+    stacks = sorted(zip(np.floor(bodies.positions[:n, 0]).astype(int).tolist(), bodies.blocks[:n].tolist(), bodies.amounts[:n].tolist()))
+    assert stacks == [(5, STONE, 3), (5, SAND, 1), (6, STONE, 1)]
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+from chunk_storage import CHUNK_SIZE
+from region_file import HEADER_SIZE, REGION_SIZE, RegionFile, WorldStorage, compress_chunk, decompress_chunk, region_key
+
+
+def random_chunk(rng, blocks=12):
+    return rng.integers(0, blocks, size=(CHUNK_SIZE,) * 3, dtype=np.uint8)
+
+
+def test_compress_round_trip():
+    voxels = random_chunk(np.random.default_rng(0))
+    np.testing.assert_array_equal(decompress_chunk(compress_chunk(voxels)), voxels)
+    with pytest.raises(ValueError):
+        decompress_chunk(compress_chunk(voxels[:8]))
+
+
+def test_region_file_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    path = str(tmp_path / 'r.0.0.mc4r')
+    region = RegionFile(path)
+    chunks = {(x, z): random_chunk(rng) for x in (0, 5, REGION_SIZE - 1) for z in (0, 17)}
+    for (x, z), voxels in chunks.items():
+        region.write_chunk(x, z, voxels)
+    assert region.read_chunk(3, 3) is None
+    assert not region.has_chunk(3, 3)
+    region.close()
+
+    region = RegionFile(path)
+    for (x, z), voxels in chunks.items():
+        assert region.has_chunk(x, z)
+        np.testing.assert_array_equal(region.read_chunk(x, z), voxels)
+    region.close()
+
+
+# A chunk that still fits its sectors is rewritten in place; one that grew is
+# moved to the end of the file, and the chunks around it are untouched
+def test_rewrites_in_place_or_append(tmp_path):
+    rng = np.random.default_rng(2)
+    region = RegionFile(str(tmp_path / 'r.0.0.mc4r'))
+    flat = np.zeros((CHUNK_SIZE,) * 3, dtype=np.uint8)
+    region.write_chunk(0, 0, flat)
+    region.write_chunk(1, 0, flat)
+    first_offset = int(region.table[0, 0])
+    assert first_offset >= HEADER_SIZE
+
+    flat[:, 0, :] = 4
+    region.write_chunk(0, 0, flat)
+    assert int(region.table[0, 0]) == first_offset
+
+    noisy = random_chunk(rng, 256)
+    region.write_chunk(0, 0, noisy)
+    assert int(region.table[0, 0]) > first_offset
+    np.testing.assert_array_equal(region.read_chunk(0, 0), noisy)
+    np.testing.assert_array_equal(region.read_chunk(1, 0), np.zeros_like(flat))
+    region.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'r.0.0.mc4r'
+    path.write_bytes(b'not a region'.ljust(HEADER_SIZE, b'\0'))
+    with pytest.raises(ValueError):
+        RegionFile(str(path))
+
+
+# Chunks on both sides of region borders, negative coordinates included, and
+# the world metadata survive closing and reopening the world
+def test_world_storage_round_trip(tmp_path):
+    rng = np.random.default_rng(3)
+    world = WorldStorage(str(tmp_path))
+    chunks = {(x, z): random_chunk(rng) for x in (-REGION_SIZE - 1, -1, 0, REGION_SIZE) for z in (-1, 0, 2 * REGION_SIZE + 3)}
+    assert len({region_key(*chunk_key) for chunk_key in chunks}) > 4
+    for chunk_key, voxels in chunks.items():
+        world.save_chunk(*chunk_key, voxels)
+    world.metadata['seed'] = 1234
+    world.save_metadata()
+    world.flush()
+    assert world.load_chunk(7, 7) is None
+    world.close()
+
+    world = WorldStorage(str(tmp_path))
+    assert world.metadata == {'seed': 1234}
+    for chunk_key, voxels in chunks.items():
+        np.testing.assert_array_equal(world.load_chunk(*chunk_key), voxels)
+    assert world.load_chunk(10 * REGION_SIZE, 0) is None
+    assert not os.path.exists(tmp_path / 'r.10.0.mc4r')
+    world.close()
@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+
+from voxel_raycast import raycast_voxels
+
+AIR = 0
+STONE = 5
+
+
+def block_lookup(solid):
+    return lambda x, y, z: STONE if (x, y, z) in solid else AIR
+
+
+# First solid cell along the ray found by small fixed steps, with the face it
+# was entered through and the distance at which it was entered
+def marched_hit(origin, direction, max_distance, solid, step=1e-3):
+    length = math.sqrt(sum(d * d for d in direction))
+    direction = [d / length for d in direction]
+    previous = None
+    for i in range(int(max_distance / step) + 1):
+        t = i * step
+        cell = tuple(math.floor(o + d * t) for o, d in zip(origin, direction))
+        if cell in solid:
+            normal = (0, 0, 0) if previous is None else tuple(p - c for p, c in zip(previous, cell))
+            return cell, normal, t
+        previous = cell
+    return None, None, None
+
+
+def test_matches_a_marched_ray():
+    rng = np.random.default_rng(0)
+    checked = 0
+    for _ in range(300):
+        solid = {tuple(cell) for cell in rng.integers(-6, 6, size=(60, 3)).tolist()}
+        origin = tuple(rng.uniform(-4, 4, 3).tolist())
+        if tuple(math.floor(o) for o in origin) in solid:
+            continue
+        direction = tuple(rng.normal(size=3).tolist())
+        cell, normal, t = marched_hit(origin, direction, 8, solid)
+        if t is not None and t > 8 - 0.01:
+            continue
+        assert raycast_voxels(origin, direction, 8, block_lookup(solid)) == ((cell, normal) if cell else (None, None))
+        checked += 1
+    assert checked > 200
+
+
+def test_axis_aligned_rays_and_normals():
+    solid = {(3, 0, 0), (-3, 0, 0), (0, 3, 0), (0, -3, 0), (0, 0, 3), (0, 0, -3)}
+    get_block = block_lookup(solid)
+    origin = (0.5, 0.5, 0.5)
+    for axis in range(3):
+        for sign in (1, -1):
+            direction = tuple(sign if i == axis else 0 for i in range(3))
+            cell = tuple(3 * sign if i == axis else 0 for i in range(3))
+            normal = tuple(-sign if i == axis else 0 for i in range(3))
+            assert raycast_voxels(origin, direction, 5, get_block) == (cell, normal)
+
+
+def test_reach_and_degenerate_rays():
+    get_block = block_lookup({(0, 0, 4)})
+    # The face is 3.5 blocks away
+    assert raycast_voxels((0.5, 0.5, 0.5), (0, 0, 1), 3.4, get_block) == (None, None)
+    assert raycast_voxels((0.5, 0.5, 0.5), (0, 0, 1), 3.5, get_block) == ((0, 0, 4), (0, 0, -1))
+    assert raycast_voxels((0.5, 0.5, 0.5), (0, 0, 0), 10, get_block) == (None, None)
+    # Starting inside a block hits it at once, with no face
+    assert raycast_voxels((0.2, 0.7, 4.9), (1, 0, 0), 10, get_block) == ((0, 0, 4), (0, 0, 0))
+    # Direction length does not matter
+    assert raycast_voxels((0.5, 0.5, 0.5), (0, 0, 50), 5, get_block) == ((0, 0, 4), (0, 0, -1))
@@ -0,0 +1,170 @@
+import os
+from functools import partial
+
+import numpy as np
+import pytest
+
+from chunk_jobs import ChunkJobQueue
+from chunk_mesher import make_translucent_table
+from chunk_storage import AIR, CHUNK_SIZE
+from chunk_streaming import ChunkStreamer
+from region_file import WorldStorage
+from terrain import BEDROCK, DIRT, GLASS, SAND, STONE, WATER
+from voxel_world import BlockEditor, VoxelWorld
+
+PALETTE = np.ones((256, 4), dtype=np.float32)
+TRANSLUCENT = make_translucent_table({WATER, GLASS})
+
+
+# Stone up to y = 3 on bedrock
+def flat_generator(chunk_x, chunk_z, seed):
+    voxels = np.zeros((CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint8)
+    voxels[:, 1:4, :] = STONE
+    voxels[:, 0, :] = BEDROCK
+    return voxels
+
+
+# Flat chunks whose (0, 0) column grows a block into the chunk to its west
+def spilling_generator(chunk_x, chunk_z, seed):
+    return flat_generator(chunk_x, chunk_z, seed), {(chunk_x - 1, chunk_z): [(CHUNK_SIZE - 1, 4, 0, DIRT)]}
+
+
+# Flat chunks, except that the first request for (1, 0) fails and leaves the
+# marker file behind
+def flaky_generator(chunk_x, chunk_z, seed, marker):
+    if (chunk_x, chunk_z) == (1, 0) and not os.path.exists(marker):
+        open(marker, 'w').close()
+        raise ValueError('no terrain here')
+    return flat_generator(chunk_x, chunk_z, seed)
+
+
+def test_lod_neighbours_read_as_air():
+    world = VoxelWorld(flat_generator, 1, PALETTE, TRANSLUCENT)
+    for chunk_key in ((0, 0), (1, 0), (0, 1)):
+        world.load_chunk(*chunk_key)
+    world.lod_levels[(1, 0)] = 1
+    neighbours = world.neighbour_voxels(0, 0, 0)
+    assert neighbours[0] is None
+    assert neighbours[4] is world.chunks[(0, 1)].data
+    assert world.neighbour_voxels(0, 0, 1)[0] is world.chunks[(1, 0)].data
+
+
+# Any edit in a chunk drawn at reduced detail remeshes its neighbours too
+def test_edit_in_lod_chunk_dirties_neighbours():
+    world = VoxelWorld(flat_generator, 1, PALETTE, TRANSLUCENT)
+    for chunk_key in ((0, 0), (1, 0), (-1, 0)):
+        world.load_chunk(*chunk_key)
+    world.dirty.clear()
+    world.set_block(5, 3, 5, AIR)
+    assert world.dirty == {(0, 0)}
+    world.dirty.clear()
+    world.lod_levels[(0, 0)] = 1
+    world.set_block(5, 2, 5, AIR)
+    assert world.dirty == {(0, 0), (1, 0), (-1, 0)}
+    assert world.unsaved == {(0, 0)}
+
+
+def test_set_block_loads_a_saved_chunk(tmp_path):
+    storage = WorldStorage(str(tmp_path))
+    saved = flat_generator(2, 0, 1)
+    saved[7, 8, 7] = GLASS
+    storage.save_chunk(2, 0, saved)
+    world = VoxelWorld(flat_generator, 1, PALETTE, TRANSLUCENT, storage=storage)
+    assert world.set_block(2 * CHUNK_SIZE, 5, 0, DIRT) == AIR
+    assert world.get_block(2 * CHUNK_SIZE + 7, 8, 7) == GLASS
+    assert world.get_block(2 * CHUNK_SIZE, 5, 0) == DIRT
+    storage.close()
+
+
+def test_pending_writes_reach_late_and_loaded_chunks():
+    world = VoxelWorld(spilling_generator, 1, PALETTE, TRANSLUCENT)
+    world.load_chunk(0, 0)
+    assert len(world.pending_writes) == 1
+    world.load_chunk(-1, 0)
+    assert world.get_block(-1, 4, 0) == DIRT
+    assert len(world.pending_writes) == 1
+    world.load_chunk(1, 0)
+    assert world.get_block(CHUNK_SIZE - 1, 4, 0) == DIRT
+    assert {(0, 0), (-1, 0), (1, 0)} <= world.unsaved
+
+
+def test_sand_falls_and_breaking_drops_items():
+    world = VoxelWorld(flat_generator, 1, PALETTE, TRANSLUCENT, falling_blocks={SAND})
+    world.load_chunk(0, 0)
+    for y in (8, 9, 10):
+        world.set_block(4, y, 4, SAND)
+    for _ in range(40):
+        world.update(0.05, (0, 0, 0), (0, 0, 1), 0)
+    assert [world.get_block(4, y, 4) for y in range(3, 9)] == [STONE, SAND, SAND, SAND, AIR, AIR]
+    world.set_block(4, 4, 4, AIR)
+    assert world.bodies.count == 1
+    for _ in range(10):
+        world.update(0.05, (0, 0, 0), (0, 0, 1), 0)
+    assert [world.get_block(4, y, 4) for y in range(3, 7)] == [STONE, SAND, SAND, AIR]
+
+
+# Streaming through the job queue: every chunk in view is generated and
+# meshed, chunks left behind are saved if edited and reported as unloaded
+def test_streaming_through_jobs(tmp_path):
+    storage = WorldStorage(str(tmp_path))
+    jobs = ChunkJobQueue(max_workers=2)
+    meshed = {}
+    unloaded = []
+    world = VoxelWorld(flat_generator, 1, PALETTE, TRANSLUCENT, storage=storage, jobs=jobs, streamer=ChunkStreamer(1, 1),
+                       lod_distances=(0.5,), on_meshed=meshed.__setitem__, on_unloaded=unloaded.append)
+    try:
+        for position in ((0, 0, 0), (0, 0, 0), (3 * CHUNK_SIZE, 0, 0), (3 * CHUNK_SIZE, 0, 0)):
+            world.update(1 / 60, position, (1, 0, 0), 0)
+            if position == (0, 0, 0) and (0, 0) in world.chunks:
+                world.set_block(1, 10, 1, DIRT)
+            jobs.wait()
+            world.process_jobs(float('inf'))
+        assert set(world.chunks) == {(3, 0), (2, 0), (4, 0), (3, 1), (3, -1)}
+        assert set(meshed) >= set(world.chunks)
+        assert (0, 0) in unloaded and (0, 0) not in world.chunks
+        assert world.lod_levels[(3, 0)] == 0 and world.lod_levels[(2, 0)] == 1
+        assert storage.load_chunk(0, 0)[1, 10, 1] == DIRT
+    finally:
+        jobs.shutdown()
+        storage.close()
+
+
+# A chunk whose generation failed is requested again while the player stays
+# in the same chunk
+def test_failed_generation_is_requested_again(tmp_path):
+    jobs = ChunkJobQueue(max_workers=2)
+    marker = tmp_path / 'failed'
+    world = VoxelWorld(partial(flaky_generator, marker=str(marker)), 1, PALETTE, TRANSLUCENT, jobs=jobs, streamer=ChunkStreamer(1, 1))
+    try:
+        for _ in range(2):
+            world.update(1 / 60, (0, 0, 0), (1, 0, 0), 0)
+            jobs.wait()
+            world.process_jobs(float('inf'))
+        assert marker.exists()
+        assert set(world.chunks) == {(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)}
+    finally:
+        jobs.shutdown()
+
+
+@pytest.mark.parametrize('break_key, place_key', [('left mouse down', 'right mouse down'), ('right mouse down', 'left mouse down')])
+def test_block_editor(break_key, place_key):
+    world = VoxelWorld(flat_generator, 1, PALETTE, TRANSLUCENT)
+    world.load_chunk(0, 0)
+    editor = BlockEditor(world, break_key, place_key, {'2': SAND})
+    down = (0, -1, 0)
+    editor.input(break_key, (4.5, 6.5, 4.5), down, (8.5, 4, 8.5), editing=False)
+    assert world.get_block(4, 3, 4) == STONE
+    editor.input(break_key, (4.5, 6.5, 4.5), down, (8.5, 4, 8.5))
+    assert world.get_block(4, 3, 4) == AIR
+    editor.input('2', (0, 0, 0), down, (0, 0, 0), editing=False)
+    editor.input(place_key, (4.5, 6.5, 4.5), down, (8.5, 4, 8.5))
+    assert world.get_block(4, 3, 4) == SAND
+    # Not inside the player, and never through bedrock
+    editor.input(place_key, (4.5, 6.5, 4.5), down, (4.5, 4, 4.5))
+    assert world.get_block(4, 4, 4) == AIR
+    world.set_block(6, 1, 6, AIR)
+    world.set_block(6, 2, 6, AIR)
+    world.set_block(6, 3, 6, AIR)
+    editor.input(break_key, (6.5, 3.5, 6.5), down, (8.5, 4, 8.5))
+    assert world.get_block(6, 0, 6) == BEDROCK
+    assert editor.edits == 2
@@ -0,0 +1,60 @@
+import numpy as np
+from panda3d.core import TransparencyAttrib
+from ursina import Entity, Mesh
+
+from chunk_mesher import back_to_front_triangles
+
+RESORT_DISTANCE = 1.0  # Blocks the camera moves before translucent meshes are re-sorted
+
+
+# The translucent blocks (water, glass) of a chunk, drawn as a child of the
+# chunk entity after the opaque geometry: alpha blended, depth tested but not
+# depth written, with its quads sorted back to front for the camera position
+# it was last sorted for. The chunk's own mesh then needs no blending at all.
+class TranslucentMesh(Entity):
+    def __init__(self, chunk, **kwargs):
+        super().__init__(parent=chunk, **kwargs)
+        self.setTransparency(TransparencyAttrib.M_alpha)
+        self.setDepthWrite(False)
+        self.vertices = None
+        self.sorted_from = None
+
+    # Replace the geometry with new mesh buffers (vertices, triangles, uvs);
+    # it is sorted on the next TranslucentSorter pass
+    def apply_buffers(self, vertices, triangles, uvs):
+        self.sorted_from = None
+        if not len(vertices):
+            self.vertices = None
+            self.model = None
+            return
+        self.vertices = vertices
+        self.model = Mesh(vertices=vertices.ravel(), triangles=triangles, uvs=uvs.ravel(), mode='triangle')
+
+    def sort(self, eye):
+        self.model.triangles = back_to_front_triangles(self.vertices, eye)
+        self.model.generate()
+        self.sorted_from = eye
+
+
+# Keeps the translucent meshes of visible chunks sorted back to front. Quad
+# order only changes as the camera moves past quads, so a chunk is re-sorted
+# once the camera is more than resort_distance from where it was sorted, or
+# after its mesh was rebuilt. Chunks themselves need no sorting: Panda3D draws
+# transparent nodes back to front already. .sorted counts the chunks sorted
+# in the last update.
+class TranslucentSorter:
+    def __init__(self, resort_distance=RESORT_DISTANCE):
+        self.resort_distance = resort_distance
+        self.sorted = 0
+
+    def update(self, chunks, camera):
+        eye = np.array(tuple(camera.world_position), dtype=np.float32)
+        self.sorted = 0
+        for chunk in chunks.values():
+            translucent = chunk.translucent
+            if not chunk.visible or translucent.vertices is None:
+                continue
+            if translucent.sorted_from is not None and np.sum((eye - translucent.sorted_from) ** 2) <= self.resort_distance ** 2:
+                continue
+            translucent.sort(eye)
+            self.sorted += 1
@@ -0,0 +1,64 @@
+import math
+
+# Player box size in blocks (width along x and z, height along y)
+PLAYER_WIDTH = 0.6
+PLAYER_HEIGHT = 1.8
+
+# Gap kept between the box and the blocks it rests against, so it does not
+# count as inside them on the next move
+SKIN = 1e-4
+
+# Longest distance moved along an axis in one sweep; longer moves are split so
+# a fast fall cannot pass through a block
+MAX_SWEEP = 0.5
+
+
+# Block cells overlapped by the box with its feet at position (x, y, z):
+# [x - w/2, x + w/2] x [y, y + h] x [z - w/2, z + w/2]
+def box_cells(position, size):
+    x, y, z = position
+    width, height, depth = size
+    low = (x - width / 2, y, z - depth / 2)
+    high = (x + width / 2, y + height, z + depth / 2)
+    return [(cx, cy, cz)
+            for cx in range(math.floor(low[0]), math.ceil(high[0]))
+            for cy in range(math.floor(low[1]), math.ceil(high[1]))
+            for cz in range(math.floor(low[2]), math.ceil(high[2]))]
+
+
+def box_collides(position, size, is_solid):
+    return any(is_solid(*cell) for cell in box_cells(position, size))
+
+
+# Does the box overlap the block at (x, y, z)? Used to refuse placing a block
+# inside the player.
+def overlaps_block(position, size, block_position):
+    return tuple(block_position) in box_cells(position, size)
+
+
+# Move the box by motion (dx, dy, dz) against the solid blocks, one axis at a
+# time (y first, so the box lands before it slides). Movement along an axis
+# stops flush against the first solid block. Returns the new position and, per
+# axis, whether the movement was blocked.
+def move_aabb(position, size, motion, is_solid):
+    position = list(position)
+    blocked = [False, False, False]
+    for axis in (1, 0, 2):
+        remaining = motion[axis]
+        while remaining and not blocked[axis]:
+            delta = max(-MAX_SWEEP, min(MAX_SWEEP, remaining))
+            remaining -= delta
+            moved = list(position)
+            moved[axis] += delta
+            if not box_collides(moved, size, is_solid):
+                position = moved
+                continue
+            blocked[axis] = True
+            # Snap to the block boundary the box ran into
+            low = position[axis] - (size[axis] / 2 if axis != 1 else 0)
+            high = low + size[axis]
+            if delta > 0:
+                position[axis] += max(math.ceil(high) - high - SKIN, 0)
+            else:
+                position[axis] -= max(low - math.floor(low) - SKIN, 0)
+    return tuple(position), tuple(blocked)
@@ -0,0 +1,62 @@
+import math
+
+from ursina import Vec3, clamp, held_keys, mouse, time
+from ursina.prefabs.first_person_controller import FirstPersonController
+
+from voxel_collision import PLAYER_HEIGHT, PLAYER_WIDTH, move_aabb
+
+# Downward acceleration in blocks per second squared, scaled by the
+# controller's gravity setting
+GRAVITY = 32.0
+MAX_FALL_SPEED = 50.0
+EYE_HEIGHT = 1.62  # Camera height above the feet, inside the PLAYER_HEIGHT box
+
+
+# First person controller that collides its box against the voxel data
+# through is_solid(x, y, z) instead of raycasting against chunk colliders, so
+# chunks need no collision geometry. Mouse look, speed, jump_height, gravity
+# and enabling/disabling behave as in FirstPersonController. The camera sits
+# at EYE_HEIGHT rather than FirstPersonController's height of 2, which would
+# put it above the top of the box and let it see into blocks overhead.
+class VoxelFirstPersonController(FirstPersonController):
+    def __init__(self, is_solid, **kwargs):
+        self.is_solid = is_solid
+        self.velocity_y = 0.0
+        self.size = (PLAYER_WIDTH, PLAYER_HEIGHT, PLAYER_WIDTH)
+        super().__init__(**kwargs)
+        self.height = EYE_HEIGHT
+        self.camera_pivot.y = EYE_HEIGHT
+
+    def update(self):
+        self.rotation_y += mouse.velocity[0] * self.mouse_sensitivity[1]
+        self.camera_pivot.rotation_x -= mouse.velocity[1] * self.mouse_sensitivity[0]
+        self.camera_pivot.rotation_x = clamp(self.camera_pivot.rotation_x, -90, 90)
+
+        self.direction = Vec3(
+            self.forward * (held_keys['w'] - held_keys['s'])
+            + self.right * (held_keys['d'] - held_keys['a'])
+            ).normalized()
+        motion = self.direction * self.speed * time.dt
+
+        if self.gravity:
+            self.velocity_y = max(self.velocity_y - GRAVITY * self.gravity * time.dt, -MAX_FALL_SPEED)
+            motion.y = self.velocity_y * time.dt
+
+        position, blocked = move_aabb(self.position, self.size, motion, self.is_solid)
+        self.position = position
+        if blocked[1]:
+            if self.velocity_y < 0 and not self.grounded:
+                self.land()
+            self.grounded = self.velocity_y <= 0
+            self.velocity_y = 0.0
+        else:
+            self.grounded = False
+
+    def jump(self):
+        if not self.grounded:
+            return
+        self.grounded = False
+        self.velocity_y = math.sqrt(2 * GRAVITY * max(self.gravity, 1e-6) * self.jump_height)
+
+    def land(self):
+        self.grounded = True
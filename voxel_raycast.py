@@ -0,0 +1,41 @@
+import math
+
+from chunk_storage import AIR
+
+
+# Grid-traversal raycast (Amanatides & Woo) through the voxel grid. Visits the
+# cells the ray passes through in order, one step per cell boundary crossed,
+# and stops at the first cell where get_block(x, y, z) is not AIR.
+# Returns that block position and the normal of the face the ray entered it
+# through, or (None, None) if nothing is hit within max_distance. A ray that
+# starts inside a block hits it with a (0, 0, 0) normal.
+def raycast_voxels(origin, direction, max_distance, get_block):
+    length = math.sqrt(sum(d * d for d in direction))
+    if length == 0:
+        return None, None
+    direction = [d / length for d in direction]
+    cell = [math.floor(o) for o in origin]
+    step = [0, 0, 0]
+    t_max = [math.inf] * 3
+    t_delta = [math.inf] * 3
+    for axis in range(3):
+        if direction[axis] > 0:
+            step[axis] = 1
+            t_max[axis] = (cell[axis] + 1 - origin[axis]) / direction[axis]
+        elif direction[axis] < 0:
+            step[axis] = -1
+            t_max[axis] = (cell[axis] - origin[axis]) / direction[axis]
+        if step[axis]:
+            t_delta[axis] = abs(1 / direction[axis])
+
+    normal = (0, 0, 0)
+    distance = 0.0
+    while distance <= max_distance:
+        if get_block(*cell) != AIR:
+            return tuple(cell), normal
+        axis = t_max.index(min(t_max))
+        distance = t_max[axis]
+        cell[axis] += step[axis]
+        t_max[axis] += t_delta[axis]
+        normal = tuple(-step[axis] if i == axis else 0 for i in range(3))
+    return None, None
@@ -0,0 +1,419 @@
+import math
+from contextlib import nullcontext
+
+from block_updates import BlockUpdateQueue
+from chunk_lod import LOD_FACTORS, build_lod_mesh_buffers, lod_level
+from chunk_mesher import build_mesh_buffers, face_exposed, padded_volume
+from chunk_storage import AIR, CHUNK_SIZE, ChunkVoxels
+from physics_bodies import PhysicsBodies, ground_heights
+from structures import PendingWrites, apply_pending
+from terrain import BEDROCK, DIRT, GRAVEL, SAND, generate_flat_chunk, generate_hills_chunk, generate_perlin_chunk
+from voxel_collision import PLAYER_HEIGHT, PLAYER_WIDTH, overlaps_block
+from voxel_raycast import raycast_voxels
+
+REACH = 5  # Blocks a click reaches from the camera
+PLAYER_SIZE = (PLAYER_WIDTH, PLAYER_HEIGHT, PLAYER_WIDTH)
+
+# How each chunk script's world behaves, keyed by script name: its terrain
+# generator, the blocks that fall, the mouse buttons that break and place
+# blocks and the number keys that select the block to place. The scripts
+# build their VoxelWorld and BlockEditor from these, and so do headless
+# replays of their recordings.
+SCRIPT_RULES = {
+    'MINECRAFT4K1.1.A5.24': {
+        'generator': generate_perlin_chunk,
+        'falling_blocks': {SAND, GRAVEL},
+        'break_key': 'left mouse down',
+        'place_key': 'right mouse down',
+        'select_keys': {'1': DIRT, '2': SAND, '3': GRAVEL},
+        },
+    'MC4K5.24.25.0': {
+        'generator': generate_hills_chunk,
+        'falling_blocks': set(),
+        'break_key': 'left mouse down',
+        'place_key': 'right mouse down',
+        'select_keys': {},
+        },
+    'MINECRAFT4K5.24.251.0A': {
+        'generator': generate_flat_chunk,
+        'falling_blocks': set(),
+        'break_key': 'right mouse down',
+        'place_key': 'left mouse down',
+        'select_keys': {},
+        },
+    }
+
+
+# Generators return either a voxel array or (voxels, pending) with the tree
+# blocks left for neighbouring chunks
+def split_generated(generated):
+    return generated if isinstance(generated, tuple) else (generated, {})
+
+
+# The world of the chunk scripts, without Ursina: chunk voxels keyed by chunk
+# position, loaded from storage (a WorldStorage) or generated by one of the
+# terrain generators, with the tree blocks a chunk leaves for its neighbours
+# held as pending writes. Chunks are streamed in and out around the player
+# by streamer (a ChunkStreamer) and drawn at the level of detail of their
+# distance, LOD_FACTORS[level] for each of lod_distances they lie beyond.
+# Edits collect the chunks that need a remesh in dirty and the ones that need
+# a save in unsaved. falling_blocks fall through scheduled block updates;
+# broken blocks drop items, simulated in bodies.
+#
+# Generation and meshing go through jobs (a ChunkJobQueue), or are done right
+# away without one. Finished meshes are handed to on_meshed(chunk_key,
+# buffers) and unloaded chunks reported to on_unloaded(chunk_key), which is
+# where a script keeps its chunk entities. Without a storage, unloaded chunks
+# are dropped. profiler, a FrameProfiler, times the stages of update().
+# Nothing here opens a window, so it runs on a machine without a GPU
+# (benchmarks, replays).
+class VoxelWorld:
+    def __init__(self, generator, seed, palette, translucent, greedy=True, tiles=None, split=False, storage=None, jobs=None,
+                 streamer=None, lod_distances=(), falling_blocks=(), on_meshed=None, on_unloaded=None, profiler=None):
+        self.generator = generator
+        self.seed = seed
+        self.palette = palette
+        self.translucent = translucent
+        self.greedy = greedy
+        self.tiles = tiles
+        self.split = split
+        self.storage = storage
+        self.jobs = jobs
+        self.streamer = streamer
+        self.lod_distances = lod_distances
+        self.falling_blocks = set(falling_blocks)
+        self.on_meshed = on_meshed
+        self.on_unloaded = on_unloaded
+        self.profiler = profiler
+        self.chunks = {}
+        self.lod_levels = {}
+        self.mesh_versions = {}
+        self.mesh_version = 0
+        self.dirty = set()
+        self.unsaved = set()
+        self.pending_writes = PendingWrites(storage.metadata.get('pending_writes') if storage is not None else None)
+        self.block_updates = BlockUpdateQueue()
+        self.bodies = PhysicsBodies()
+
+    def timer(self, name):
+        return self.profiler.timer(name) if self.profiler is not None else nullcontext()
+
+    def voxels_at(self, chunk_key):
+        return self.chunks.get(chunk_key)
+
+    # The chunk at (chunk_x, chunk_z), loaded from storage, or generated right
+    # away if it was never saved, when it is not in memory yet
+    def load_chunk(self, chunk_x, chunk_z):
+        chunk = self.chunks.get((chunk_x, chunk_z))
+        if chunk is not None:
+            return chunk
+        voxels = self.storage.load_chunk(chunk_x, chunk_z) if self.storage is not None else None
+        if voxels is not None:
+            return self.add_chunk(chunk_x, chunk_z, voxels)
+        return self.add_chunk(chunk_x, chunk_z, *split_generated(self.generator(chunk_x, chunk_z, self.seed)))
+
+    # Load a chunk from storage, or queue background generation of a chunk
+    # that was never saved
+    def request_chunk(self, chunk_x, chunk_z):
+        chunk_key = (chunk_x, chunk_z)
+        if chunk_key in self.chunks:
+            return
+        if self.jobs is None:
+            self.load_chunk(chunk_x, chunk_z)
+            return
+        voxels = self.storage.load_chunk(chunk_x, chunk_z) if self.storage is not None else None
+        if voxels is not None:
+            self.add_chunk(chunk_x, chunk_z, voxels)
+        else:
+            self.jobs.submit_generate(chunk_key, self.generator, chunk_x, chunk_z, self.seed)
+
+    def on_chunk_generated(self, chunk_key, generated):
+        with self.timer('chunk_generated'):
+            if chunk_key not in self.chunks and (self.streamer is None or self.streamer.in_range(chunk_key)):
+                self.add_chunk(*chunk_key, *split_generated(generated))
+
+    # Add a chunk's voxels, with the writes other chunks left for it, and queue
+    # the remesh of it and its neighbours
+    def add_chunk(self, chunk_x, chunk_z, voxels, pending=None):
+        chunk_key = (chunk_x, chunk_z)
+        chunk = self.chunks[chunk_key] = ChunkVoxels(CHUNK_SIZE, voxels)
+        self.lod_levels[chunk_key] = lod_level(chunk_key, self.streamer.center if self.streamer else None, self.lod_distances)
+        if apply_pending(chunk, self.pending_writes.take(chunk_key)):
+            self.unsaved.add(chunk_key)
+        if pending:
+            self.place_pending_writes(chunk_key, pending)
+        self.mark_chunk_dirty(chunk_x, chunk_z)
+        return chunk
+
+    # Hand the tree blocks a new chunk left for its neighbours to the loaded ones
+    # now and keep the rest for when they arrive. The chunk itself is saved so it is
+    # never generated, and its trees placed, a second time.
+    def place_pending_writes(self, chunk_key, pending):
+        self.unsaved.add(chunk_key)
+        for neighbour_key, writes in pending.items():
+            neighbour = self.chunks.get(neighbour_key)
+            if neighbour is None:
+                self.pending_writes.add({neighbour_key: writes})
+            elif apply_pending(neighbour, writes):
+                self.unsaved.add(neighbour_key)
+                self.mark_chunk_dirty(*neighbour_key)
+
+    # Drop a chunk, saving it first if it was edited, and report it to
+    # on_unloaded. Its neighbours keep their meshes: they are at the edge of
+    # the loaded area and about to go as well.
+    def unload_chunk(self, chunk_key):
+        chunk = self.chunks.pop(chunk_key)
+        del self.lod_levels[chunk_key]
+        self.mesh_versions.pop(chunk_key, None)
+        self.dirty.discard(chunk_key)
+        if chunk_key in self.unsaved:
+            self.unsaved.discard(chunk_key)
+            if self.storage is not None:
+                self.storage.save_chunk(*chunk_key, chunk.data)
+        if self.on_unloaded is not None:
+            self.on_unloaded(chunk_key)
+
+    # Write every chunk edited since the last save and the pending writes;
+    # unedited chunks are simply generated again when they are next loaded
+    def save(self):
+        if self.storage is None:
+            return
+        with self.timer('save'):
+            for chunk_key in self.unsaved:
+                chunk = self.chunks.get(chunk_key)
+                if chunk is not None:
+                    self.storage.save_chunk(*chunk_key, chunk.data)
+            self.unsaved.clear()
+            self.storage.metadata['pending_writes'] = self.pending_writes.to_json()
+            self.storage.save_metadata()
+            self.storage.flush()
+
+    def get_block(self, x, y, z):
+        chunk = self.chunks.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+        if chunk is None or not 0 <= y < CHUNK_SIZE:
+            return AIR
+        return chunk.get_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE)
+
+    # Blocks the player collides with (everything but air, as the chunk mesh
+    # colliders used to)
+    def is_solid(self, x, y, z):
+        return self.get_block(x, y, z) != AIR
+
+    # Write a block, loading its chunk first if needed, and returns the block
+    # it replaced. Falling blocks are checked when placed, and so is whatever
+    # sits on top of a removed block; a removed block drops as an item.
+    def set_block(self, x, y, z, block):
+        if not 0 <= y < CHUNK_SIZE:
+            return AIR
+        chunk = self.load_chunk(x // CHUNK_SIZE, z // CHUNK_SIZE)
+        old_block = chunk.get_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE)
+        chunk.set_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE, block)
+        self.mark_block_dirty(x, y, z, old_block, block)
+        if self.falling_blocks:
+            if block in self.falling_blocks:
+                self.block_updates.schedule((x, y, z))
+            elif block == AIR:
+                self.block_updates.schedule((x, y + 1, z))
+        if old_block != AIR and block == AIR:
+            self.bodies.spawn_item((x, y + 0.5, z), old_block)
+        return old_block
+
+    # Highest solid y of the column at world (x, z), 0 where there is none
+    def terrain_height(self, x, z):
+        chunk = self.chunks.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+        if chunk is None:
+            return 0
+        return max(chunk.height(x % CHUNK_SIZE, z % CHUNK_SIZE), 0)
+
+    # Highest solid y under each body, from the heightmaps of the loaded chunks
+    def ground_heights(self, xs, zs):
+        return ground_heights(self.voxels_at, xs, zs)
+
+    # Voxel arrays of the six adjacent chunks in FACE_NORMALS order (chunks span
+    # the full world height, so there is nothing above or below). Chunks drawn at
+    # another level of detail read as AIR: both sides then close their surface at
+    # the seam, so no crack opens where the two resolutions do not line up.
+    def neighbour_voxels(self, chunk_x, chunk_z, level=0):
+        def voxels_at(chunk_key):
+            chunk = self.chunks.get(chunk_key)
+            return chunk.data if chunk is not None and self.lod_levels[chunk_key] == level else None
+        return (voxels_at((chunk_x + 1, chunk_z)), voxels_at((chunk_x - 1, chunk_z)), None, None,
+                voxels_at((chunk_x, chunk_z + 1)), voxels_at((chunk_x, chunk_z - 1)))
+
+    # Queue a remesh of a newly added chunk and of the loaded chunks around it,
+    # whose border faces it may now cover or expose
+    def mark_chunk_dirty(self, chunk_x, chunk_z):
+        self.dirty.add((chunk_x, chunk_z))
+        for chunk_key in ((chunk_x + 1, chunk_z), (chunk_x - 1, chunk_z), (chunk_x, chunk_z + 1), (chunk_x, chunk_z - 1)):
+            if chunk_key in self.chunks:
+                self.dirty.add(chunk_key)
+
+    # Queue a remesh of the chunk holding (x, y, z), plus any neighbouring chunk
+    # whose border face against this block changes visibility, and mark the chunk
+    # as needing a save
+    def mark_block_dirty(self, x, y, z, old_block, new_block):
+        if old_block == new_block:
+            return
+        chunk_key = (x // CHUNK_SIZE, z // CHUNK_SIZE)
+        self.dirty.add(chunk_key)
+        self.unsaved.add(chunk_key)
+        if self.lod_levels.get(chunk_key):
+            # Any edit may change a merged cell on the border
+            self.mark_chunk_dirty(*chunk_key)
+            return
+        for nx, nz in ((x - 1, z), (x + 1, z), (x, z - 1), (x, z + 1)):
+            neighbour_key = (nx // CHUNK_SIZE, nz // CHUNK_SIZE)
+            if neighbour_key == chunk_key or neighbour_key not in self.chunks:
+                continue
+            neighbour = self.get_block(nx, y, nz)
+            if face_exposed(neighbour, old_block, self.translucent) != face_exposed(neighbour, new_block, self.translucent):
+                self.dirty.add(neighbour_key)
+
+    # Move every due falling block with air beneath it down one block and
+    # check it again next tick, along with the block it leaves behind. Positions
+    # come bottom first, so a whole column drops one block per tick.
+    def update_falling_blocks(self, positions):
+        for x, y, z in positions:
+            block = self.get_block(x, y, z)
+            if block not in self.falling_blocks or y == 0 or self.get_block(x, y - 1, z) != AIR:
+                continue
+            chunk = self.chunks[(x // CHUNK_SIZE, z // CHUNK_SIZE)]
+            chunk.set_block(x % CHUNK_SIZE, y, z % CHUNK_SIZE, AIR)
+            chunk.set_block(x % CHUNK_SIZE, y - 1, z % CHUNK_SIZE, block)
+            self.mark_block_dirty(x, y, z, block, AIR)
+            self.mark_block_dirty(x, y - 1, z, AIR, block)
+            self.block_updates.schedule((x, y - 1, z))
+            self.block_updates.schedule((x, y + 1, z))
+
+    # Give every loaded chunk the level of detail for its distance from the player.
+    # A chunk that changes level is remeshed together with its neighbours, whose
+    # seam faces against it depend on whether the two levels match.
+    def update_lod_levels(self):
+        for chunk_key in self.chunks:
+            level = lod_level(chunk_key, self.streamer.center, self.lod_distances)
+            if level != self.lod_levels[chunk_key]:
+                self.lod_levels[chunk_key] = level
+                self.mark_chunk_dirty(*chunk_key)
+
+    # Unload the chunks left behind and update the levels of detail whenever the
+    # player crosses into another chunk, and request every chunk in view that
+    # is neither loaded nor being generated, so a chunk whose generation
+    # failed is asked for again instead of staying a hole.
+    # forward is the player's (x, z) facing; chunks in front load first.
+    def stream_chunks(self, player_chunk, forward=(0, 0)):
+        if self.streamer.move_to(player_chunk):
+            for chunk_key in self.streamer.chunks_to_unload(self.chunks):
+                self.unload_chunk(chunk_key)
+            self.update_lod_levels()
+        for chunk_key in self.streamer.chunks_to_load(self.chunks, forward):
+            if self.jobs is None or chunk_key not in self.jobs.generating:
+                self.request_chunk(*chunk_key)
+
+    # Mesh buffers of a chunk at its level of detail, in world coordinates
+    def mesh_buffers(self, chunk_x, chunk_z):
+        level = self.lod_levels[(chunk_x, chunk_z)]
+        voxels = self.chunks[(chunk_x, chunk_z)].data
+        neighbours = self.neighbour_voxels(chunk_x, chunk_z, level)
+        origin = (chunk_x * CHUNK_SIZE, 0, chunk_z * CHUNK_SIZE)
+        if level:
+            return build_lod_mesh_buffers(voxels, neighbours, LOD_FACTORS[level], self.palette, self.translucent, origin, self.greedy,
+                                          tiles=self.tiles, split=self.split)
+        return build_mesh_buffers(padded_volume(voxels, neighbours), self.palette, self.translucent, origin, self.greedy,
+                                  tiles=self.tiles, split=self.split)
+
+    # Queue a mesh job for a chunk at its level of detail
+    def submit_mesh(self, chunk_x, chunk_z):
+        chunk_key = (chunk_x, chunk_z)
+        self.mesh_version += 1
+        self.mesh_versions[chunk_key] = self.mesh_version
+        level = self.lod_levels[chunk_key]
+        voxels = self.chunks[chunk_key].data
+        neighbours = self.neighbour_voxels(chunk_x, chunk_z, level)
+        origin = (chunk_x * CHUNK_SIZE, 0, chunk_z * CHUNK_SIZE)
+        if level:
+            self.jobs.submit_lod_mesh(chunk_key, self.mesh_version, voxels, neighbours, LOD_FACTORS[level], self.palette, self.translucent,
+                                      origin, self.greedy, self.tiles, split=self.split)
+        else:
+            self.jobs.submit_mesh(chunk_key, self.mesh_version, padded_volume(voxels, neighbours), self.palette, self.translucent,
+                                  origin, self.greedy, self.tiles, split=self.split)
+
+    # Remesh every chunk edited since the last call, once per chunk: as a job
+    # whose result reaches on_meshed through process_jobs(), or right away
+    # without a job queue
+    def remesh_dirty(self):
+        with self.timer('remesh'):
+            for chunk_key in self.dirty:
+                if chunk_key not in self.chunks:
+                    continue
+                if self.jobs is not None:
+                    self.submit_mesh(*chunk_key)
+                    continue
+                buffers = self.mesh_buffers(*chunk_key)
+                if self.on_meshed is not None:
+                    self.on_meshed(chunk_key, buffers)
+            self.dirty.clear()
+
+    def _on_job_meshed(self, chunk_key, version, buffers):
+        if version == self.mesh_versions.get(chunk_key) and self.on_meshed is not None:
+            self.on_meshed(chunk_key, buffers)
+
+    # Apply finished generation and mesh jobs for up to budget seconds; a mesh
+    # overtaken by a newer edit, or of a chunk unloaded since, is dropped
+    def process_jobs(self, budget):
+        if self.jobs is not None:
+            self.jobs.process(self.on_chunk_generated, self._on_job_meshed, budget)
+
+    # One frame of world work, as the scripts' update() runs it: stream chunks
+    # around the player at position (facing forward), run the block updates
+    # and bodies due after dt seconds, queue remeshes and apply finished jobs
+    # for up to budget seconds
+    def update(self, dt, position, forward, budget):
+        if self.streamer is not None:
+            with self.timer('streaming'):
+                player_chunk = (math.floor(position[0] / CHUNK_SIZE), math.floor(position[2] / CHUNK_SIZE))
+                self.stream_chunks(player_chunk, (forward[0], forward[2]))
+        with self.timer('block_updates'):
+            for positions in self.block_updates.advance(dt):
+                self.update_falling_blocks(positions)
+        with self.timer('bodies'):
+            self.bodies.step(dt, self.ground_heights)
+        self.remesh_dirty()
+        self.process_jobs(budget)
+
+
+# Block breaking, placing and selection as the chunk scripts' input() does
+# them. A click casts a ray of REACH blocks from the camera: break_key removes
+# the block hit unless it is unbreakable, place_key puts the selected block
+# against the face hit unless the player's box is in the way. select_keys
+# maps keys to the block to place. edits counts the blocks changed.
+class BlockEditor:
+    def __init__(self, world, break_key='left mouse down', place_key='right mouse down', select_keys=None, block=DIRT,
+                 unbreakable=(BEDROCK,)):
+        self.world = world
+        self.break_key = break_key
+        self.place_key = place_key
+        self.select_keys = select_keys or {}
+        self.selected_block = block
+        self.unbreakable = set(unbreakable)
+        self.edits = 0
+
+    # Handle a key pressed with the camera at origin looking along direction
+    # and the player at player_position; clicks only edit while editing is True
+    def input(self, key, origin, direction, player_position, editing=True):
+        if key in self.select_keys:
+            self.selected_block = self.select_keys[key]
+            return
+        if not editing or key not in (self.break_key, self.place_key):
+            return
+        hit, normal = raycast_voxels(origin, direction, REACH, self.world.get_block)
+        if hit is None:
+            return
+        if key == self.break_key:
+            if self.world.get_block(*hit) not in self.unbreakable:
+                self.world.set_block(*hit, AIR)
+                self.edits += 1
+            return
+        position = tuple(h + n for h, n in zip(hit, normal))
+        if self.world.get_block(*position) == AIR and not overlaps_block(player_position, PLAYER_SIZE, position):
+            self.world.set_block(*position, self.selected_block)
+            self.edits += 1